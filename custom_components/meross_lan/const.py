@@ -218,6 +218,10 @@ PARAM_TIMESTAMP_TOLERANCE = 5
 """max device timestamp diff against our and trigger warning and (eventually) fix it"""
 PARAM_TRACING_ABILITY_POLL_TIMEOUT = 2
 """used to delay the iteration of abilities while tracing"""
+PARAM_TRACE_FLUSH_PERIOD = 1
+"""delay before buffered trace rows are written to file"""
+PARAM_TRACE_RING_SIZE = 1024
+"""max number of trace rows buffered in memory before dropping the oldest"""
 PARAM_ROLLERSHUTTER_TRANSITION_POLL_TIMEOUT = 2
 """used when polling the cover state to monitor an ongoing transition"""
 PARAM_CLOUDMQTT_UPDATE_PERIOD = 1195
@@ -254,3 +258,11 @@ PARAM_HEADER_SIZE = 300
 """(rough) estimate of the header part of any response"""
 PARAM_RESPONSE_SIZE_MAX = 3000
 """(rough) estimate of the allowed response size limit before overflow occurs (see #244)"""
+PARAM_RESPONSE_SIZE_SAMPLES = 8
+"""number of recent responses used to estimate a namespace polling response size"""
+PARAM_MULTIPLE_REPACK_MAX = 2
+"""how many times a failed/truncated ns_multiple is repacked before falling back to single requests"""
+PARAM_POLLING_ADAPTIVE_SCALE_STEP = 1.5
+"""polling period stretch factor applied every time an (adaptive) namespace response is unchanged"""
+PARAM_POLLING_ADAPTIVE_SCALE_MAX = 4
+"""upper bound for the adaptive stretching of a namespace polling period"""
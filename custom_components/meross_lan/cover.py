@@ -100,6 +100,9 @@ class MLRollerShutter(MLCover):
 
     ATTR_POSITION_NATIVE = "position_native"
 
+    # transitions are tracked when parsing (unchanged) states
+    parse_always = True
+
     # HA core entity attributes:
     assumed_state = True
     current_cover_position: int | None
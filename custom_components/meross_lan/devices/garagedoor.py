@@ -249,6 +249,8 @@ class MLGarageEmulatedConfigNumber(MLEmulatedNumber):
 class MLGarage(MLCover):
 
     ns = mn.Appliance_GarageDoor_State
+    # transitions are tracked when parsing (unchanged) states
+    parse_always = True
 
     # garagedoor extra attributes
     ATTR_TRANSITION_DURATION = "transition_duration"
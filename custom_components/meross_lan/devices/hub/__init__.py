@@ -29,7 +29,15 @@ from ...sensor import (
 from ...switch import MLSwitch
 
 if TYPE_CHECKING:
-    from typing import Any, Callable, Collection, Final, NotRequired, TypedDict
+    from typing import (
+        Any,
+        Callable,
+        ClassVar,
+        Collection,
+        Final,
+        NotRequired,
+        TypedDict,
+    )
 
     from ...helpers.device import AsyncRequestFunc, DigestInitReturnType
     from ...helpers.entity import MLEntity
@@ -243,12 +251,17 @@ class HubChunkedNamespaceHandler(HubNamespaceHandler):
     The strategy itself will poll the namespace on every cycle if no MQTT active
     When MQTT active we rely on states PUSHES in general but we'll also poll
     from time to time (see POLLING_STRATEGY_CONF for the relevant namespaces)
+    The number of subdevices queried per request starts at 'count' and is then
+    computed from the per-subdevice size learned from the actual responses so
+    that hubs with many (small payload) subdevices need fewer round trips.
     """
 
     __slots__ = (
         "_models",
         "_included",
         "_count",
+        "_response_count",
+        "_item_sizes",
     )
 
     def __init__(
@@ -263,8 +276,45 @@ class HubChunkedNamespaceHandler(HubNamespaceHandler):
         self._models = models
         self._included = included
         self._count = count
+        self._response_count = 0
+        self._item_sizes: list[float] = []
         self.polling_strategy = HubChunkedNamespaceHandler.async_poll_chunked  # type: ignore
 
+    def polling_response_size_observe(self, size: int, /):
+        HubNamespaceHandler.polling_response_size_observe(self, size)
+        # the response has already been handled (see _handle_subdevice) so we
+        # know how many subdevices it carried
+        if response_count := self._response_count:
+            self._response_count = 0
+            item_sizes = self._item_sizes
+            item_sizes.append((size - self.polling_response_base_size) / response_count)
+            if len(item_sizes) > mlc.PARAM_RESPONSE_SIZE_SAMPLES:
+                del item_sizes[0]
+            self.polling_response_item_size = int(max(item_sizes)) + 1
+
+    def _handle_subdevice(self, header, payload):
+        if header[mc.KEY_METHOD] == mc.METHOD_GETACK:
+            p_subdevices = payload.get(self.ns.key)
+            self._response_count = (
+                len(p_subdevices) if type(p_subdevices) is list else 0
+            )
+        HubNamespaceHandler._handle_subdevice(self, header, payload)
+
+    def _get_chunk_count(self):
+        if not self._item_sizes:
+            return self._count
+        device = self.device
+        size_limit = max(device.device_response_size_min, mlc.PARAM_RESPONSE_SIZE_MAX)
+        if device.device_response_size_max:
+            size_limit = min(size_limit, device.device_response_size_max)
+        return max(
+            int(
+                (size_limit - self.polling_response_base_size)
+                / self.polling_response_item_size
+            ),
+            1,
+        )
+
     async def async_poll_chunked(self):
         device = self.device
         if (not device._mqtt_active) or (
@@ -310,10 +360,11 @@ class HubChunkedNamespaceHandler(HubNamespaceHandler):
         """
         payload = []
         key_channel = self.ns.key_channel
+        count = self._get_chunk_count()
         for subdevice in self.device.subdevices.values():
             if (subdevice.model in self._models) == self._included:
                 payload.append({key_channel: subdevice.id})
-                if len(payload) == self._count:
+                if len(payload) == count:
                     yield payload
                     payload = []
         if payload:
@@ -547,6 +598,21 @@ class HubMixin(Device if TYPE_CHECKING else object):
             return SubDevice(self, p_subdevice, model)  # type: ignore
 
 
+HUB_DIGEST_EXCLUDED_KEYS = frozenset(
+    (mc.KEY_ID, mc.KEY_STATUS, mc.KEY_ONOFF, mc.KEY_LASTACTIVETIME)
+)
+HUB_ALL_EXCLUDED_KEYS = frozenset((mc.KEY_ID, mc.KEY_ONLINE))
+HUB_PARSE_DIAGNOSTIC_EXCLUDED_KEYS = frozenset(
+    (
+        mc.KEY_ID,
+        mc.KEY_LMTIME,
+        mc.KEY_LMTIME_,
+        mc.KEY_SYNCEDTIME,
+        mc.KEY_LATESTSAMPLETIME,
+    )
+)
+
+
 class SubDevice(NamespaceParser, BaseDevice):
     """
     SubDevice introduces some hybridization in EntityManager:
@@ -563,6 +629,12 @@ class SubDevice(NamespaceParser, BaseDevice):
     ms130-Appliance.Control.Sensor.LatestX)
     """
 
+    if TYPE_CHECKING:
+        _hub_parsers: ClassVar[dict[str, Callable[[Any, dict], None] | None]]
+
+    _hub_parsers = {}
+    """Dispatch table key -> _parse_{key} (see _hub_parse). Every subclass gets its own."""
+
     __slots__ = (
         "async_request",
         "check_device_timezone",
@@ -574,6 +646,10 @@ class SubDevice(NamespaceParser, BaseDevice):
         "switch_togglex",
     )
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._hub_parsers = {}
+
     def __init__(self, hub: HubMixin, p_digest: dict, model: str):
         # this is a very dirty trick/optimization to override some BaseDevice
         # properties/methods that just needs to be forwarded to the hub
@@ -673,52 +749,26 @@ class SubDevice(NamespaceParser, BaseDevice):
 
     def _hub_parse(self, key: str, payload: dict):
         try:
-            getattr(self, f"_parse_{key}")(payload)
-        except AttributeError:
-            # This happens when we still haven't 'normalized' the device structure
-            # so we'll (eventually) euristically generate sensors for device properties
-            # This is the case for when we see newer devices and we don't know
-            # their payloads and features.
-            # as for now we've seen "smokeAlarm" and "doorWindow" subdevices
-            # carrying similar payloads structures. We'll be conservative
-            # by not 'exploiting' lists in payloads since they usually carry
-            # historic data or so
-            if not self.hub.create_diagnostic_entities:
-                return
-
-            def _parse_dict(parent_key: str, parent_dict: dict):
-                for subkey, subvalue in parent_dict.items():
-                    if type(subvalue) is dict:
-                        _parse_dict(f"{parent_key}_{subkey}", subvalue)
-                        continue
-                    if type(subvalue) is list:
-                        _parse_list()
-                        continue
-                    if subkey in {
-                        mc.KEY_ID,
-                        mc.KEY_LMTIME,
-                        mc.KEY_LMTIME_,
-                        mc.KEY_SYNCEDTIME,
-                        mc.KEY_LATESTSAMPLETIME,
-                    }:
-                        continue
-                    entitykey = f"{parent_key}_{subkey}"
-                    try:
-                        self.entities[f"{self.id}_{entitykey}"].update_native_value(
-                            subvalue
-                        )
-                    except KeyError:
-                        MLDiagnosticSensor(
-                            self,
-                            self.id,
-                            entitykey,
-                            native_value=subvalue,
-                        )
-
-            def _parse_list():
-                pass
-
-            _parse_dict(key, payload)
+            try:
+                parser = self._hub_parsers[key]
+            except KeyError:
+                # first time this subdevice class sees the key: resolve (once) the
+                # dedicated _parse_{key} or None to route to the diagnostic parser
+                parser = self._hub_parsers[key] = getattr(
+                    type(self), f"_parse_{key}", None
+                )
+            if parser:
+                parser(self, payload)
+            elif self.hub.create_diagnostic_entities:
+                # This happens when we still haven't 'normalized' the device structure
+                # so we'll (eventually) euristically generate sensors for device properties
+                # This is the case for when we see newer devices and we don't know
+                # their payloads and features.
+                # as for now we've seen "smokeAlarm" and "doorWindow" subdevices
+                # carrying similar payloads structures. We'll be conservative
+                # by not 'exploiting' lists in payloads since they usually carry
+                # historic data or so
+                self._hub_parse_diagnostic(key, payload)
 
         except Exception as exception:
             self.log_exception(
@@ -730,6 +780,24 @@ class SubDevice(NamespaceParser, BaseDevice):
                 timeout=14400,
             )
 
+    def _hub_parse_diagnostic(self, parent_key: str, parent_dict: dict):
+        for subkey, subvalue in parent_dict.items():
+            if type(subvalue) is dict:
+                self._hub_parse_diagnostic(f"{parent_key}_{subkey}", subvalue)
+                continue
+            if (type(subvalue) is list) or (subkey in HUB_PARSE_DIAGNOSTIC_EXCLUDED_KEYS):
+                continue
+            entitykey = f"{parent_key}_{subkey}"
+            try:
+                self.entities[f"{self.id}_{entitykey}"].update_native_value(subvalue)
+            except KeyError:
+                MLDiagnosticSensor(
+                    self,
+                    self.id,
+                    entitykey,
+                    native_value=subvalue,
+                )
+
     def parse_digest(self, p_digest: dict):
         """
         digest payload (from NS_ALL or HUB digest)
@@ -760,18 +828,9 @@ class SubDevice(NamespaceParser, BaseDevice):
         self.p_digest = p_digest
         self._parse_online(p_digest)
         if self.online:
-            _excluded_keys = (
-                mc.KEY_ID,
-                mc.KEY_STATUS,
-                mc.KEY_ONOFF,
-                mc.KEY_LASTACTIVETIME,
-            )
-            for _ in (
-                self._hub_parse(key, value)
-                for key, value in p_digest.items()
-                if (type(value) is dict) and (key not in _excluded_keys)
-            ):
-                pass
+            for key, value in p_digest.items():
+                if (type(value) is dict) and (key not in HUB_DIGEST_EXCLUDED_KEYS):
+                    self._hub_parse(key, value)
             if mc.KEY_ONOFF in p_digest:
                 self._parse_togglex(p_digest)
 
@@ -806,13 +865,9 @@ class SubDevice(NamespaceParser, BaseDevice):
         self._parse_online(p_all.get(mc.KEY_ONLINE, {}))
 
         if self.online:
-            _excluded_keys = (mc.KEY_ID, mc.KEY_ONLINE)
-            for _ in (
-                self._hub_parse(key, value)
-                for key, value in p_all.items()
-                if (type(value) is dict) and (key not in _excluded_keys)
-            ):
-                pass
+            for key, value in p_all.items():
+                if (type(value) is dict) and (key not in HUB_ALL_EXCLUDED_KEYS):
+                    self._hub_parse(key, value)
 
     def _parse_adjust(self, p_adjust: dict):
         for p_key, p_value in p_adjust.items():
@@ -1493,6 +1548,7 @@ POLLING_STRATEGY_CONF |= {
         mlc.PARAM_HEADER_SIZE,
         100,
         NamespaceHandler.async_poll_smart,
+        True,
     ),
     mn_h.Appliance_Control_Sensor_LatestX: (
         mlc.PARAM_SENSOR_SLOW_UPDATE_PERIOD,
@@ -1514,6 +1570,7 @@ POLLING_STRATEGY_CONF |= {
         mlc.PARAM_HEADER_SIZE,
         40,
         NamespaceHandler.async_poll_smart,
+        True,
     ),
     mn_h.Appliance_Hub_Mts100_Adjust: (
         mlc.PARAM_CLOUDMQTT_UPDATE_PERIOD,
@@ -1521,6 +1578,7 @@ POLLING_STRATEGY_CONF |= {
         mlc.PARAM_HEADER_SIZE,
         40,
         NamespaceHandler.async_poll_smart,
+        True,
     ),
     mn_h.Appliance_Hub_Mts100_All: (
         mlc.PARAM_HEARTBEAT_PERIOD,
@@ -1542,6 +1600,7 @@ POLLING_STRATEGY_CONF |= {
         mlc.PARAM_HEADER_SIZE,
         60,
         NamespaceHandler.async_poll_smart,
+        True,
     ),
     mn_h.Appliance_Hub_Sensor_All: (
         mlc.PARAM_HEARTBEAT_PERIOD,
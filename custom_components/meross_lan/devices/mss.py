@@ -58,6 +58,8 @@ class ElectricitySensor(me.MEAlwaysAvailableMixin, MLNumericSensor):
         sensor_consumptionx: "ConsumptionXSensor | None"
 
     ENTITY_KEY = "energy_estimate"
+    # the energy estimate needs to be integrated on every reading
+    parse_always = True
     SENSOR_DEFS = {
         # key: (not-optional, DeviceClass, StateClass, suggested_display_precision, device_scale)
         mc.KEY_CURRENT: (
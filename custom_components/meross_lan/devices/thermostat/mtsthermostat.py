@@ -470,6 +470,7 @@ POLLING_STRATEGY_CONF |= {
         mlc.PARAM_HEADER_SIZE,
         30,
         NamespaceHandler.async_poll_smart,
+        True,
     ),
     mn_t.Appliance_Control_Thermostat_Calibration: (
         mlc.PARAM_CONFIG_UPDATE_PERIOD,
@@ -477,6 +478,7 @@ POLLING_STRATEGY_CONF |= {
         mlc.PARAM_HEADER_SIZE,
         80,
         NamespaceHandler.async_poll_smart,
+        True,
     ),
     mn_t.Appliance_Control_Thermostat_CtlRange: (
         0,
@@ -491,6 +493,7 @@ POLLING_STRATEGY_CONF |= {
         mlc.PARAM_HEADER_SIZE,
         80,
         NamespaceHandler.async_poll_smart,
+        True,
     ),
     mn_t.Appliance_Control_Thermostat_Frost: (
         mlc.PARAM_SENSOR_SLOW_UPDATE_PERIOD,
@@ -505,6 +508,7 @@ POLLING_STRATEGY_CONF |= {
         mlc.PARAM_HEADER_SIZE,
         30,
         NamespaceHandler.async_poll_smart,
+        True,
     ),
     mn_t.Appliance_Control_Thermostat_ModeC: (
         0,
@@ -533,6 +537,7 @@ POLLING_STRATEGY_CONF |= {
         mlc.PARAM_HEADER_SIZE,
         550,
         NamespaceHandler.async_poll_smart,
+        True,
     ),
     mn_t.Appliance_Control_Thermostat_ScheduleB: (
         mlc.PARAM_CONFIG_UPDATE_PERIOD,
@@ -540,6 +545,7 @@ POLLING_STRATEGY_CONF |= {
         mlc.PARAM_HEADER_SIZE,
         550,
         NamespaceHandler.async_poll_smart,
+        True,
     ),
     mn_t.Appliance_Control_Thermostat_Sensor: (
         mlc.PARAM_SENSOR_SLOW_UPDATE_PERIOD,
@@ -44,7 +44,7 @@ from ..merossclient.protocol.message import (
     compute_message_signature,
     get_message_uuid,
 )
-from ..sensor import ProtocolSensor
+from ..sensor import HttpStatsSensor, ProtocolSensor
 from ..update import MLUpdate
 from .manager import ConfigEntryManager, EntityManager
 from .namespaces import NamespaceHandler, mc, mn
@@ -89,6 +89,8 @@ if TYPE_CHECKING:
     type AsyncRequestFunc = Callable[
         [str, str, MerossPayloadType], CoroutineType[Any, Any, MerossResponse | None]
     ]
+    type MultipleRequestType = tuple[MerossRequestType, int]
+    """A request queued for ns_multiple packing together with its expected response size"""
 
 
 TIMEZONES_SET = None
@@ -285,12 +287,14 @@ class Device(BaseDevice, ConfigEntryManager):
         _polling_callback_shutdown: Future | None
         _queued_cloudpoll_requests: int
         multiple_max: int
+        _multiple_requests: list[MultipleRequestType] | None
         _timezone_next_check: float
         _trace_ability_callback_unsub: TimerHandle | None
         _diagnostics_build: bool
 
         # entities
         sensor_protocol: ProtocolSensor
+        sensor_http_stats: HttpStatsSensor | None
         update_firmware: MLUpdate | None
 
         # HubMixin attributes: beware these are only
@@ -445,11 +449,11 @@ class Device(BaseDevice, ConfigEntryManager):
         "_queued_cloudpoll_requests",
         "multiple_max",
         "_multiple_requests",
-        "_multiple_response_size",
         "_timezone_next_check",
         "_trace_ability_callback_unsub",
         "_diagnostics_build",
         "sensor_protocol",
+        "sensor_http_stats",
         "update_firmware",
         # Hub slots
         "subdevices",
@@ -524,6 +528,7 @@ class Device(BaseDevice, ConfigEntryManager):
         )
 
         self.sensor_protocol = ProtocolSensor(self)
+        self.sensor_http_stats = None
         self.update_firmware = None
         MLPersistentButton(
             self,
@@ -679,6 +684,10 @@ class Device(BaseDevice, ConfigEntryManager):
 
     async def async_create_diagnostic_entities(self):
         self._diagnostics_build = True  # set a flag cause we'll lazy scan/build
+        if (self.conf_protocol is not CONF_PROTOCOL_MQTT) and (
+            not self.sensor_http_stats
+        ):
+            self.sensor_http_stats = HttpStatsSensor(self)
         await super().async_create_diagnostic_entities()
 
     async def async_destroy_diagnostic_entities(self, remove: bool = False):
@@ -689,6 +698,7 @@ class Device(BaseDevice, ConfigEntryManager):
                 is NamespaceHandler.async_poll_diagnostic
             ):
                 namespace_handler.polling_strategy = None
+        self.sensor_http_stats = None
         await super().async_destroy_diagnostic_entities(remove)
 
     def get_logger_name(self) -> str:
@@ -856,6 +866,11 @@ class Device(BaseDevice, ConfigEntryManager):
                 "mqtt_connected": bool(self._mqtt_connected),
                 "mqtt_publish": bool(self._mqtt_publish),
                 "mqtt_active": bool(self._mqtt_active),
+                "rate_limit": (
+                    self._mqtt_connection.get_rl_stats(self.id)
+                    if self._mqtt_connection
+                    else None
+                ),
             },
             "HTTP": {
                 "http": bool(self._http),
@@ -871,6 +886,8 @@ class Device(BaseDevice, ConfigEntryManager):
                         else handler.lastpush
                     ),
                     "polling_epoch_next": handler.polling_epoch_next,
+                    "polling_period_scale": handler.polling_period_scale,
+                    "parsers_suppressed": handler.parsers_suppressed,
                     "polling_strategy": (
                         handler.polling_strategy.__name__
                         if handler.polling_strategy
@@ -913,6 +930,7 @@ class Device(BaseDevice, ConfigEntryManager):
         self.digest_pollers = None  # type: ignore
         self._lazypoll_requests = None  # type: ignore
         self.sensor_protocol = None  # type: ignore
+        self.sensor_http_stats = None
         self.update_firmware = None
         self.api.devices[self.id] = None
 
@@ -1018,6 +1036,8 @@ class Device(BaseDevice, ConfigEntryManager):
         self.device_debug = None
         for handler in self.namespace_handlers.values():
             handler.polling_epoch_next = 0.0
+            handler.polling_period_scale = 1.0
+            handler.parsers_payloads.clear()
 
     def get_type(self) -> mlc.DeviceType:
         return mlc.DeviceType.DEVICE
@@ -1274,7 +1294,6 @@ class Device(BaseDevice, ConfigEntryManager):
     def disable_multiple(self):
         self.multiple_max = 0
         self._multiple_requests = None
-        self._multiple_response_size = 0
 
     def enable_multiple(self):
         if not self.multiple_max:
@@ -1282,7 +1301,6 @@ class Device(BaseDevice, ConfigEntryManager):
                 mn.Appliance_Control_Multiple.name, {}
             ).get("maxCmdNum", 0)
             self._multiple_requests = []
-            self._multiple_response_size = PARAM_HEADER_SIZE
 
     async def async_multiple_requests_ack(
         self, requests: "Collection[MerossRequestType]", auto_handle: bool = True
@@ -1323,72 +1341,129 @@ class Device(BaseDevice, ConfigEntryManager):
                 return multiple_responses
             return multiple_response[mc.KEY_PAYLOAD][mc.KEY_MULTIPLE]
 
-    async def _async_multiple_requests_flush(self):
-        assert self._multiple_requests
-        multiple_requests = self._multiple_requests
-        multiple_response_size = self._multiple_response_size
-        self._multiple_requests = []
-        self._multiple_response_size = PARAM_HEADER_SIZE
-
-        requests_len = len(multiple_requests)
-        while self.online and requests_len:
-            lazypoll_requests = self._lazypoll_requests
-            while (requests_len < self.multiple_max) and lazypoll_requests:
-                # we have space available in current ns_multiple and lazy pollers are waiting
-                for handler in lazypoll_requests:
-                    # lazy pollers are ordered by 'oldest polled first' so
-                    # the first is the one which hasn't been polled since longer
-                    # we then decide to add to the current ns_multiple the first that would fit in
-                    if (
-                        handler.polling_response_size + multiple_response_size
-                    ) < self.device_response_size_max:
+    def _multiple_requests_pack(self, requests: "list[MultipleRequestType]"):
+        """Packs the requests in as few ns_multiple as possible given the device limits
+        (maxCmdNum and device_response_size_max). These requests are all due so they're
+        packed first (first-fit decreasing on the expected response size). Lazy pollers
+        then fill the space left, earliest deadline first: those which don't fit will
+        wait for a later polling cycle. Returns a list of [expected_size, requests]."""
+        multiple_max = self.multiple_max
+        response_size_max = self.device_response_size_max
+        batches: list[list] = []
+        for request in sorted(requests, key=lambda _request: _request[1], reverse=True):
+            for batch in batches:
+                if (len(batch[1]) < multiple_max) and (
+                    batch[0] + request[1] < response_size_max
+                ):
+                    batch[0] += request[1]
+                    batch[1].append(request)
+                    break
+            else:
+                batches.append([PARAM_HEADER_SIZE + request[1], [request]])
+
+        lazypoll_requests = self._lazypoll_requests
+        if batches and lazypoll_requests:
+            lazypoll_requests.sort(key=lambda _handler: _handler.polling_epoch_next)
+            for handler in list(lazypoll_requests):
+                response_size = handler.polling_response_size
+                for batch in batches:
+                    if (len(batch[1]) < multiple_max) and (
+                        batch[0] + response_size < response_size_max
+                    ):
                         handler.lastrequest = self._polling_epoch
                         handler.polling_epoch_next = (
-                            handler.lastrequest + handler.polling_period
+                            handler.lastrequest
+                            + handler.polling_period * handler.polling_period_scale
                         )
-                        multiple_requests.append(handler.polling_request)
+                        batch[0] += response_size
+                        batch[1].append((handler.polling_request, response_size))
                         lazypoll_requests.remove(handler)
-                        multiple_response_size += handler.polling_response_size
-                        requests_len += 1
-                        # check if we can add more
-                        break  # for
-                else:
-                    # no lazy_poller could match..break out of while
-                    break  # while
+                        break
+        return batches
+
+    def _handle_multiple_response(
+        self,
+        message: "MerossMessageType",
+        expected_size: int,
+        size_ratio: float,
+    ):
+        header = message[mc.KEY_HEADER]
+        self._handle(header, message[mc.KEY_PAYLOAD])
+        if (
+            size_ratio
+            and expected_size
+            and (header[mc.KEY_METHOD] == mc.METHOD_GETACK)
+        ):
+            self.namespace_handlers[
+                header[mc.KEY_NAMESPACE]
+            ].polling_response_size_observe(int(expected_size * size_ratio))
+
+    async def _async_request_poll_single(self, request: "MerossRequestType", /):
+        """Issues a polling request on its own, learning the response size
+        from the reply."""
+        if (response := await self.async_request(*request)) and (
+            response[mc.KEY_HEADER][mc.KEY_METHOD] == mc.METHOD_GETACK
+        ):
+            self.namespace_handlers[request[0]].polling_response_size_observe(
+                len(response.json())
+            )
+
+    async def _async_multiple_requests_flush(self):
+        assert self._multiple_requests
+        pending_requests = self._multiple_requests
+        self._multiple_requests = []
 
-            if requests_len == 1:
-                await self.async_request(*multiple_requests[0])
+        repack_count = 0
+        while self.online and pending_requests:
+            if repack_count > mlc.PARAM_MULTIPLE_REPACK_MAX:
+                # the device keeps failing our ns_multiple so we're
+                # giving up packing for this cycle
+                for request in pending_requests:
+                    await self._async_request_poll_single(request[0])
+                    if not self.online:
+                        break
                 return
+            batches = self._multiple_requests_pack(pending_requests)
+            pending_requests = []
+            for multiple_response_size, multiple_requests in batches:
+                if not self.online:
+                    return
+                requests_len = len(multiple_requests)
+                if requests_len == 1:
+                    await self._async_request_poll_single(multiple_requests[0][0])
+                    continue
 
-            if not (
-                response := await self.async_request_ack(
-                    mn.Appliance_Control_Multiple.name,
-                    mc.METHOD_SET,
-                    {
-                        mn.Appliance_Control_Multiple.key: [
-                            {
-                                mc.KEY_HEADER: {
-                                    mc.KEY_MESSAGEID: uuid4().hex,
-                                    mc.KEY_METHOD: request[1],
-                                    mc.KEY_NAMESPACE: request[0],
-                                },
-                                mc.KEY_PAYLOAD: request[2],
-                            }
-                            for request in multiple_requests
-                        ]
-                    },
-                )
-            ):
-                # the ns_multiple failed but the reason could be the device
-                # did overflow somehow. I've seen 2 kind of errors so far on the
-                # HTTP client: typically the device returns an incomplete json
-                # and this is partly recovered in our http interface. One(old)
-                # bulb (msl120) instead completely disconnects (ServerDisconnectedException
-                # in http client) and so we get here with no response. The same
-                # msl bulb timeouts completely on MQTT, so the response to our mqtt requests
-                # is None again. At this point, if the device is still online we're
-                # trying a last resort issue of single requests
-                if self.online:
+                if not (
+                    response := await self.async_request_ack(
+                        mn.Appliance_Control_Multiple.name,
+                        mc.METHOD_SET,
+                        {
+                            mn.Appliance_Control_Multiple.key: [
+                                {
+                                    mc.KEY_HEADER: {
+                                        mc.KEY_MESSAGEID: uuid4().hex,
+                                        mc.KEY_METHOD: request[0][1],
+                                        mc.KEY_NAMESPACE: request[0][0],
+                                    },
+                                    mc.KEY_PAYLOAD: request[0][2],
+                                }
+                                for request in multiple_requests
+                            ]
+                        },
+                    )
+                ):
+                    # the ns_multiple failed but the reason could be the device
+                    # did overflow somehow. I've seen 2 kind of errors so far on the
+                    # HTTP client: typically the device returns an incomplete json
+                    # and this is partly recovered in our http interface. One(old)
+                    # bulb (msl120) instead completely disconnects (ServerDisconnectedException
+                    # in http client) and so we get here with no response. The same
+                    # msl bulb timeouts completely on MQTT, so the response to our mqtt requests
+                    # is None again. At this point, if the device is still online we're
+                    # lowering the size limit and repacking these requests in smaller
+                    # ns_multiple(s) (falling back to single requests only if this keeps failing)
+                    if not self.online:
+                        return
                     self.log(
                         self.DEBUG,
                         "Appliance.Control.Multiple failed with no response: requests=%d expected size=%d",
@@ -1398,74 +1473,95 @@ class Device(BaseDevice, ConfigEntryManager):
                     # Here we reduce the device_response_size_max so that
                     # next ns_multiple will be less demanding. device_response_size_min
                     # is another dynamic param representing the biggest payload ever received
-                    self.device_response_size_max = (
-                        self.device_response_size_max + self.device_response_size_min
-                    ) / 2
+                    # so we never go below that.
+                    if multiple_response_size > self.device_response_size_min:
+                        self.device_response_size_max = (
+                            min(self.device_response_size_max, multiple_response_size)
+                            + self.device_response_size_min
+                        ) / 2
+                        self.log(
+                            self.DEBUG,
+                            "Updating device_response_size_max:%d",
+                            self.device_response_size_max,
+                        )
+                        pending_requests += multiple_requests
+                    else:
+                        # the ns_multiple was already small enough so the failure
+                        # is likely not related to its size: go one-by-one
+                        for request in multiple_requests:
+                            await self._async_request_poll_single(request[0])
+                            if not self.online:
+                                return
+                    continue
+
+                multiple_responses = response[mc.KEY_PAYLOAD][mc.KEY_MULTIPLE]
+                responses_len = len(multiple_responses)
+                response_size = len(response.json())
+                if self.isEnabledFor(self.DEBUG):
                     self.log(
                         self.DEBUG,
-                        "Updating device_response_size_max:%d",
-                        self.device_response_size_max,
-                    )
-                    for request in multiple_requests:
-                        await self.async_request(*request)
-                        if not self.online:
-                            break
-                return
-
-            multiple_responses = response[mc.KEY_PAYLOAD][mc.KEY_MULTIPLE]
-            responses_len = len(multiple_responses)
-            if self.isEnabledFor(self.DEBUG):
-                self.log(
-                    self.DEBUG,
-                    "Appliance.Control.Multiple requests=%d (responses=%d) expected size=%d (actual=%d)",
-                    requests_len,
-                    responses_len,
-                    multiple_response_size,
-                    len(response.json()),
-                )
-            message: "MerossMessageType"
-            if responses_len == requests_len:
-                # faster shortcut
-                for message in multiple_responses:
-                    self._handle(
-                        message[mc.KEY_HEADER],
-                        message[mc.KEY_PAYLOAD],
+                        "Appliance.Control.Multiple requests=%d (responses=%d) expected size=%d (actual=%d)",
+                        requests_len,
+                        responses_len,
+                        multiple_response_size,
+                        response_size,
                     )
-                return
-            elif responses_len:
-                # the requests payload was too big and the response was
-                # truncated. the http client tried to 'recover' by discarding
-                # the incomplete payloads so we'll check what's missing
-                for message in multiple_responses:
-                    m_header = message[mc.KEY_HEADER]
-                    self._handle(
-                        m_header,
-                        message[mc.KEY_PAYLOAD],
+                if not responses_len:
+                    # no response at all..this is pathological but we have
+                    # examples (#526) of this so we'll just try issue single requests
+                    self.log(
+                        self.WARNING,
+                        "Appliance.Control.Multiple empty response (requests=%d expected size=%d)",
+                        requests_len,
+                        multiple_response_size,
+                        timeout=14400,
                     )
-                    namespace = m_header[mc.KEY_NAMESPACE]
                     for request in multiple_requests:
-                        if request[0] == namespace:
-                            multiple_requests.remove(request)
-                            break
-                # and re-issue the missing ones
-                requests_len = len(multiple_requests)
-                multiple_response_size = -1  # logging purpose
-                continue
-            else:
-                # no response at all..this is pathological but we have
-                # examples (#526) of this so we'll just try issue single requests
-                self.log(
-                    self.WARNING,
-                    "Appliance.Control.Multiple empty response (requests=%d expected size=%d)",
-                    requests_len,
-                    multiple_response_size,
-                    timeout=14400,
+                        await self._async_request_poll_single(request[0])
+                        if not self.online:
+                            return
+                    continue
+                # responses come in the same order as the requests so they're
+                # paired by position (the same namespace could be requested more
+                # than once, e.g. chunked hub requests)
+                message: "MerossMessageType"
+                if responses_len == requests_len:
+                    # faster shortcut
+                    paired_responses = [
+                        (message, request[1])
+                        for message, request in zip(
+                            multiple_responses, multiple_requests
+                        )
+                    ]
+                else:
+                    # the requests payload was too big and the response was
+                    # truncated. the http client tried to 'recover' by discarding
+                    # the incomplete payloads (and lowering device_response_size_max)
+                    # so we'll check what's missing and repack it
+                    paired_responses = []
+                    requests_iter = iter(multiple_requests)
+                    for message in multiple_responses:
+                        namespace = message[mc.KEY_HEADER][mc.KEY_NAMESPACE]
+                        for request in requests_iter:
+                            if request[0][0] == namespace:
+                                paired_responses.append((message, request[1]))
+                                break
+                            pending_requests.append(request)
+                        else:
+                            paired_responses.append((message, 0))
+                    pending_requests += requests_iter
+                # rather than serializing every single response again, their sizes
+                # are estimated by splitting the actual size of the ns_multiple
+                # proportionally to the expected ones
+                expected_size = sum(pair[1] for pair in paired_responses)
+                size_ratio = (
+                    (response_size - PARAM_HEADER_SIZE) / expected_size
+                    if expected_size
+                    else 0
                 )
-                for request in multiple_requests:
-                    await self.async_request(*request)
-                    if not self.online:
-                        break
-                return
+                for message, message_size in paired_responses:
+                    self._handle_multiple_response(message, message_size, size_ratio)
+            repack_count += 1
 
     async def async_mqtt_request_raw(
         self,
@@ -1534,7 +1630,14 @@ class Device(BaseDevice, ConfigEntryManager):
             ConfigEntryManager.TRACE_TX,
         )
         try:
-            response = await http.async_request_raw(request.json())
+            response = await http.async_request_raw(
+                request.json(),
+                (
+                    (request.namespace, json_dumps(request.payload))
+                    if request.method == mc.METHOD_GET
+                    else None
+                ),
+            )
         except TerminatedException:
             return None
         except JSONDecodeError as jsonerror:
@@ -1639,34 +1742,24 @@ class Device(BaseDevice, ConfigEntryManager):
 
     async def async_request_poll(self, handler: NamespaceHandler):
         handler.lastrequest = self._polling_epoch
-        handler.polling_epoch_next = handler.lastrequest + handler.polling_period
+        handler.polling_epoch_next = (
+            handler.lastrequest + handler.polling_period * handler.polling_period_scale
+        )
         if (self._multiple_requests is None) or (
-            handler.polling_response_size >= self.device_response_size_max
+            handler.polling_response_size + PARAM_HEADER_SIZE
+            >= self.device_response_size_max
         ):
             # multiple requests are disabled
             # or this request alone would overflow the device response size limit
-            await self.async_request(*handler.polling_request)
+            await self._async_request_poll_single(handler.polling_request)
             return
-        # estimate the size of the multiple response
-        multiple_response_size = (
-            self._multiple_response_size + handler.polling_response_size
+        # queue the request: these will be packed altogether at the end
+        # of the polling cycle (see _async_multiple_requests_flush).
+        # We're saving the request itself (and not the handler) since some
+        # handlers (see hub chunked polling) issue more requests per cycle
+        self._multiple_requests.append(
+            (handler.polling_request, handler.polling_response_size)
         )
-        if multiple_response_size > self.device_response_size_max:
-            # this request (together with already previously packed)
-            # would overflow the device response size limit
-            if not self._multiple_requests:
-                # again this request alone would overflow the device response size limit
-                await self.async_request(*handler.polling_request)
-                return
-            # flush the pending multiple requests
-            await self._async_multiple_requests_flush()
-            multiple_response_size = (
-                self._multiple_response_size + handler.polling_response_size
-            )
-        self._multiple_requests.append(handler.polling_request)
-        self._multiple_response_size = multiple_response_size
-        if len(self._multiple_requests) >= self.multiple_max:
-            await self._async_multiple_requests_flush()
 
     async def async_request_smartpoll(
         self,
@@ -1722,6 +1815,9 @@ class Device(BaseDevice, ConfigEntryManager):
         if self._multiple_requests:
             await self._async_multiple_requests_flush()
 
+        if (sensor_http_stats := self.sensor_http_stats) and (_http := self._http):
+            sensor_http_stats.update_stats(_http.http_host.get_stats())
+
         # when create_diagnostic_entities is True, after onlining we'll dynamically
         # scan the abilities to look for 'unknown' namespaces (kind of like tracing)
         # and try to build diagnostic entitities out of that
@@ -2119,6 +2215,10 @@ class Device(BaseDevice, ConfigEntryManager):
                     header[mc.KEY_NAMESPACE],
                 )
 
+        if header[mc.KEY_METHOD] == mc.METHOD_SETACK:
+            # see _handle: checking here saves decoding the payload
+            # of lazy (MQTT) messages
+            return
         return self._handle(header, message[mc.KEY_PAYLOAD])
 
     def _handle(
@@ -2175,7 +2275,10 @@ class Device(BaseDevice, ConfigEntryManager):
             )
 
         handler.lastresponse = self.lastresponse
-        handler.polling_epoch_next = handler.lastresponse + handler.polling_period
+        handler.polling_adapt(payload)
+        handler.polling_epoch_next = (
+            handler.lastresponse + handler.polling_period * handler.polling_period_scale
+        )
         if method == mc.METHOD_PUSH:
             # we're saving for diagnostic purposes so we have knowledge of
             # which data the device pushes asynchronously
@@ -83,6 +83,9 @@ class MLEntity(NamespaceParser, Loggable, entity.Entity if TYPE_CHECKING else ob
         """Tells if this entity has been created as part of the 'create_diagnostic_entities' config"""
 
         state_callbacks: set[StateCallback] | None
+        state_flushes: int
+        """Incremented whenever this entity flushes its state
+        (see NamespaceParser.state_flushes)."""
         # These 'placeholder' definitions support generalization of
         # Meross protocol message build/parsing when related to the
         # current entity. These are usually relevant when this entity
@@ -150,6 +153,7 @@ class MLEntity(NamespaceParser, Loggable, entity.Entity if TYPE_CHECKING else ob
         "channel",
         "entitykey",
         "state_callbacks",
+        "state_flushes",
         "hass_connected",
         # HA core
         "available",
@@ -204,6 +208,7 @@ class MLEntity(NamespaceParser, Loggable, entity.Entity if TYPE_CHECKING else ob
             self.state_callbacks.add(kwargs.pop("state_callback"))
         else:
             self.state_callbacks = None
+        self.state_flushes = 0
         self.hass_connected = False
 
         self.entity_id = entity.Entity.entity_id
@@ -271,6 +276,8 @@ class MLEntity(NamespaceParser, Loggable, entity.Entity if TYPE_CHECKING else ob
 
     def flush_state(self):
         """Actually commits a state change to HA."""
+        self.state_flushes += 1
+        self.manager.state_flushes += 1
         if self.state_callbacks:
             for state_callback in self.state_callbacks:
                 state_callback()
@@ -29,9 +29,9 @@ from .obfuscate import (
     obfuscated_any,
     obfuscated_dict,
 )
+from .trace import TraceRecorder
 
 if TYPE_CHECKING:
-    import io
     from types import MappingProxyType
     from typing import (
         Any,
@@ -79,6 +79,10 @@ class EntityManager(Loggable):
         deviceentry_id: Final[DeviceEntryIdType | None]
         platforms: PlatformsType  # init in derived
         entities: Final[dict[object, MLEntity]]
+        state_flushes: int
+        """Incremented whenever any of our entities flushes its state. SubDevice(s),
+        being both managers and parsers, use it as their
+        NamespaceParser.state_flushes."""
         _tasks: set[asyncio.Future]
         _issues: set[str]  # BEWARE: on demand attribute
 
@@ -98,13 +102,14 @@ class EntityManager(Loggable):
         "config_entry",
         "deviceentry_id",
         "entities",
+        "state_flushes",
         "platforms",
         "config",
         "key",
         "obfuscate",
         "_tasks",
         "_issues",
-        "_trace_file",
+        "_trace_recorder",
         "_trace_future",
         "_trace_data",
         "_unsub_trace_endtime",
@@ -118,6 +123,7 @@ class EntityManager(Loggable):
         self.config_entry = kwargs.get("config_entry")
         self.deviceentry_id = kwargs.get("deviceentry_id")
         self.entities = {}
+        self.state_flushes = 0
         self._tasks = set()
         super().__init__(id, **kwargs)
 
@@ -263,7 +269,7 @@ class ConfigEntryManager(EntityManager):
         config: Mapping[str, Any]
         key: str
         logger: logging.Logger
-        _trace_file: io.TextIOWrapper | None
+        _trace_recorder: TraceRecorder | None
         _trace_future: asyncio.Future | None
         _trace_data: list | None
         _unsub_trace_endtime: asyncio.TimerHandle | None
@@ -300,7 +306,7 @@ class ConfigEntryManager(EntityManager):
         # during the corresponding platform async_setup_entry so to be able
         # to dynamically add more entities should they 'pop-up' (Hub only?)
         self.platforms = self.DEFAULT_PLATFORMS.copy()
-        self._trace_file = None
+        self._trace_recorder = None
         self._trace_future = None
         self._trace_data = None
         self._unsub_trace_endtime = None
@@ -486,7 +492,7 @@ class ConfigEntryManager(EntityManager):
 
     @property
     def is_tracing(self):
-        return self._trace_file or self._trace_data
+        return self._trace_recorder or self._trace_data
 
     async def async_trace_open(self, p_trace_data: dict | None = None, /):
         """
@@ -506,7 +512,7 @@ class ConfigEntryManager(EntityManager):
                     "custom_components", DOMAIN, mlc.CONF_TRACE_DIRECTORY
                 )
                 os.makedirs(tracedir, exist_ok=True)
-                return open(
+                _t = open(
                     os.path.join(
                         tracedir,
                         f"{strftime('%Y-%m-%d_%H-%M-%S', localtime(epoch))}_{self.logtag}.csv",
@@ -514,8 +520,18 @@ class ConfigEntryManager(EntityManager):
                     mode="w",
                     encoding="utf8",
                 )
+                if p_trace_data is not None:
+                    _t.write("\t".join(mlc.CONF_TRACE_COLUMNS) + "\r\n")
+                return _t
 
-            self._trace_file = _t = await hass.async_add_executor_job(_trace_open)
+            def _trace_error_callback(exception: Exception):
+                self.trace_close(exception, "writing file")
+
+            self._trace_recorder = _t = TraceRecorder(
+                hass,
+                await hass.async_add_executor_job(_trace_open),
+                _trace_error_callback,
+            )
 
             @callback
             def _trace_close_callback():
@@ -533,7 +549,6 @@ class ConfigEntryManager(EntityManager):
                 # output a 'debug trace' and not a 'diagnostic'. We'll
                 # then add here the same data that are usually output
                 # to the diagnostics platform.
-                _t.write("\t".join(mlc.CONF_TRACE_COLUMNS) + "\r\n")
                 self.trace(
                     epoch,
                     {
@@ -548,7 +563,7 @@ class ConfigEntryManager(EntityManager):
             self._trace_opened(epoch)
             pn.async_create(
                 self.hass,
-                f"Device: {self.name}\nFile: {_t.name}",  # type: ignore
+                f"Device: {self.name}\nFile: {_t.name}",
                 "meross_lan tracing started",
                 f"{DOMAIN}.{self.id}.tracing",
             )
@@ -567,15 +582,11 @@ class ConfigEntryManager(EntityManager):
         self, exception: Exception | None = None, error_context: str | None = None
     ):
         notify_message = "Data not available"
-        if self._trace_file:
-            try:
-                notify_message = f"Data available in {self._trace_file.name}"
-                self._trace_file.close()
-            except Exception as e:
-                if not exception:
-                    exception = e
-                    error_context = "closing file"
-            self._trace_file = None
+        if self._trace_recorder:
+            # pending rows will be written (and the file closed) in the executor
+            notify_message = f"Data available in {self._trace_recorder.name}"
+            self._trace_recorder.close()
+            self._trace_recorder = None
             self.log(self.DEBUG, "Tracing end")
 
         if self._unsub_trace_endtime:
@@ -617,22 +628,21 @@ class ConfigEntryManager(EntityManager):
         """
         try:
             data = self.loggable_dict(payload)
-            columns = [
-                strftime("%Y/%m/%d - %H:%M:%S", localtime(epoch)),
-                rxtx,
-                protocol,
-                method,
-                namespace,
-                data,
-            ]
             if self._trace_data:
-                self._trace_data.append(columns)
-            if self._trace_file:
-                columns[5] = json_dumps(data)
-                self._trace_file.write("\t".join(columns) + "\r\n")
-                columns[5] = data  # restore the (eventual) _trace_data ref
-                if self._trace_file.tell() > mlc.CONF_TRACE_MAXSIZE:
-                    self.trace_close()
+                self._trace_data.append(
+                    [
+                        strftime("%Y/%m/%d - %H:%M:%S", localtime(epoch)),
+                        rxtx,
+                        protocol,
+                        method,
+                        namespace,
+                        data,
+                    ]
+                )
+            if self._trace_recorder and not self._trace_recorder.append(
+                epoch, rxtx, protocol, method, namespace, json_dumps(data)
+            ):
+                self.trace_close()
 
         except Exception as exception:
             self.trace_close(exception, "appending data")
@@ -643,21 +653,25 @@ class ConfigEntryManager(EntityManager):
         msg: str,
     ):
         try:
-            columns = [
-                strftime("%Y/%m/%d - %H:%M:%S", localtime(time())),
-                "",  # rxtx
-                CONF_PROTOCOL_AUTO,  # protocol
-                "LOG",  # method
-                mlc.CONF_LOGGING_LEVEL_OPTIONS.get(level)
-                or logging.getLevelName(level),  # namespace
-                msg,  # data
-            ]
+            epoch = time()
+            level_name = mlc.CONF_LOGGING_LEVEL_OPTIONS.get(
+                level
+            ) or logging.getLevelName(level)
             if self._trace_data:
-                self._trace_data.append(columns)
-            if self._trace_file:
-                self._trace_file.write("\t".join(columns) + "\r\n")
-                if self._trace_file.tell() > mlc.CONF_TRACE_MAXSIZE:
-                    self.trace_close()
+                self._trace_data.append(
+                    [
+                        strftime("%Y/%m/%d - %H:%M:%S", localtime(epoch)),
+                        "",  # rxtx
+                        CONF_PROTOCOL_AUTO,  # protocol
+                        "LOG",  # method
+                        level_name,  # namespace
+                        msg,  # data
+                    ]
+                )
+            if self._trace_recorder and not self._trace_recorder.append(
+                epoch, "", CONF_PROTOCOL_AUTO, "LOG", level_name, msg
+            ):
+                self.trace_close()
 
         except Exception as exception:
             self.trace_close(exception, "appending log")
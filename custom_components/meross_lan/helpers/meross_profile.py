@@ -68,6 +68,8 @@ class MerossMQTTConnection(MQTTConnection, MerossMQTTAppClient):
         "_lock_state",
         "_lock_queue",
         "_rl_dropped",
+        "_rl_queued",
+        "_rl_coalesced",
         "_rl2_queues",
         "_stateext",
         "_subscribe_topics",
@@ -128,14 +130,15 @@ class MerossMQTTConnection(MQTTConnection, MerossMQTTAppClient):
     def get_rl_safe_delay(self, uuid: str):
         return MerossMQTTAppClient.get_rl_safe_delay(self, uuid)
 
+    def get_rl_stats(self, uuid: str):
+        return MerossMQTTAppClient.get_rl_stats(self, uuid)
+
     async def _async_mqtt_publish(
         self,
         device_id: str,
         request: "MerossMessage",
     ):
-        return await self.profile.hass.async_add_executor_job(
-            self.rl_publish, device_id, request
-        )
+        return await self.async_rl_publish(device_id, request)
 
     @callback
     def _mqtt_connected(self):
@@ -147,6 +150,8 @@ class MerossMQTTConnection(MQTTConnection, MerossMQTTAppClient):
         if sensor_connection := self.sensor_connection:
             attrs = sensor_connection.extra_state_attributes
             attrs[ConnectionSensor.ATTR_DROPPED] = self.rl_dropped
+            attrs[ConnectionSensor.ATTR_QUEUED] = self.rl_queued
+            attrs[ConnectionSensor.ATTR_COALESCED] = self.rl_coalesced
             attrs[ConnectionSensor.ATTR_PUBLISHED] += 1
             if self.mqtt_is_connected:
                 # enforce the state eventually cancelling queued, dropped...
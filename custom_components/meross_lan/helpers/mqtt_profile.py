@@ -18,9 +18,13 @@ from ..merossclient import (
     HostAddress,
     json_dumps,
 )
-from ..merossclient.mqttclient import MerossMQTTRateLimitException
+from ..merossclient.mqttclient import (
+    MerossMQTTCoalescedException,
+    MerossMQTTRateLimitException,
+)
 from ..merossclient.protocol import MerossKeyError, const as mc, namespaces as mn
 from ..merossclient.protocol.message import (
+    MerossLazyResponse,
     MerossRequest,
     MerossResponse,
     check_message_strict,
@@ -59,6 +63,8 @@ class ConnectionSensor(me.MEAlwaysAvailableMixin, MLDiagnosticSensor):
         ATTR_RECEIVED: Final
         ATTR_PUBLISHED: Final
         ATTR_DROPPED: Final
+        ATTR_QUEUED: Final
+        ATTR_COALESCED: Final
 
         manager: "MQTTProfile"
 
@@ -68,6 +74,8 @@ class ConnectionSensor(me.MEAlwaysAvailableMixin, MLDiagnosticSensor):
             received: int
             published: int
             dropped: int
+            queued: int
+            coalesced: int
 
         extra_state_attributes: AttrDictType
         native_value: str
@@ -81,6 +89,8 @@ class ConnectionSensor(me.MEAlwaysAvailableMixin, MLDiagnosticSensor):
     ATTR_RECEIVED = "received"
     ATTR_PUBLISHED = "published"
     ATTR_DROPPED = "dropped"
+    ATTR_QUEUED = "queued"
+    ATTR_COALESCED = "coalesced"
 
     # HA core entity attributes:
     _unrecorded_attributes = frozenset(
@@ -89,6 +99,8 @@ class ConnectionSensor(me.MEAlwaysAvailableMixin, MLDiagnosticSensor):
             ATTR_RECEIVED,
             ATTR_PUBLISHED,
             ATTR_DROPPED,
+            ATTR_QUEUED,
+            ATTR_COALESCED,
             *MLDiagnosticSensor._unrecorded_attributes,
         }
     )
@@ -110,6 +122,8 @@ class ConnectionSensor(me.MEAlwaysAvailableMixin, MLDiagnosticSensor):
             ConnectionSensor.ATTR_RECEIVED: 0,
             ConnectionSensor.ATTR_PUBLISHED: 0,
             ConnectionSensor.ATTR_DROPPED: 0,
+            ConnectionSensor.ATTR_QUEUED: 0,
+            ConnectionSensor.ATTR_COALESCED: 0,
         }
         super().__init__(
             connection.profile,
@@ -313,6 +327,10 @@ class MQTTConnection(Loggable):
     def get_rl_safe_delay(self, uuid: str):
         raise NotImplementedError()
 
+    def get_rl_stats(self, uuid: str) -> dict | None:
+        """Publish rate-limiter counters for the device (if any)."""
+        return None
+
     @property
     def mqtt_is_connected(self):
         return self._mqtt_is_connected
@@ -383,6 +401,17 @@ class MQTTConnection(Loggable):
                     self._mqtt_transactions.pop(transaction.messageid, None)
             return None
 
+        except MerossMQTTCoalescedException:
+            # a newer SET for the same namespace/channel has been queued
+            self.log(
+                self.DEBUG,
+                "MQTT publish %s %s (uuid:%s messageId:%s) superseded while rate-limited",
+                request.method,
+                request.namespace,
+                self.profile.loggable_device_id(device_id),
+                request.messageid,
+            )
+
         except MerossMQTTRateLimitException:
             if sensor_connection := self.sensor_connection:
                 sensor_connection.inc_counter_with_state(
@@ -420,7 +449,9 @@ class MQTTConnection(Loggable):
             if sensor_connection := self.sensor_connection:
                 sensor_connection.inc_counter(ConnectionSensor.ATTR_RECEIVED)
             mqtt_payload = mqtt_msg.payload
-            message = MerossResponse(
+            # only the header gets decoded here: the payload will be when
+            # (and if) the message is handled by a device or session handler
+            message = MerossLazyResponse(
                 mqtt_payload
                 if type(mqtt_payload) is str
                 else mqtt_payload.decode("utf-8")  # type: ignore
@@ -429,7 +460,6 @@ class MQTTConnection(Loggable):
             device_id = get_message_uuid(header)
             namespace = header[mc.KEY_NAMESPACE]
             messageid = header[mc.KEY_MESSAGEID]
-            payload = message[mc.KEY_PAYLOAD]
 
             profile = self.profile
             api = profile.api
@@ -447,7 +477,7 @@ class MQTTConnection(Loggable):
                 # implemented in the derived MQTTConnections
                 if namespace in self.namespace_handlers:
                     if await self.namespace_handlers[namespace](
-                        self, device_id, header, payload
+                        self, device_id, header, message[mc.KEY_PAYLOAD]
                     ):
                         # session management has already taken care of everything
                         return
@@ -2,11 +2,12 @@ import bisect
 from typing import TYPE_CHECKING
 
 from .. import const as mlc
+from ..merossclient import json_dumps
 from ..merossclient.protocol import const as mc, namespaces as mn
 from ..merossclient.protocol.message import check_message_strict
 
 if TYPE_CHECKING:
-    from typing import Any, Callable, Coroutine
+    from typing import Any, Callable, ClassVar, Coroutine
 
     from . import Loggable
     from ..merossclient.protocol import types as mt
@@ -15,7 +16,10 @@ if TYPE_CHECKING:
     from .entity import MLEntity
 
     type PollingStrategyFunc = Callable[["NamespaceHandler"], Coroutine]
-    type NamespaceConfigType = tuple[int, int, int, int, PollingStrategyFunc | None]
+    type NamespaceConfigType = (
+        tuple[int, int, int, int, PollingStrategyFunc | None]
+        | tuple[int, int, int, int, PollingStrategyFunc | None, bool]
+    )
 
 
 class EntityDisablerMixin:
@@ -50,10 +54,19 @@ class NamespaceParser(Loggable if TYPE_CHECKING else object):
         subId: object
 
         namespace_handlers: set["NamespaceHandler"]
+        state_flushes: int
+        """Counts the state flushes of the entities fed by this parser (the entity
+        itself or, for SubDevice(s), their own entities) so that NamespaceHandler knows
+        when a payload equal to the last one parsed still needs parsing."""
 
     # This set will be created x instance when linking the parser to the handler
     namespace_handlers = None  # type: ignore
 
+    parse_always: "ClassVar[bool]" = False
+    """Set in parsers whose _parse_xxxx need to be called on every message (for example
+    when they integrate readings over time or track transitions) so that NamespaceHandler
+    doesn't skip unchanged payloads (see NamespaceHandler._build_parse_changed)."""
+
     async def async_shutdown(self):
         if self.namespace_handlers:
             for handler in set(self.namespace_handlers):
@@ -110,15 +123,22 @@ class NamespaceHandler:
 
     if TYPE_CHECKING:
         parsers: dict[object, Callable[[dict], None]]
+        parsers_payloads: dict[object, tuple[dict, int]]
+        parsers_suppressed: int
         lastpush: dict | None
         polling_strategy: PollingStrategyFunc | None
         polling_request_channels: list[dict[str, Any]]
+        polling_adaptive: bool
+        polling_response_sizes: list[int]
+        polling_fingerprints: dict[object, int]
 
     __slots__ = (
         "device",
         "ns",
         "handler",
         "parsers",
+        "parsers_payloads",
+        "parsers_suppressed",
         "entity_class",
         "lastrequest",
         "lastresponse",
@@ -127,9 +147,13 @@ class NamespaceHandler:
         "polling_strategy",
         "polling_period",
         "polling_period_cloud",
+        "polling_period_scale",
+        "polling_adaptive",
+        "polling_fingerprints",
         "polling_response_base_size",
         "polling_response_item_size",
         "polling_response_size",
+        "polling_response_sizes",
         "polling_request",
         "polling_request_channels",
     )
@@ -156,6 +180,8 @@ class NamespaceHandler:
             device, f"_handle_{namespace.replace('.', '_')}", self._handle_undefined
         )
         self.parsers = {}
+        self.parsers_payloads = {}
+        self.parsers_suppressed = 0
         self.entity_class = None
         self.lastresponse = self.lastrequest = self.polling_epoch_next = 0.0
         self.lastpush = None
@@ -166,6 +192,7 @@ class NamespaceHandler:
             self.polling_response_base_size = _conf[2]
             self.polling_response_item_size = _conf[3]
             self.polling_strategy = _conf[4]
+            self.polling_adaptive = len(_conf) > 5 and _conf[5]  # type: ignore
         else:
             # these in turn are defaults for dynamically parsed
             # namespaces managed when using create_diagnostic_entities
@@ -174,12 +201,17 @@ class NamespaceHandler:
             self.polling_response_base_size = mlc.PARAM_HEADER_SIZE
             self.polling_response_item_size = 0
             self.polling_strategy = None
+            # diagnostic only: stretching is harmless
+            self.polling_adaptive = True
 
         # by default we calculate 1 item/channel per payload but we should
         # refine this whenever needed
         self.polling_response_size = (
             self.polling_response_base_size + self.polling_response_item_size
         )
+        self.polling_response_sizes = []
+        self.polling_period_scale = 1.0
+        self.polling_fingerprints = {}
         self.polling_request_channels = []
         self.polling_request_configure(None)
         device.namespace_handlers[namespace] = self
@@ -238,6 +270,7 @@ class NamespaceHandler:
         if extra:
             channel_payload.update(extra)
 
+        self.polling_response_sizes.clear()
         self.polling_response_size = (
             self.polling_response_base_size
             + len(polling_request_channels) * self.polling_response_item_size
@@ -249,6 +282,7 @@ class NamespaceHandler:
             mc.METHOD_GET,
             {self.ns.key: payload},
         )
+        self.polling_response_sizes.clear()
         self.polling_response_size = (
             self.polling_response_base_size
             + self.polling_response_item_size
@@ -256,14 +290,56 @@ class NamespaceHandler:
         )
 
     def polling_response_size_adj(self, item_count: int, /):
+        self.polling_response_sizes.clear()
         self.polling_response_size = (
             self.polling_response_base_size
             + item_count * self.polling_response_item_size
         )
 
     def polling_response_size_inc(self):
+        self.polling_response_sizes.clear()
         self.polling_response_size += self.polling_response_item_size
 
+    def polling_response_size_observe(self, size: int, /):
+        """Refines the polling_response_size estimate with the size of an actual
+        response. The estimate is the biggest of the last PARAM_RESPONSE_SIZE_SAMPLES
+        responses so that ns_multiple packing stays on the safe side when payloads
+        fluctuate. Any change in the polling request structure (see
+        polling_request_add_channel and the like) resets the learned sizes."""
+        polling_response_sizes = self.polling_response_sizes
+        polling_response_sizes.append(size)
+        if len(polling_response_sizes) > mlc.PARAM_RESPONSE_SIZE_SAMPLES:
+            del polling_response_sizes[0]
+        self.polling_response_size = max(polling_response_sizes)
+
+    def polling_adapt(self, payload: "mt.MerossPayloadType", /):
+        """Adaptive polling: for namespaces opting in (polling_adaptive, set by the
+        6th item in POLLING_STRATEGY_CONF) we fingerprint every channel item in the
+        payload and, as long as none of them changes, we stretch the polling period
+        (through polling_period_scale) up to PARAM_POLLING_ADAPTIVE_SCALE_MAX times.
+        Any change restores the configured period.
+        Items are tracked per channel so that chunked (hub) requests are compared
+        against the same subdevices' previous state."""
+        if not (self.polling_adaptive and self.polling_strategy):
+            return
+        p_value = payload.get(self.ns.key, payload)
+        key_channel = self.ns.key_channel
+        fingerprints = self.polling_fingerprints
+        changed = False
+        for p_item in p_value if type(p_value) is list else (p_value,):
+            channel = p_item.get(key_channel) if type(p_item) is dict else None
+            fingerprint = hash(json_dumps(p_item))
+            if fingerprints.get(channel) != fingerprint:
+                fingerprints[channel] = fingerprint
+                changed = True
+        if changed:
+            self.polling_period_scale = 1.0
+        elif self.polling_period_scale < mlc.PARAM_POLLING_ADAPTIVE_SCALE_MAX:
+            self.polling_period_scale = min(
+                self.polling_period_scale * mlc.PARAM_POLLING_ADAPTIVE_SCALE_STEP,
+                mlc.PARAM_POLLING_ADAPTIVE_SCALE_MAX,
+            )
+
     def register_entity_class(
         self,
         entity_class: type["MLEntity"],
@@ -312,7 +388,14 @@ class NamespaceHandler:
         ns = self.ns
         channel = getattr(parser, ns.key_channel)
         assert channel not in self.parsers, "parser already registered"
-        self.parsers[channel] = getattr(parser, f"_parse_{ns.slug}", parser._parse)
+        _parse = getattr(parser, f"_parse_{ns.slug}", parser._parse)
+        self.parsers[channel] = (
+            _parse
+            if parser.parse_always
+            # entities flush their state through their manager while
+            # SubDevice(s) (as parsers) are the managers themselves
+            else self._build_parse_changed(channel, _parse, parser)
+        )
         if not parser.namespace_handlers:
             parser.namespace_handlers = set()
         parser.namespace_handlers.add(self)
@@ -320,9 +403,41 @@ class NamespaceHandler:
         self.handler = self._handle_list
 
     def unregister(self, parser: "NamespaceParser", /):
-        if self.parsers.pop(getattr(parser, self.ns.key_channel), None):
+        channel = getattr(parser, self.ns.key_channel)
+        self.parsers_payloads.pop(channel, None)
+        if self.parsers.pop(channel, None):
             parser.namespace_handlers.remove(self)
 
+    def _build_parse_changed(
+        self,
+        channel: object,
+        _parse: "Callable[[dict], None]",
+        parser: "NamespaceParser",
+        /,
+    ):
+        """Wraps the parser registered for channel so that a (channel) payload equal
+        to the last one parsed is skipped. This is only safe as long as the parser state
+        has not been flushed in between since that state could come from an optimistic
+        update (after a SET), another namespace carrying the same information or the
+        device going offline: so we also keep track of parser.state_flushes and parse
+        again whenever it moved. The counter is per parser so that entities flushing on
+        every message (like the ElectricitySensor) don't defeat the skipping for the
+        other parsers of the device."""
+        parsers_payloads = self.parsers_payloads
+
+        def _parse_changed(p_channel: dict, /):
+            try:
+                last_payload, last_flushes = parsers_payloads[channel]
+                if last_flushes == parser.state_flushes and last_payload == p_channel:
+                    self.parsers_suppressed += 1
+                    return
+            except KeyError:
+                pass
+            _parse(p_channel)
+            parsers_payloads[channel] = (p_channel, parser.state_flushes)
+
+        return _parse_changed
+
     def handle_exception(self, exception: Exception, function_name: str, payload, /):
         device = self.device
         device.log_exception(
@@ -926,9 +1041,13 @@ The configuration is set in the tuple as:
     polling_period_cloud,
     response_base_size,
     response_item_size,
-    strategy
+    strategy,
+    adaptive (optional)
 )
 see the NamespaceHandler class for the meaning of these values
+'adaptive' opts the namespace into polling_adapt: only set it for namespaces carrying
+configuration-like data since measurements (electricity, energy consumption, sensors)
+would be reported late once their polling period is stretched.
 The 'response_size' is a conservative (in excess) estimate of the
 expected response size for the whole message (header itself weights around 300 bytes).
 Some payloads would depend on the number of channels/subdevices available
@@ -957,6 +1076,7 @@ POLLING_STRATEGY_CONF: dict[mn.Namespace, "NamespaceConfigType"] = {
         320,
         0,
         NamespaceHandler.async_poll_smart,
+        True,
     ),
     mn.Appliance_System_Runtime: (
         mlc.PARAM_SENSOR_SLOW_UPDATE_PERIOD,
@@ -964,6 +1084,7 @@ POLLING_STRATEGY_CONF: dict[mn.Namespace, "NamespaceConfigType"] = {
         330,
         0,
         NamespaceHandler.async_poll_smart,
+        True,
     ),
     mn.Appliance_Config_OverTemp: (
         mlc.PARAM_CONFIG_UPDATE_PERIOD,
@@ -971,6 +1092,7 @@ POLLING_STRATEGY_CONF: dict[mn.Namespace, "NamespaceConfigType"] = {
         340,
         0,
         NamespaceHandler.async_poll_smart,
+        True,
     ),
     mn.Appliance_Control_ConsumptionH: (
         mlc.PARAM_ENERGY_UPDATE_PERIOD,
@@ -1020,6 +1142,7 @@ POLLING_STRATEGY_CONF: dict[mn.Namespace, "NamespaceConfigType"] = {
         mlc.PARAM_HEADER_SIZE,
         35,
         NamespaceHandler.async_poll_smart,
+        True,
     ),
     mn.Appliance_Control_Light_Effect: (
         mlc.PARAM_CONFIG_UPDATE_PERIOD,
@@ -1027,6 +1150,7 @@ POLLING_STRATEGY_CONF: dict[mn.Namespace, "NamespaceConfigType"] = {
         1850,
         0,
         NamespaceHandler.async_poll_smart,
+        True,
     ),
     mn.Appliance_Control_Mp3: (
         0,
@@ -1041,6 +1165,7 @@ POLLING_STRATEGY_CONF: dict[mn.Namespace, "NamespaceConfigType"] = {
         mlc.PARAM_HEADER_SIZE,
         35,
         NamespaceHandler.async_poll_smart,
+        True,
     ),
     mn.Appliance_Control_Presence_Config: (
         mlc.PARAM_CONFIG_UPDATE_PERIOD,
@@ -1048,6 +1173,7 @@ POLLING_STRATEGY_CONF: dict[mn.Namespace, "NamespaceConfigType"] = {
         mlc.PARAM_HEADER_SIZE,
         260,
         NamespaceHandler.async_poll_smart,
+        True,
     ),
     mn.Appliance_Control_Screen_Brightness: (
         mlc.PARAM_CONFIG_UPDATE_PERIOD,
@@ -1055,6 +1181,7 @@ POLLING_STRATEGY_CONF: dict[mn.Namespace, "NamespaceConfigType"] = {
         mlc.PARAM_HEADER_SIZE,
         70,
         NamespaceHandler.async_poll_smart,
+        True,
     ),
     mn.Appliance_Control_Sensor_Latest: (
         mlc.PARAM_SENSOR_SLOW_UPDATE_PERIOD,
@@ -1076,6 +1203,7 @@ POLLING_STRATEGY_CONF: dict[mn.Namespace, "NamespaceConfigType"] = {
         410,
         0,
         NamespaceHandler.async_poll_smart,
+        True,
     ),
     mn.Appliance_GarageDoor_MultipleConfig: (
         mlc.PARAM_CONFIG_UPDATE_PERIOD,
@@ -1083,6 +1211,7 @@ POLLING_STRATEGY_CONF: dict[mn.Namespace, "NamespaceConfigType"] = {
         mlc.PARAM_HEADER_SIZE,
         140,
         NamespaceHandler.async_poll_smart,
+        True,
     ),
     mn.Appliance_RollerShutter_Adjust: (
         mlc.PARAM_CONFIG_UPDATE_PERIOD,
@@ -1090,6 +1219,7 @@ POLLING_STRATEGY_CONF: dict[mn.Namespace, "NamespaceConfigType"] = {
         mlc.PARAM_HEADER_SIZE,
         35,
         NamespaceHandler.async_poll_smart,
+        True,
     ),
     mn.Appliance_RollerShutter_Config: (
         mlc.PARAM_CONFIG_UPDATE_PERIOD,
@@ -1097,6 +1227,7 @@ POLLING_STRATEGY_CONF: dict[mn.Namespace, "NamespaceConfigType"] = {
         mlc.PARAM_HEADER_SIZE,
         70,
         NamespaceHandler.async_poll_smart,
+        True,
     ),
     mn.Appliance_RollerShutter_Position: (
         0,
@@ -0,0 +1,175 @@
+"""
+Buffered trace file writer.
+
+ConfigEntryManager used to render and write every trace row straight to the
+(tab separated) trace file from the event loop. TraceRecorder instead appends
+rows to a bounded in-memory ring and periodically hands the whole ring to an
+executor job which formats the timestamps, renders the rows and writes them.
+On the loop we're then only left with building a tuple (the payload is still
+serialized there since it is a snapshot of a mutable structure).
+"""
+
+from collections import deque
+import sys
+from time import localtime, strftime
+from typing import TYPE_CHECKING
+
+from .. import const as mlc
+
+if TYPE_CHECKING:
+    import asyncio
+    import io
+    from typing import Callable
+
+    from homeassistant.core import HomeAssistant
+
+    TraceRowType = tuple[float, str, str, str, str, str]
+
+
+class TraceRecorder:
+    """
+    Appends trace rows to a ring (bounded to PARAM_TRACE_RING_SIZE) which is
+    swapped out and written to file in the executor at most every
+    PARAM_TRACE_FLUSH_PERIOD. If the executor falls behind, the oldest rows are
+    dropped and a note about that is added to the file.
+    Namespaces and methods are interned since they're usually fresh strings
+    decoded from the messages but belong to a very small set.
+    """
+
+    if TYPE_CHECKING:
+        hass: HomeAssistant
+        name: str
+        size: int
+        closed: bool
+        _file: io.TextIOWrapper
+        _ring: deque[TraceRowType]
+        _dropped: int
+        _error_callback: Callable[[Exception], None]
+        _flush_unsub: asyncio.TimerHandle | None
+        _flush_future: asyncio.Future | None
+
+    __slots__ = (
+        "hass",
+        "name",
+        "size",
+        "closed",
+        "_file",
+        "_ring",
+        "_dropped",
+        "_error_callback",
+        "_flush_unsub",
+        "_flush_future",
+    )
+
+    def __init__(
+        self,
+        hass: "HomeAssistant",
+        file: "io.TextIOWrapper",
+        error_callback: "Callable[[Exception], None]",
+        /,
+    ):
+        self.hass = hass
+        self.name = file.name  # type: ignore
+        self.size = 0
+        self.closed = False
+        self._file = file
+        self._ring = deque(maxlen=mlc.PARAM_TRACE_RING_SIZE)
+        self._dropped = 0
+        self._error_callback = error_callback
+        self._flush_unsub = None
+        self._flush_future = None
+
+    def append(
+        self,
+        epoch: float,
+        rxtx: str,
+        protocol: str,
+        method: str,
+        namespace: str,
+        data: str,
+        /,
+    ):
+        """
+        Queue a row for writing. Returns False when the (estimated) file size
+        exceeds CONF_TRACE_MAXSIZE so that the caller can close the trace.
+        """
+        ring = self._ring
+        if len(ring) == ring.maxlen:
+            self._dropped += 1
+        ring.append(
+            (epoch, rxtx, protocol, sys.intern(method), sys.intern(namespace), data)
+        )
+        # timestamp, separators and the short columns account for ~40 chars
+        self.size += len(data) + len(namespace) + 40
+        if not (self._flush_unsub or self._flush_future):
+            self._flush_unsub = self.hass.loop.call_later(
+                mlc.PARAM_TRACE_FLUSH_PERIOD, self._flush
+            )
+        return self.size <= mlc.CONF_TRACE_MAXSIZE
+
+    def close(self):
+        """Write any pending row and close the file (asynchronously)."""
+        if self.closed:
+            return
+        self.closed = True
+        if self._flush_unsub:
+            self._flush_unsub.cancel()
+            self._flush_unsub = None
+        if not self._flush_future:
+            self._flush()
+        # else _flush_done will take care
+
+    def _flush(self):
+        self._flush_unsub = None
+        rows = self._ring
+        dropped = self._dropped
+        self._ring = deque(maxlen=rows.maxlen)
+        self._dropped = 0
+        self._flush_future = future = self.hass.async_add_executor_job(
+            self._write, rows, dropped, self.closed
+        )
+        future.add_done_callback(self._flush_done)
+
+    def _flush_done(self, future: "asyncio.Future"):
+        self._flush_future = None
+        if not (future.cancelled() or self.closed):
+            if exception := future.exception():
+                # this will likely close (and flush) us
+                self._error_callback(exception)  # type: ignore
+                return
+        if self._file.closed:
+            return
+        if self.closed:
+            self._flush()
+        elif self._ring:
+            self._flush_unsub = self.hass.loop.call_later(
+                mlc.PARAM_TRACE_FLUSH_PERIOD, self._flush
+            )
+
+    def _write(self, rows: "deque[TraceRowType]", dropped: int, close: bool, /):
+        """Render the rows as tab separated lines (runs in the executor)."""
+        file = self._file
+        try:
+            lines = []
+            time_str = ""
+            time_sec = None
+            for epoch, rxtx, protocol, method, namespace, data in rows:
+                # rows come in bursts so we'll mostly reuse the formatted time
+                if (sec := int(epoch)) != time_sec:
+                    time_sec = sec
+                    time_str = strftime("%Y/%m/%d - %H:%M:%S", localtime(epoch))
+                if dropped:
+                    lines.append(
+                        f"{time_str}\t\t{mlc.CONF_PROTOCOL_AUTO}\tLOG\t"
+                        f"{mlc.CONF_LOGGING_LEVEL_OPTIONS[mlc.CONF_LOGGING_WARNING]}\t"
+                        f"{dropped} rows dropped (trace buffer overflow)\r\n"
+                    )
+                    dropped = 0
+                lines.append(
+                    f"{time_str}\t{rxtx}\t{protocol}\t{method}\t{namespace}\t{data}\r\n"
+                )
+            file.write("".join(lines))
+            file.flush()
+        finally:
+            if close:
+                file.close()
@@ -4,12 +4,13 @@ for Meross devices.
 """
 
 import asyncio
-from base64 import b64decode, b64encode
+from binascii import a2b_base64, b2a_base64
 import logging
 import socket
 import sys
 from typing import TYPE_CHECKING
 from uuid import uuid4
+from weakref import WeakValueDictionary
 
 import aiohttp
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
@@ -24,7 +25,7 @@ from .protocol.message import (
 )
 
 if TYPE_CHECKING:
-    from typing import ClassVar, Protocol
+    from typing import ClassVar, Hashable, Protocol
 
     from protocol.types import MerossHeaderType, MerossPayloadType
 
@@ -33,18 +34,88 @@ if TYPE_CHECKING:
         def log(self, level: int, msg: str, *args, **kwargs) -> None: ...
 
 
+_ZERO_PADDING = bytes(16)
+
+
 class TerminatedException(Exception):
     pass
 
 
+class _RequestAbortedException(Exception):
+    """Set on a coalesced request future when the request owning it is cancelled
+    so that the waiters can issue it on their own."""
+
+
+class MerossHttpHost:
+    """
+    Connection manager shared by all of the MerossHttpClient(s) targeting the same host.
+    It is only weakly referenced by MerossHttpClient._HOSTS so it goes away together
+    with the last client (i.e. when the device is unloaded).
+    Device http servers are tiny so we only allow one request in flight per device
+    (others are queued on lock). Idempotent (GET) requests carrying the same
+    coalesce_key as one already queued or in flight will share its response instead
+    of being sent again. It also tracks if the device keeps connections alive
+    and some statistics about round-trip time and failures for diagnostics.
+    """
+
+    if TYPE_CHECKING:
+        pending: dict[Hashable, asyncio.Future[MerossResponse]]
+
+    __slots__ = (
+        "host",
+        "lock",
+        "pending",
+        "keepalive",
+        "requests",
+        "coalesced",
+        "timeouts",
+        "errors",
+        "rtt_avg",
+        "rtt_max",
+        "__weakref__",
+    )
+
+    def __init__(self, host: str):
+        self.host = host
+        self.lock = asyncio.Lock()
+        self.pending = {}
+        self.keepalive = True
+        self.requests = 0
+        self.coalesced = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.rtt_avg = 0.0
+        self.rtt_max = 0.0
+
+    def add_rtt(self, rtt: float, /):
+        """Adds a round-trip time (in seconds) sample."""
+        rtt_ms = rtt * 1000
+        self.rtt_avg = (9 * self.rtt_avg + rtt_ms) / 10 if self.rtt_avg else rtt_ms
+        if rtt_ms > self.rtt_max:
+            self.rtt_max = rtt_ms
+
+    def get_stats(self):
+        return {
+            "requests": self.requests,
+            "coalesced": self.coalesced,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "rtt_avg": round(self.rtt_avg, 1),
+            "rtt_max": round(self.rtt_max, 1),
+            "keepalive": self.keepalive,
+        }
+
+
 class MerossHttpClient:
     if TYPE_CHECKING:
         SESSION_MAXIMUM_CONNECTIONS: ClassVar
         SESSION_MAXIMUM_CONNECTIONS_PER_HOST: ClassVar
         SESSION_TIMEOUT: ClassVar
         _SESSION: ClassVar[aiohttp.ClientSession | None]
+        _HOSTS: ClassVar[WeakValueDictionary[str, MerossHttpHost]]
 
         _encryption_cipher: Cipher | None
+        _encryption_buffer: bytearray
         _key_header: MerossHeaderType
 
     SESSION_MAXIMUM_CONNECTIONS = 50
@@ -59,6 +130,17 @@ class MerossHttpClient:
     # concurrent http sessions to the same device.
     _SESSION = None
 
+    _HOSTS = WeakValueDictionary()
+
+    @staticmethod
+    def get_http_host(host: str):
+        """Returns the (shared) connection manager for host."""
+        try:
+            return MerossHttpClient._HOSTS[host]
+        except KeyError:
+            http_host = MerossHttpClient._HOSTS[host] = MerossHttpHost(host)
+            return http_host
+
     @staticmethod
     def _get_or_create_client_session():
         if not MerossHttpClient._SESSION:
@@ -86,6 +168,7 @@ class MerossHttpClient:
 
     __slots__ = (
         "_host",
+        "_http_host",
         "_requesturl",
         "key",
         "timeout",
@@ -96,6 +179,7 @@ class MerossHttpClient:
         "_terminate",
         "_terminate_guard",
         "_encryption_cipher",
+        "_encryption_buffer",
         "_key_header",
     )
 
@@ -116,6 +200,7 @@ class MerossHttpClient:
         log_level_dump: the logging level at which the full json payloads will be dumped (costly)
         """
         self._host = host
+        self._http_host = MerossHttpClient.get_http_host(host)
         self._requesturl = URL(f"http://{host}/config")
         self.key = key
         self.timeout = MerossHttpClient.SESSION_TIMEOUT
@@ -126,6 +211,7 @@ class MerossHttpClient:
         self._terminate = False
         self._terminate_guard = 0
         self._encryption_cipher = None
+        self._encryption_buffer = bytearray()
         self._key_header = {}  # type: ignore
 
     @property
@@ -135,8 +221,13 @@ class MerossHttpClient:
     @host.setter
     def host(self, value: str):
         self._host = value
+        self._http_host = MerossHttpClient.get_http_host(value)
         self._requesturl = URL(f"http://{value}/config")
 
+    @property
+    def http_host(self):
+        return self._http_host
+
     def set_encryption(self, encryption_key: bytes | None, /):
         if encryption_key:
             self._encryption_cipher = Cipher(
@@ -145,6 +236,40 @@ class MerossHttpClient:
             )
         else:
             self._encryption_cipher = None
+            self._encryption_buffer = bytearray()
+
+    def _get_encryption_buffer(self, size: int, /):
+        """Returns the (reusable) output buffer for the cipher, grown to at least size bytes."""
+        buffer = self._encryption_buffer
+        if len(buffer) < size:
+            buffer = self._encryption_buffer = bytearray(size)
+        return buffer
+
+    def _encrypt(self, request: str, /) -> bytes:
+        """Zero pads and encrypts the request returning the base64 encoded payload.
+        The cipher writes into the client buffer so the only copies are the utf-8
+        encoding of the request and the final base64 encoding."""
+        request_bytes = request.encode("utf-8")
+        request_len = len(request_bytes)
+        padding_len = 16 - (request_len % 16)
+        encryptor = self._encryption_cipher.encryptor()  # type: ignore
+        with memoryview(self._get_encryption_buffer(request_len + 32)) as buffer:
+            encrypted_len = encryptor.update_into(request_bytes, buffer)
+            encrypted_len += encryptor.update_into(
+                _ZERO_PADDING[:padding_len], buffer[encrypted_len:]
+            )
+            return b2a_base64(buffer[:encrypted_len], newline=False)
+
+    def _decrypt(self, response: bytes, /) -> str:
+        """Decrypts the (base64 encoded) response and decodes the utf-8 text
+        (stripping the zero padding) directly from the client buffer."""
+        response = a2b_base64(response)
+        decryptor = self._encryption_cipher.decryptor()  # type: ignore
+        with memoryview(self._get_encryption_buffer(len(response) + 16)) as buffer:
+            decrypted_len = decryptor.update_into(response, buffer)
+            while decrypted_len and not buffer[decrypted_len - 1]:
+                decrypted_len -= 1
+            return str(buffer[:decrypted_len], "utf-8")
 
     def _check_terminated(self):
         if self._terminate:
@@ -165,10 +290,55 @@ class MerossHttpClient:
         while self._terminate_guard:
             await asyncio.sleep(0.5)
 
-    async def async_request_raw(self, request: str, /) -> MerossResponse:
+    async def async_request_raw(
+        self, request: str, /, coalesce_key: "Hashable | None" = None
+    ) -> MerossResponse:
+        """
+        Sends the (json) request. coalesce_key should only be set for
+        idempotent (GET) requests: if another request with the same key
+        is already queued or in flight for this host, we'll just wait for and
+        return its response.
+        """
         self._check_terminated()
+        if coalesce_key is None:
+            return await self._async_request_raw(request, False)
+
+        pending = self._http_host.pending
+        while future := pending.get(coalesce_key):
+            self._http_host.coalesced += 1
+            try:
+                return await asyncio.shield(future)
+            except _RequestAbortedException:
+                # the owner was cancelled: the first of us to get here
+                # will re-issue the request and the others will wait on it
+                self._check_terminated()
+
+        pending[coalesce_key] = future = asyncio.get_running_loop().create_future()
+        try:
+            response = await self._async_request_raw(request, True)
+        except asyncio.CancelledError:
+            # don't propagate our cancellation to the (unrelated) waiters
+            future.set_exception(_RequestAbortedException())
+            future.exception()
+            raise
+        except Exception as exception:
+            future.set_exception(exception)
+            # avoid 'exception was never retrieved' when noone was coalesced
+            future.exception()
+            raise
+        else:
+            future.set_result(response)
+            return response
+        finally:
+            if pending.get(coalesce_key) is future:
+                del pending[coalesce_key]
+
+    async def _async_request_raw(
+        self, request: str, idempotent: bool, /
+    ) -> MerossResponse:
         logger = self._logger
         logid = None
+        http_host = self._http_host
         self._terminate_guard += 1
         try:
             if logger and logger.isEnabledFor(self._log_level_dump):
@@ -184,52 +354,70 @@ class MerossHttpClient:
                 MEROSSDEBUG.http_random_timeout()
 
             if _cipher := self._encryption_cipher:
-                request_bytes = request.encode("utf-8")
-                request_bytes += bytes(16 - (len(request_bytes) % 16))
-                encryptor = _cipher.encryptor()
-                request = b64encode(
-                    encryptor.update(request_bytes) + encryptor.finalize()
-                ).decode("utf-8")
+                request_data = self._encrypt(request)
                 headers = {
                     aiohttp.hdrs.CONTENT_TYPE: "application/octet-stream",
                 }
             else:
                 # no encryption: session defaults to json
+                request_data = request
                 headers = {
                     aiohttp.hdrs.CONTENT_TYPE: "application/json",
                 }
-            # since device HTTP service sometimes timeouts with no apparent
-            # reason we're using an increasing timeout loop to try recover
-            # when this timeout is transient. This will lead to a total timeout
-            # (for the caller) exceeding the value(s) actually set in self.timeout
-            _connect_timeout_max = self.timeout.connect or self.timeout.total or 5
-            _connect_timeout = 1
-            while True:
-                try:
-                    response = await self._session.post(
-                        url=self._requesturl,
-                        data=request,
-                        headers=headers,
-                        timeout=aiohttp.ClientTimeout(
-                            total=self.timeout.total, connect=_connect_timeout
-                        ),
-                    )
-                    break
-                except aiohttp.ServerTimeoutError as exception:
-                    self._check_terminated()
-                    if _connect_timeout < _connect_timeout_max:
-                        _connect_timeout = _connect_timeout * 2
-                    else:
-                        raise exception
 
-            self._check_terminated()
-            response.raise_for_status()
-            response = await response.text()
-            if _cipher:
-                decryptor = _cipher.decryptor()
-                decrypted_bytes = decryptor.update(b64decode(response))
-                decrypted_bytes += decryptor.finalize()
-                response = decrypted_bytes.decode("utf8").rstrip("\0")
+            async with http_host.lock:
+                self._check_terminated()
+                if not http_host.keepalive:
+                    headers[aiohttp.hdrs.CONNECTION] = "close"
+                http_host.requests += 1
+                loop_time = asyncio.get_running_loop().time
+                request_time = loop_time()
+                # since device HTTP service sometimes timeouts with no apparent
+                # reason we're using an increasing timeout loop to try recover
+                # when this timeout is transient. This will lead to a total timeout
+                # (for the caller) exceeding the value(s) actually set in self.timeout
+                _connect_timeout_max = self.timeout.connect or self.timeout.total or 5
+                _connect_timeout = 1
+                while True:
+                    try:
+                        response = await self._session.post(
+                            url=self._requesturl,
+                            data=request_data,
+                            headers=headers,
+                            timeout=aiohttp.ClientTimeout(
+                                total=self.timeout.total, connect=_connect_timeout
+                            ),
+                        )
+                        break
+                    except aiohttp.ServerTimeoutError as exception:
+                        self._check_terminated()
+                        if _connect_timeout < _connect_timeout_max:
+                            _connect_timeout = _connect_timeout * 2
+                        else:
+                            raise exception
+                    except aiohttp.ServerDisconnectedError as exception:
+                        # This is likely a kept-alive connection the device
+                        # already dropped on its side. We'll retry (once)
+                        # asking the device to close connections from now on.
+                        # Non idempotent requests are never retried since
+                        # the device could have already processed them.
+                        self._check_terminated()
+                        if not (idempotent and http_host.keepalive):
+                            raise exception
+                        http_host.keepalive = False
+                        headers[aiohttp.hdrs.CONNECTION] = "close"
+
+                self._check_terminated()
+                response.raise_for_status()
+                # read raw bytes: response.text() would also try to guess the
+                # charset when the device doesn't declare it
+                response = await response.read()
+                http_host.add_rtt(loop_time() - request_time)
+
+            # decoding to str here is not an extra copy: the json decoder only parses
+            # str (json.loads would decode bytes itself) and MerossResponse keeps the
+            # text around anyway for json() and the logs/traces
+            response = self._decrypt(response) if _cipher else str(response, "utf-8")
 
             if logger:
                 logger.log(
@@ -240,6 +428,10 @@ class MerossHttpClient:
         except TerminatedException as e:
             raise e
         except Exception as e:
+            if isinstance(e, asyncio.TimeoutError):
+                http_host.timeouts += 1
+            else:
+                http_host.errors += 1
             self._key_header = {}  # type: ignore
             if logger:
                 logger.log(  # type: ignore
@@ -1,5 +1,4 @@
 import asyncio
-from collections import deque
 from hashlib import md5
 import logging
 import random
@@ -14,6 +13,7 @@ import paho.mqtt.client as mqtt
 
 from . import HostAddress, get_macaddress_from_uuid
 from .protocol import const as mc
+from .protocol.message import MerossRequest
 
 if typing.TYPE_CHECKING:
     from .protocol.message import MerossMessage
@@ -28,6 +28,12 @@ class MerossMQTTRateLimitException(Exception):
     pass
 
 
+class MerossMQTTCoalescedException(MerossMQTTRateLimitException):
+    """Raised for a deferred publish superseded by a newer one (see async_rl_publish)"""
+
+    pass
+
+
 class _MQTTRateLimiter:
     """
     MQTT publishing rate-limiter x device (in order to prevent Meross account ban):
@@ -50,19 +56,83 @@ class _MQTTRateLimiter:
     To ensure optimal performance and security,
     please limit your device's communication to no more than 200 messages every one hour."
 
+    2025-11
+    The sliding window is now a token bucket: MAXQUEUE tokens (burst) refilled
+    at one every TOKEN_PERIOD so that the average stays at MAXQUEUE over DURATION
+    (~198 msg/h). Publishes exceeding the budget are still dropped when they're
+    GETs (polling will retry anyway) while SETs (user commands) are queued
+    in 'pending' (see async_rl_publish) with newer SETs for the same
+    namespace/channel replacing older ones. Queued messages are re-signed
+    when released so the device doesn't see them as stale.
     """
 
     DURATION: typing.Final = 91
     MAXQUEUE: typing.Final = 5
+    TOKEN_PERIOD: typing.Final = DURATION / MAXQUEUE
+    PENDING_MAX: typing.Final = 10
+    """max number of (distinct) SETs waiting for budget"""
 
     __slots__ = (
+        "tokens",
+        "t_refill",
+        "pending",
+        "release_handle",
+        "queued",
         "dropped",
-        "t_queue",
+        "coalesced",
     )
 
     def __init__(self) -> None:
+        self.tokens: float = self.MAXQUEUE
+        self.t_refill = monotonic()
+        self.pending: dict[
+            typing.Hashable, tuple["MerossRequest", asyncio.Future[None]]
+        ] = {}
+        self.release_handle: asyncio.TimerHandle | None = None
+        self.queued: int = 0
         self.dropped: int = 0
-        self.t_queue: deque[float] = deque()
+        self.coalesced: int = 0
+
+    def refill(self, t_now: float):
+        tokens = self.tokens + (t_now - self.t_refill) / self.TOKEN_PERIOD
+        self.tokens = tokens if tokens < self.MAXQUEUE else self.MAXQUEUE
+        self.t_refill = t_now
+
+    def acquire(self, t_now: float):
+        """Consumes a token if available."""
+        self.refill(t_now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def get_token_delay(self, t_now: float):
+        """Time before the next token (after the pending queue has been served)."""
+        self.refill(t_now)
+        missing = len(self.pending) + 1 - self.tokens
+        return missing * self.TOKEN_PERIOD if missing > 0 else 0.0
+
+    def purge(self):
+        """Removes the queued SETs whose publisher has been cancelled."""
+        pending = self.pending
+        for key in [key for key, queued in pending.items() if queued[1].done()]:
+            del pending[key]
+
+    @staticmethod
+    def get_coalesce_key(request: "MerossRequest"):
+        """
+        SETs to the same namespace and channel(s) supersede each other. Channels are
+        identified by 'channel' (or 'id' for hub subdevices) in the payload entries.
+        """
+        keys = []
+        for value in request.payload.values():
+            for item in value if isinstance(value, list) else (value,):
+                if isinstance(item, dict):
+                    keys.append(item.get(mc.KEY_CHANNEL, item.get(mc.KEY_ID)))
+                else:
+                    # not a 'channel' payload: only coalesce exact duplicates
+                    return request.namespace, request.json()
+        return request.namespace, tuple(keys)
 
 
 class _MerossMQTTClient(mqtt.Client):
@@ -106,6 +176,8 @@ class _MerossMQTTClient(mqtt.Client):
         self._lock_queue = threading.Lock()
         """synchronize access to the transmit queue. Might be contended by the mqtt thread"""
         self._rl_dropped = 0
+        self._rl_queued = 0
+        self._rl_coalesced = 0
         self._rl2_queues: dict[str, _MQTTRateLimiter] = {}
         self._stateext = self.STATE_DISCONNECTED
         self._subscribe_error = None
@@ -132,6 +204,14 @@ class _MerossMQTTClient(mqtt.Client):
         self.suppress_exceptions = True
 
     async def async_shutdown(self):
+        with self._lock_queue:
+            for _rl2 in self._rl2_queues.values():
+                if _rl2.release_handle:
+                    _rl2.release_handle.cancel()
+                    _rl2.release_handle = None
+                for _, future in _rl2.pending.values():
+                    future.cancel()
+                _rl2.pending.clear()
         await self.async_disconnect()
         for task in self._tasks:
             await task
@@ -140,6 +220,14 @@ class _MerossMQTTClient(mqtt.Client):
     def rl_dropped(self):
         return self._rl_dropped
 
+    @property
+    def rl_queued(self):
+        return self._rl_queued
+
+    @property
+    def rl_coalesced(self):
+        return self._rl_coalesced
+
     @property
     def stateext(self):
         return self._stateext
@@ -230,60 +318,129 @@ class _MerossMQTTClient(mqtt.Client):
                 self._rl2_queues[uuid] = _MQTTRateLimiter()
                 return 0.0
 
-            t_now = monotonic()
-            t_duration_back = t_now - _MQTTRateLimiter.DURATION
-            t_queue = _rl2.t_queue
-            t_queue_len = len(t_queue)
-            while t_queue_len:
-                if t_queue[0] <= t_duration_back:
-                    # discard in case
-                    t_queue.popleft()
-                    t_queue_len -= 1
-                    continue
-                if t_queue_len >= _MQTTRateLimiter.MAXQUEUE:
-                    # queue full..any send before expiration
-                    # of oldest send will be dropped
-                    t_oldest_exp = t_queue[0] + _MQTTRateLimiter.DURATION
-                    return t_oldest_exp - t_now  # assert > 0 ?
-                # queue not full but we want to 'weigh-in' the queue length
-                return _MQTTRateLimiter.DURATION / (
-                    _MQTTRateLimiter.MAXQUEUE - t_queue_len
-                )
-            # queue empty
-            return 0.0
+            if delay := _rl2.get_token_delay(monotonic()):
+                return delay
+            tokens = _rl2.tokens
+            if tokens >= _MQTTRateLimiter.MAXQUEUE:
+                return 0.0
+            # budget not exhausted but we want to 'weigh-in' the used part
+            return _MQTTRateLimiter.DURATION / tokens
+
+    def get_rl_stats(self, uuid: str):
+        """Rate-limiter counters for the device."""
+        with self._lock_queue:
+            try:
+                _rl2 = self._rl2_queues[uuid]
+            except KeyError:
+                return None
+            _rl2.refill(monotonic())
+            return {
+                "tokens": round(_rl2.tokens, 2),
+                "pending": len(_rl2.pending),
+                "queued": _rl2.queued,
+                "coalesced": _rl2.coalesced,
+                "dropped": _rl2.dropped,
+            }
 
     def rl_publish(self, uuid: str, request: "MerossMessage"):
+        """Publishes the request if the device budget allows, else raises (message dropped)."""
         with self._lock_queue:
+            try:
+                _rl2 = self._rl2_queues[uuid]
+            except KeyError:
+                self._rl2_queues[uuid] = _rl2 = _MQTTRateLimiter()
+
+            if _rl2.pending or not _rl2.acquire(monotonic()):
+                self._rl_dropped += 1
+                _rl2.dropped += 1
+                raise MerossMQTTRateLimitException()
 
+        return mqtt.Client.publish(
+            self,
+            mc.TOPIC_REQUEST.format(uuid),
+            request.json(),
+        )
+
+    async def async_rl_publish(self, uuid: str, request: "MerossMessage"):
+        """
+        Asyncio version of rl_publish. When the device budget is exhausted, SET requests
+        are queued (instead of dropped) and published as soon as the budget allows.
+        A queued SET superseded by a newer one for the same namespace/channel
+        raises MerossMQTTCoalescedException. Must be called from the loop.
+        """
+        with self._lock_queue:
             try:
                 _rl2 = self._rl2_queues[uuid]
             except KeyError:
                 self._rl2_queues[uuid] = _rl2 = _MQTTRateLimiter()
 
+            if _rl2.pending:
+                _rl2.purge()
             t_now = monotonic()
-            # implementing a rate-limiter trying to keep the send rate to lower than
-            # 1 MQTT publish every 10 seconds (on average x device). This is accomplished
-            # by keeping the count (and times) of sent messages in the last minute
-            t_duration_back = t_now - _MQTTRateLimiter.DURATION
-            t_queue = _rl2.t_queue
-            t_queue_len = len(t_queue)
-            while t_queue_len:
-                if t_queue[0] <= t_duration_back:
-                    t_queue.popleft()
-                    t_queue_len -= 1
-                    continue
-                if t_queue_len >= _MQTTRateLimiter.MAXQUEUE:
+            if _rl2.pending or not _rl2.acquire(t_now):
+                if (request.method != mc.METHOD_SET) or not isinstance(
+                    request, MerossRequest
+                ):
+                    # only MerossRequest(s) can be re-signed when released
                     self._rl_dropped += 1
                     _rl2.dropped += 1
                     raise MerossMQTTRateLimitException()
-                break
+                key = _MQTTRateLimiter.get_coalesce_key(request)
+                if superseded := _rl2.pending.pop(key, None):
+                    self._rl_coalesced += 1
+                    _rl2.coalesced += 1
+                    if not superseded[1].done():
+                        superseded[1].set_exception(MerossMQTTCoalescedException())
+                elif len(_rl2.pending) >= _MQTTRateLimiter.PENDING_MAX:
+                    self._rl_dropped += 1
+                    _rl2.dropped += 1
+                    raise MerossMQTTRateLimitException()
+                self._rl_queued += 1
+                _rl2.queued += 1
+                future = self._asyncio_loop.create_future()
+                _rl2.pending[key] = (request, future)
+                if not _rl2.release_handle:
+                    _rl2.release_handle = self._asyncio_loop.call_later(
+                        (1 - _rl2.tokens) * _MQTTRateLimiter.TOKEN_PERIOD,
+                        self._rl_release,
+                        _rl2,
+                    )
+            else:
+                future = None
+
+        if future:
+            await future
+            request.refresh()  # type: ignore (it's a MerossRequest)
+
+        return await self._asyncio_loop.run_in_executor(
+            None,
+            mqtt.Client.publish,
+            self,
+            mc.TOPIC_REQUEST.format(uuid),
+            request.json(),
+        )
 
-            t_queue.append(t_now)
-            return mqtt.Client.publish(
-                self,
-                mc.TOPIC_REQUEST.format(uuid),
-                request.json(),
-            )
+    def _rl_release(self, _rl2: _MQTTRateLimiter):
+        """Timer callback releasing the queued requests the budget allows (loop thread)."""
+        with self._lock_queue:
+            _rl2.release_handle = None
+            t_now = monotonic()
+            pending = _rl2.pending
+            while pending:
+                key = next(iter(pending))
+                if pending[key][1].done():
+                    # the publisher has been cancelled meanwhile
+                    del pending[key]
+                    continue
+                if not _rl2.acquire(t_now):
+                    break
+                pending.pop(key)[1].set_result(None)
+            if pending:
+                _rl2.release_handle = self._asyncio_loop.call_later(
+                    (1 - _rl2.tokens) * _MQTTRateLimiter.TOKEN_PERIOD,
+                    self._rl_release,
+                    _rl2,
+                )
 
     def _mqtt_connected(self):
         """
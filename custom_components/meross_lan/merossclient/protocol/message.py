@@ -1,4 +1,5 @@
 from hashlib import md5
+import re
 from time import time
 from typing import TYPE_CHECKING
 from uuid import uuid4
@@ -163,9 +164,105 @@ class MerossResponse(MerossMessage):
         super().__init__(JSON_DECODER.decode(json_str), json_str)
 
 
+_RE_LAZY_HEADER = re.compile(r'\s*\{\s*"header"\s*:\s*')
+
+
+class MerossLazyResponse(MerossResponse):
+    """
+    MerossResponse decoding only the header when built. Meross devices always
+    serialize the header first so we can raw_decode it out of the json string
+    and leave the (usually much bigger) payload alone until someone asks for it.
+    This is enough for transaction matching and routing on the MQTT receive
+    path so that messages we'll drop anyway (unbound devices, http only devices,
+    SETACKs..) never get their payload parsed.
+    Any access to keys other than the header (item access, get, iteration..)
+    decodes the whole message. Messages not starting with the header are
+    fully decoded in the constructor.
+    """
+
+    __slots__ = ("_lazy",)
+
+    def __init__(self, json_str: str, /):
+        self._json_str = json_str
+        if match := _RE_LAZY_HEADER.match(json_str):
+            header, _ = JSON_DECODER.raw_decode(json_str, match.end())
+            dict.__init__(self, {mc.KEY_HEADER: header})
+            self._lazy = True
+        else:
+            dict.__init__(self, JSON_DECODER.decode(json_str))
+            self._lazy = False
+
+    def _decode(self):
+        self._lazy = False
+        message = JSON_DECODER.decode(self._json_str)  # type: ignore
+        # preserve the header instance which might already be referenced
+        message[mc.KEY_HEADER] = dict.__getitem__(self, mc.KEY_HEADER)
+        dict.update(self, message)
+
+    def __missing__(self, key):
+        if self._lazy:
+            self._decode()
+            return dict.__getitem__(self, key)
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        if self._lazy:
+            self._decode()
+        return dict.__contains__(self, key)
+
+    def __iter__(self):
+        if self._lazy:
+            self._decode()
+        return dict.__iter__(self)
+
+    def __bool__(self):
+        # a lazy message has at least the header
+        return self._lazy or dict.__len__(self) > 0
+
+    def __len__(self):
+        if self._lazy:
+            self._decode()
+        return dict.__len__(self)
+
+    def __repr__(self):
+        if self._lazy:
+            self._decode()
+        return dict.__repr__(self)
+
+    def get(self, key, default=None, /):
+        if self._lazy:
+            self._decode()
+        return dict.get(self, key, default)
+
+    def keys(self):
+        if self._lazy:
+            self._decode()
+        return dict.keys(self)
+
+    def values(self):
+        if self._lazy:
+            self._decode()
+        return dict.values(self)
+
+    def items(self):
+        if self._lazy:
+            self._decode()
+        return dict.items(self)
+
+    def copy(self):
+        if self._lazy:
+            self._decode()
+        return dict.copy(self)
+
+
 class MerossRequest(MerossMessage):
     """Helper for messages to be sent"""
 
+    if TYPE_CHECKING:
+        key: str
+
+    __slots__ = ("key",)
+
     def __init__(
         self,
         namespace: str,
@@ -179,6 +276,7 @@ class MerossRequest(MerossMessage):
         self.namespace = namespace
         self.method = method
         self.payload = payload
+        self.key = key
         self.messageid = uuid4().hex
         timestamp = int(time())
         super().__init__(
@@ -200,6 +298,15 @@ class MerossRequest(MerossMessage):
             }
         )
 
+    def refresh(self):
+        """Updates timestamp and signature for a request sent some time after creation."""
+        header = self[mc.KEY_HEADER]
+        header[mc.KEY_TIMESTAMP] = timestamp = int(time())
+        header[mc.KEY_SIGN] = compute_message_signature(
+            self.messageid, self.key, timestamp
+        )
+        self._json_str = None
+
 
 class MerossPushReply(MerossMessage):
     """
@@ -387,6 +387,37 @@ class ProtocolSensor(me.MEAlwaysAvailableMixin, MLEnumSensor):
             self.flush_state()
 
 
+class HttpStatsSensor(MLNumericSensor):
+    """Diagnostic sensor reporting the (averaged) round-trip time of HTTP requests
+    to the device. The other statistics collected by the MerossHttpHost connection
+    manager are carried in the state attributes."""
+
+    manager: "Device"
+
+    is_diagnostic = True
+
+    # HA core entity attributes:
+    entity_category = MLNumericSensor.EntityCategory.DIAGNOSTIC
+    icon = "mdi:timer-outline"
+
+    def __init__(self, manager: "Device"):
+        self.extra_state_attributes = {}
+        super().__init__(
+            manager,
+            None,
+            "sensor_http_rtt",
+            MLNumericSensor.DeviceClass.DURATION,
+            native_unit_of_measurement=me.MLEntity.hac.UnitOfTime.MILLISECONDS,
+            suggested_display_precision=0,
+        )
+
+    def update_stats(self, stats: dict):
+        if self.extra_state_attributes != stats:
+            self.extra_state_attributes = stats
+            self.native_value = stats["rtt_avg"]
+            self.flush_state()
+
+
 class MLSignalStrengthSensor(EntityNamespaceMixin, MLNumericSensor):
 
     ns = mn.Appliance_System_Runtime
@@ -32,6 +32,11 @@ from homeassistant.loader import bind_hass
 from .const import (
     CONF_ALLOW_ALL_IMPORTS,
     CONF_HASS_IS_GLOBAL,
+    CONF_INCREMENTAL_RELOAD,
+    CONF_LOOP_HOLD_WARN,
+    CONF_POOL_WORKERS,
+    CONF_STATE_TRIGGER_COALESCE,
+    CONF_TRIGGER_STATS_SENSORS,
     CONFIG_ENTRY,
     CONFIG_ENTRY_OLD,
     DOMAIN,
@@ -41,6 +46,8 @@ from .const import (
     SERVICE_GENERATE_STUBS,
     SERVICE_JUPYTER_KERNEL_START,
     SERVICE_RESPONSE_ONLY,
+    SERVICE_SCHEDULER_STATS,
+    SERVICE_TRIGGER_STATS,
     UNSUB_LISTENERS,
     WATCHDOG_TASK,
 )
@@ -50,8 +57,10 @@ from .function import Function
 from .global_ctx import GlobalContext, GlobalContextMgr
 from .jupyter_kernel import Kernel
 from .mqtt import Mqtt
+from .parse_cache import ParseCache
 from .requirements import install_requirements
 from .state import State, StateVal
+from .stats import TrigStats
 from .stubs.generator import StubsGenerator
 from .trigger import TrigTime
 from .webhook import Webhook
@@ -62,6 +71,11 @@ PYSCRIPT_SCHEMA = vol.Schema(
     {
         vol.Optional(CONF_ALLOW_ALL_IMPORTS, default=False): cv.boolean,
         vol.Optional(CONF_HASS_IS_GLOBAL, default=False): cv.boolean,
+        vol.Optional(CONF_STATE_TRIGGER_COALESCE, default=False): cv.boolean,
+        vol.Optional(CONF_TRIGGER_STATS_SENSORS, default=False): cv.boolean,
+        vol.Optional(CONF_INCREMENTAL_RELOAD, default=False): cv.boolean,
+        vol.Optional(CONF_LOOP_HOLD_WARN, default=0): vol.All(vol.Coerce(float), vol.Range(min=0)),
+        vol.Optional(CONF_POOL_WORKERS, default=2): vol.All(vol.Coerce(int), vol.Range(min=1)),
     },
     extra=vol.ALLOW_EXTRA,
 )
@@ -268,6 +282,8 @@ async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> b
     TrigTime.init(hass)
     State.init(hass)
     Webhook.init(hass)
+    ParseCache.init(hass)
+    TrigStats.init(hass)
     State.register_functions()
     GlobalContextMgr.init()
 
@@ -281,9 +297,13 @@ async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> b
     hass.data[DOMAIN][UNSUB_LISTENERS] = []
 
     State.set_pyscript_config(config_entry.data)
+    TrigStats.set_pyscript_config(config_entry.data)
+    Function.set_pyscript_config(config_entry.data)
 
     await install_requirements(hass, config_entry, pyscript_folder)
     await load_scripts(hass, config_entry.data, global_ctx_only=global_ctx_only)
+    if not doing_reload:
+        await ParseCache.prune()
 
     async def reload_scripts_handler(call: ServiceCall) -> None:
         """Handle reload service calls."""
@@ -294,6 +314,8 @@ async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> b
         if await update_yaml_config(hass, config_entry):
             global_ctx_only = "*"
         State.set_pyscript_config(config_entry.data)
+        TrigStats.set_pyscript_config(config_entry.data)
+        Function.set_pyscript_config(config_entry.data)
 
         await State.get_service_params()
 
@@ -345,6 +367,22 @@ async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> b
         DOMAIN, SERVICE_GENERATE_STUBS, generate_stubs_service, supports_response=SERVICE_RESPONSE_ONLY
     )
 
+    async def scheduler_stats_service(call: ServiceCall) -> Dict[str, Any]:
+        """Return upcoming @time_trigger fires and scheduling lag."""
+        return TrigTime.scheduler_stats(int(call.data.get("count", 20)))
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_SCHEDULER_STATS, scheduler_stats_service, supports_response=SERVICE_RESPONSE_ONLY
+    )
+
+    async def trigger_stats_service(call: ServiceCall) -> Dict[str, Any]:
+        """Return per-function trigger latency histograms and counters."""
+        return TrigStats.report(call.data.get("name_prefix"), reset=call.data.get("reset", False))
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_TRIGGER_STATS, trigger_stats_service, supports_response=SERVICE_RESPONSE_ONLY
+    )
+
     async def jupyter_kernel_start(call: ServiceCall) -> None:
         """Handle Jupyter kernel start call."""
         _LOGGER.debug("service call to jupyter_kernel_start: %s", call.data)
@@ -439,6 +477,7 @@ async def async_unload_entry(hass: HomeAssistant, config_entry: ConfigEntry) ->
     await Function.waiter_sync()
     await Function.waiter_stop()
     await Function.reaper_stop()
+    Function.pool_stop()
 
     return True
 
@@ -600,6 +639,7 @@ async def load_scripts(hass: HomeAssistant, config_data: Dict[str, Any], global_
     # figure out what to reload based on global_ctx_only and what's changed
     #
     ctx_delete = set()
+    ctx_changed = set()
     if global_ctx_only is not None and global_ctx_only != "*":
         if global_ctx_only not in ctx_all and global_ctx_only not in ctx2files:
             _LOGGER.error("pyscript.reload: no global context '%s' to reload", global_ctx_only)
@@ -628,6 +668,8 @@ async def load_scripts(hass: HomeAssistant, config_data: Dict[str, Any], global_
                 ):
                     ctx_delete.add(global_ctx_name)
                     src_info.force = True
+                    if src_info.app_config == ctx.get_app_config():
+                        ctx_changed.add(global_ctx_name)
             else:
                 src_info.force = src_info.autoload
 
@@ -637,6 +679,7 @@ async def load_scripts(hass: HomeAssistant, config_data: Dict[str, Any], global_
     # being reloaded
     #
     will_reload = set()
+    ctx_import_reload = set()
     for global_ctx_name, src_info in ctx2files.items():
         if global_ctx_name.startswith("modules.") and (global_ctx_name in ctx_delete or src_info.force):
             parts = global_ctx_name.split(".")
@@ -668,9 +711,42 @@ async def load_scripts(hass: HomeAssistant, config_data: Dict[str, Any], global_
                 root = f"{parts[0]}.{parts[1]}"
                 if root in will_reload:
                     ctx_delete.add(global_ctx_name)
+                    ctx_import_reload.add(global_ctx_name)
                     if global_ctx_name in ctx2files:
                         ctx2files[global_ctx_name].force = True
 
+    #
+    # with incremental_reload, files whose own source changed are reloaded one function
+    # at a time, unless they are imported by or import something else being reloaded
+    #
+    ctx_incremental = set()
+    if config_data.get(CONF_INCREMENTAL_RELOAD, False):
+        imported = set()
+        for global_ctx in ctx_all.values():
+            imported.update(global_ctx.get_imports())
+
+        def ctx_root(ctx_name):
+            parts = ctx_name.split(".")
+            return f"{parts[0]}.{parts[1]}" if parts[0] in {"apps", "modules"} else ctx_name
+
+        for global_ctx_name in ctx_changed:
+            root = ctx_root(global_ctx_name)
+            if (
+                global_ctx_name.startswith("modules.")
+                or global_ctx_name in ctx_import_reload
+                or global_ctx_name in imported
+                or ctx_all[global_ctx_name].module is not None
+                or not ctx2files[global_ctx_name].autoload
+                or any(
+                    ctx_root(ctx_name) == root
+                    for ctx_name in (ctx_changed | ctx_import_reload) - {global_ctx_name}
+                )
+            ):
+                continue
+            ctx_incremental.add(global_ctx_name)
+            ctx_delete.discard(global_ctx_name)
+            ctx2files[global_ctx_name].force = False
+
     #
     # if any file in an app or module has changed, then reload just the top-level
     # __init__.py or module/app .py file, and delete everything else
@@ -696,6 +772,17 @@ async def load_scripts(hass: HomeAssistant, config_data: Dict[str, Any], global_
                 ctx_delete.add(ctx_name)
         done.add(root)
 
+    #
+    # reload the incremental contexts; any that can't be done that way get a full reload
+    #
+    for global_ctx_name in sorted(ctx_incremental):
+        src_info = ctx2files[global_ctx_name]
+        if not await GlobalContextMgr.reload_incremental(
+            ctx_all[global_ctx_name], src_info.file_path, src_info.source, src_info.mtime
+        ):
+            ctx_delete.add(global_ctx_name)
+            src_info.force = True
+
     #
     # delete contexts that are no longer needed or will be reloaded
     #
@@ -31,10 +31,17 @@ ATTR_VERSION = "version"
 
 CONF_ALLOW_ALL_IMPORTS = "allow_all_imports"
 CONF_HASS_IS_GLOBAL = "hass_is_global"
+CONF_STATE_TRIGGER_COALESCE = "state_trigger_coalesce"
+CONF_TRIGGER_STATS_SENSORS = "trigger_stats_sensors"
+CONF_INCREMENTAL_RELOAD = "incremental_reload"
+CONF_LOOP_HOLD_WARN = "loop_hold_warn"
+CONF_POOL_WORKERS = "pool_workers"
 CONF_INSTALLED_PACKAGES = "_installed_packages"
 
 SERVICE_JUPYTER_KERNEL_START = "jupyter_kernel_start"
 SERVICE_GENERATE_STUBS = "generate_stubs"
+SERVICE_SCHEDULER_STATS = "scheduler_stats"
+SERVICE_TRIGGER_STATS = "trigger_stats"
 
 LOGGER_PATH = "custom_components.pyscript"
 
@@ -43,6 +50,9 @@ REQUIREMENTS_PATHS = ("", "apps/*", "modules/*", "scripts/**")
 
 WATCHDOG_TASK = "watch_dog_task"
 
+PARSE_CACHE_FOLDER = "pyscript_parse_cache"
+PARSE_CACHE_VERSION = 2
+
 ALLOWED_IMPORTS = {
     "black",
     "cmath",
@@ -10,6 +10,7 @@ import inspect
 import io
 import keyword
 import logging
+import operator
 import sys
 import time
 import traceback
@@ -62,6 +63,7 @@ TRIG_SERV_DECORATORS = TRIG_DECORATORS.union({"service"})
 COMP_DECORATORS = {
     "pyscript_compile",
     "pyscript_executor",
+    "pyscript_pool",
 }
 
 TRIGGER_KWARGS = {
@@ -238,6 +240,32 @@ class EvalContinue(EvalStopFlow):
     _name = "continue"
 
 
+class EvalStopIteration(Exception):
+    """Carries a StopIteration raised by pyscript code.
+
+    A StopIteration leaving a coroutine is turned into a RuntimeError (PEP 479), so
+    it travels through the interpreter's coroutines wrapped in this exception, and
+    is unwrapped where except clauses are matched and exceptions are reported.
+    """
+
+    def __init__(self, exc):
+        """Initialize with the StopIteration to carry."""
+        super().__init__(*exc.args)
+        self.exc = exc
+
+    @classmethod
+    def wrap(cls, exc):
+        """Return exc to raise, wrapped if it is a StopIteration instance or class."""
+        if isinstance(exc, type) and issubclass(exc, StopIteration):
+            exc = exc()
+        return cls(exc) if isinstance(exc, StopIteration) else exc
+
+    @staticmethod
+    def unwrap(exc):
+        """Return the exception pyscript code should see for exc."""
+        return exc.exc if isinstance(exc, EvalStopIteration) else exc
+
+
 class EvalLocalVar:
     """Wrapper for local variable symtable entry."""
 
@@ -312,6 +340,78 @@ class EvalAttrSet:
         return getattr(self.obj, self.attr)
 
 
+class EvalGenerator:
+    """Class for a lazily evaluated generator expression.
+
+    Each element is only evaluated when the next value is requested, so any(),
+    all(), next() and sum() can stop early.  The loop variables live in their own
+    scope, which is swapped into the defining symbol table only while the next
+    value is computed.
+    """
+
+    def __init__(self, ast_ctx, arg, first_iter):
+        """Initialize the generator; the outermost iterable is already evaluated."""
+        self.ast_ctx = ast_ctx
+        self.arg = arg
+        self.sym_table = ast_ctx.sym_table
+        self.steps = ast_ctx.comp_iter(arg.generators, first_iter)
+        self.target_vars = None
+        self.loop_vals = {}
+        self.done = False
+
+    async def next_value(self):
+        """Return the next value, or raise StopAsyncIteration when exhausted."""
+        if self.done:
+            raise StopAsyncIteration
+        ast_ctx = self.ast_ctx
+        if self.target_vars is None:
+            self.target_vars, _ = await ast_ctx.loopvar_scope_save(self.arg.generators)
+        prev_sym_table = ast_ctx.sym_table
+        ast_ctx.sym_table = sym_table = self.sym_table
+        save_values = {var: sym_table[var] for var in self.target_vars if var in sym_table}
+        sym_table.update(self.loop_vals)
+        try:
+            await self.steps.__anext__()
+            return await ast_ctx.aeval(self.arg.elt)
+        except BaseException:
+            self.done = True
+            raise
+        finally:
+            self.loop_vals = {var: sym_table[var] for var in self.target_vars if var in sym_table}
+            await ast_ctx.loopvar_scope_restore(self.target_vars, save_values)
+            ast_ctx.sym_table = prev_sym_table
+
+    def __aiter__(self):
+        """Return the async iterator."""
+        return self
+
+    async def __anext__(self):
+        """Return the next value."""
+        return await self.next_value()
+
+    async def materialize(self):
+        """Return the remaining values as a list."""
+        return [val async for val in self]
+
+    async def contains(self, value):
+        """Return whether the generator yields value, consuming it up to the match like python."""
+        async for val in self:
+            if val is value or val == value:
+                return True
+        return False
+
+    @staticmethod
+    async def sync_iter(value):
+        """Return value, or an iterator over the remaining values if it's an EvalGenerator.
+
+        Generator expressions stay lazy only while pyscript code consumes them; this is
+        used wherever a regular python iterable is needed instead.
+        """
+        if isinstance(value, EvalGenerator):
+            return iter(await value.materialize())
+        return value
+
+
 class EvalFunc:
     """Class for a callable pyscript function."""
 
@@ -341,6 +441,14 @@ class EvalFunc:
         self.trigger_service = set()
         self.has_closure = False
         self.async_func = async_func
+        self.loop_hold_cnt = 0
+        self.loop_hold_warned = False
+        #
+        # list of (stmt, closure) pairs for the body, compiled by resolve_nonlocals once
+        # the names are known and reused on every call; None runs the body through the
+        # AST interpreter instead
+        #
+        self.body_compiled = None
 
     def get_name(self):
         """Return the function name."""
@@ -591,6 +699,14 @@ class EvalFunc:
         if trig_ctx.trigger_register(self):
             self.trigger_start()
 
+    async def update_def(self, ast_ctx, func_def):
+        """Switch to an identical, re-parsed definition so line numbers match ast_ctx's source."""
+        await self.analyze_names(ast_ctx, func_def)
+        self.func_def = func_def
+        self.code_list, self.code_str = ast_ctx.code_list, ast_ctx.code_str
+        if self.body_compiled is not None:
+            self.body_compiled = AstCompile.compile_body_cached(func_def)
+
     def trigger_start(self):
         """Start any triggers for this function."""
         for trigger in self.trigger:
@@ -630,34 +746,56 @@ class EvalFunc:
         ast_ctx.code_str, ast_ctx.code_list = code_str, code_list
         return dec_trig, reversed(dec_other)
 
-    async def resolve_nonlocals(self, ast_ctx):
-        """Tag local variables and resolve nonlocals."""
-
+    @classmethod
+    async def analyze_names(cls, ast_ctx, func_def):
+        """Return the names used by func_def, which is only analyzed once and saved on the node."""
+        names = getattr(func_def, "pyscript_names", None)
+        if names is not None:
+            return names
         #
         # determine the list of local variables, nonlocal and global
         # arguments are local variables too
         #
-        args = self.get_positional_args()
-        if self.func_def.args.vararg:
-            args.append(self.func_def.args.vararg.arg)
-        if self.func_def.args.kwarg:
-            args.append(self.func_def.args.kwarg.arg)
-        for kwonlyarg in self.func_def.args.kwonlyargs:
+        args = [arg.arg for arg in func_def.args.posonlyargs + func_def.args.args]
+        if func_def.args.vararg:
+            args.append(func_def.args.vararg.arg)
+        if func_def.args.kwarg:
+            args.append(func_def.args.kwarg.arg)
+        for kwonlyarg in func_def.args.kwonlyargs:
             args.append(kwonlyarg.arg)
         nonlocal_names = set()
         global_names = set()
         var_names = set(args)
-        self.local_names = set(args)
-        for stmt in self.func_def.body:
-            self.has_closure = self.has_closure or await self.check_for_closure(stmt)
+        local_names = set(args)
+        has_closure = False
+        for stmt in func_def.body:
+            has_closure = has_closure or await cls.check_for_closure(stmt)
             var_names = var_names.union(
                 await ast_ctx.get_names(
                     stmt,
                     nonlocal_names=nonlocal_names,
                     global_names=global_names,
-                    local_names=self.local_names,
+                    local_names=local_names,
                 )
             )
+        names = {
+            "var_names": var_names,
+            "nonlocal_names": nonlocal_names,
+            "global_names": global_names,
+            "local_names": local_names,
+            "has_closure": has_closure,
+        }
+        func_def.pyscript_names = names
+        return names
+
+    async def resolve_nonlocals(self, ast_ctx):
+        """Tag local variables and resolve nonlocals."""
+        names = await self.analyze_names(ast_ctx, self.func_def)
+        var_names = names["var_names"]
+        nonlocal_names = names["nonlocal_names"]
+        global_names = names["global_names"]
+        self.local_names = set(names["local_names"])
+        self.has_closure = self.has_closure or names["has_closure"]
         for var_name in var_names:
             got_dot = var_name.find(".")
             if got_dot >= 0:
@@ -684,6 +822,7 @@ class EvalFunc:
                     val = await ast_ctx.ast_name(ast.Name(id=var_name, ctx=ast.Load()))
                     if isinstance(val, EvalName) and got_dot < 0:
                         raise SyntaxError(f"no binding for nonlocal '{var_name}' found")
+        self.body_compiled = AstCompile.compile_body_cached(self.func_def)
 
     def get_decorators(self):
         """Return the function decorators."""
@@ -700,9 +839,11 @@ class EvalFunc:
             args.append(arg.arg)
         return args
 
-    async def try_aeval(self, ast_ctx, arg):
-        """Call self.aeval and capture exceptions."""
+    async def try_aeval(self, ast_ctx, arg, compiled=None):
+        """Call self.aeval (or the compiled closure for arg) and capture exceptions."""
         try:
+            if compiled is not None:
+                return await compiled(ast_ctx)
             return await ast_ctx.aeval(arg)
         except asyncio.CancelledError:
             raise
@@ -802,15 +943,35 @@ class EvalFunc:
         ast_ctx.user_locals = {}
         ast_ctx.curr_func = self
         del args, kwargs
-        for arg1 in self.func_def.body:
-            val = await self.try_aeval(ast_ctx, arg1)
-            if isinstance(val, EvalReturn):
-                val = val.value
-                break
-            # return None at end if there isn't a return
-            val = None
-            if ast_ctx.get_exception_obj():
-                break
+        if self.body_compiled is not None:
+            body = self.body_compiled
+        else:
+            body = [(arg1, None) for arg1 in self.func_def.body]
+        check_loop_hold = Function.loop_hold_warn > 0
+        if check_loop_hold:
+            #
+            # clock is [secs held so far, start of the current synchronous slice];
+            # await_suspend restarts it whenever the function really suspends
+            #
+            start_wall = time.perf_counter()
+            clock = [0.0, start_wall]
+            ast_ctx.loop_hold_clocks.append(clock)
+        try:
+            for arg1, stmt in body:
+                val = await self.try_aeval(ast_ctx, arg1, stmt)
+                if isinstance(val, EvalReturn):
+                    val = await EvalGenerator.sync_iter(val.value)
+                    break
+                # return None at end if there isn't a return
+                val = None
+                if ast_ctx.get_exception_obj():
+                    break
+        finally:
+            if check_loop_hold:
+                ast_ctx.loop_hold_clocks.remove(clock)
+        if check_loop_hold:
+            now = time.perf_counter()
+            self.check_loop_hold(clock[0] + now - clock[1], now - start_wall)
         ast_ctx.curr_func = prev_func
         ast_ctx.user_locals = save_user_locals
         ast_ctx.code_str, ast_ctx.code_list = code_str, code_list
@@ -825,12 +986,41 @@ class EvalFunc:
             ast_ctx.sym_table = ast_ctx.sym_table_stack.pop()
         return val
 
-    async def check_for_closure(self, arg):
+    def check_loop_hold(self, held_secs, wall_secs):
+        """Warn if this function keeps holding the event loop for longer than Function.loop_hold_warn.
+
+        held_secs is the wall time summed over the synchronous slices of the call, so
+        blocking I/O counts too; time spent suspended in awaits, when other tasks run,
+        is not counted.
+        """
+        if held_secs < Function.loop_hold_warn:
+            return
+        self.loop_hold_cnt += 1
+        _LOGGER.debug(
+            "%s.%s held the event loop for %.3f secs (%.3f secs wall time)",
+            self.global_ctx_name,
+            self.name,
+            held_secs,
+            wall_secs,
+        )
+        if self.loop_hold_cnt >= Function.LOOP_HOLD_WARN_COUNT and not self.loop_hold_warned:
+            self.loop_hold_warned = True
+            self.logger.warning(
+                "%s() has held the event loop for more than %g secs on %d calls (last %.3f secs); "
+                "consider moving the heavy code to a @pyscript_pool or @pyscript_executor function",
+                self.name,
+                Function.loop_hold_warn,
+                self.loop_hold_cnt,
+                held_secs,
+            )
+
+    @classmethod
+    async def check_for_closure(cls, arg):
         """Recursively check ast tree arg and return True if there is an inner function or class."""
         if isinstance(arg, (ast.FunctionDef, ast.ClassDef, ast.AsyncFunctionDef)):
             return True
         for child in ast.iter_child_nodes(arg):
-            if await self.check_for_closure(child):
+            if await cls.check_for_closure(child):
                 return True
         return False
 
@@ -930,6 +1120,7 @@ class AstEval:
         self.set_logger_name(logger_name if logger_name is not None else self.name)
         self.config_entry = Function.hass.data.get(DOMAIN, {}).get(CONFIG_ENTRY, {})
         self.dec_eval_depth = 0
+        self.loop_hold_clocks = []
 
     async def ast_not_implemented(self, arg, *args):
         """Raise NotImplementedError exception for unimplemented AST types."""
@@ -949,12 +1140,17 @@ class AstEval:
             return val
         except Exception as err:
             if not self.exception_obj:
-                func_name = self.curr_func.get_name() + "(), " if self.curr_func else ""
-                self.exception_obj = err
-                self.exception = f"Exception in {func_name}{self.filename} line {self.lineno} column {self.col_offset}: {err}"
-                self.exception_long = self.format_exc(err, self.lineno, self.col_offset)
+                self.capture_exception(err)
             raise
 
+    def capture_exception(self, err):
+        """Record err as the current exception, using the last lineno and col_offset visited."""
+        func_name = self.curr_func.get_name() + "(), " if self.curr_func else ""
+        self.exception_obj = err
+        err = EvalStopIteration.unwrap(err)
+        self.exception = f"Exception in {func_name}{self.filename} line {self.lineno} column {self.col_offset}: {err}"
+        self.exception_long = self.format_exc(err, self.lineno, self.col_offset)
+
     # Statements return NONE, EvalBreak, EvalContinue, EvalReturn
     async def ast_module(self, arg):
         """Execute ast_module - a list of statements."""
@@ -1052,7 +1248,10 @@ class AstEval:
 
     async def ast_for(self, arg):
         """Execute for statement."""
-        for loop_var in await self.aeval(arg.iter):
+        iterable = await self.aeval(arg.iter)
+        if isinstance(iterable, EvalGenerator):
+            iterable = await iterable.materialize()
+        for loop_var in iterable:
             await self.recurse_assign(arg.target, loop_var)
             for arg1 in arg.body:
                 val = await self.aeval(arg1)
@@ -1165,20 +1364,22 @@ class AstEval:
             exec(code, self.global_sym_table, self.sym_table)  # pylint: disable=exec-used
 
             func = self.sym_table[arg.name]
-            if dec_name == "pyscript_executor":
+            if dec_name in {"pyscript_executor", "pyscript_pool"}:
                 if not asyncio.iscoroutinefunction(func):
+                    if dec_name == "pyscript_executor":
+                        executor_job = Function.hass.async_add_executor_job
+                    else:
+                        executor_job = Function.pool_executor_job
 
                     def executor_wrap_factory(func):
                         async def executor_wrap(*args, **kwargs):
-                            return await Function.hass.async_add_executor_job(
-                                functools.partial(func, **kwargs), *args
-                            )
+                            return await executor_job(functools.partial(func, **kwargs), *args)
 
                         return executor_wrap
 
                     self.sym_table[arg.name] = executor_wrap_factory(func)
                 else:
-                    raise TypeError("@pyscript_executor() needs a regular, not async, function")
+                    raise TypeError(f"@{dec_name}() needs a regular, not async, function")
             if local_var:
                 self.sym_table[arg.name] = local_var
                 self.sym_table[arg.name].set(func)
@@ -1254,7 +1455,7 @@ class AstEval:
                     raise self.exception_obj
         except Exception as err:
             curr_exc = self.exception_curr
-            self.exception_curr = err
+            self.exception_curr = caught = EvalStopIteration.unwrap(err)
             for handler in arg.handlers:
                 match = False
                 if handler.type:
@@ -1262,7 +1463,7 @@ class AstEval:
                     if not isinstance(exc_list, tuple):
                         exc_list = [exc_list]
                     for exc in exc_list:
-                        if isinstance(err, exc):
+                        if isinstance(caught, exc):
                             match = True
                             break
                 else:
@@ -1278,9 +1479,9 @@ class AstEval:
                         if handler.name in self.sym_table and isinstance(
                             self.sym_table[handler.name], EvalLocalVar
                         ):
-                            self.sym_table[handler.name].set(err)
+                            self.sym_table[handler.name].set(caught)
                         else:
-                            self.sym_table[handler.name] = err
+                            self.sym_table[handler.name] = caught
                     for arg1 in handler.body:
                         try:
                             val = await self.aeval(arg1)
@@ -1332,6 +1533,8 @@ class AstEval:
             exc = await self.aeval(arg.exc)
         if self.exception_curr:
             exc.__cause__ = self.exception_curr
+        # a StopIteration would turn into a RuntimeError leaving this coroutine
+        exc = EvalStopIteration.wrap(exc)
         if arg.cause:
             cause = await self.aeval(arg.cause)
             raise exc from cause
@@ -1363,11 +1566,14 @@ class AstEval:
                 val = await self.aeval(arg1)
                 if isinstance(val, EvalStopFlow):
                     break
-        except Exception:
+        except Exception as err:
             hit_except = True
             exit_ok = True
+            err = EvalStopIteration.unwrap(err)
             for ctx in reversed(ctx_list):
-                ret = await self.call_func(ctx["exit"], exit_attr, ctx["manager"], *sys.exc_info())
+                ret = await self.call_func(
+                    ctx["exit"], exit_attr, ctx["manager"], type(err), err, err.__traceback__
+                )
                 exit_ok = exit_ok and ret
             if not exit_ok:
                 raise
@@ -1421,6 +1627,7 @@ class AstEval:
     async def recurse_assign(self, lhs, val):
         """Recursive assignment."""
         if isinstance(lhs, ast.Tuple):
+            val = await EvalGenerator.sync_iter(val)
             try:
                 vals = [*(iter(val))]
             except Exception:
@@ -1763,11 +1970,17 @@ class AstEval:
 
     async def ast_cmpop_in(self, arg0, arg1):
         """Evaluate comparison operator: in."""
-        return (await self.aeval(arg0)) in (await self.aeval(arg1))
+        val0, val1 = await self.aeval(arg0), await self.aeval(arg1)
+        if isinstance(val1, EvalGenerator):
+            return await val1.contains(val0)
+        return val0 in val1
 
     async def ast_cmpop_notin(self, arg0, arg1):
         """Evaluate comparison operator: not in."""
-        return (await self.aeval(arg0)) not in (await self.aeval(arg1))
+        val0, val1 = await self.aeval(arg0), await self.aeval(arg1)
+        if isinstance(val1, EvalGenerator):
+            return not await val1.contains(val0)
+        return val0 not in val1
 
     async def ast_boolop(self, arg):
         """Evaluate boolean operators and and or."""
@@ -1790,7 +2003,7 @@ class AstEval:
         val = []
         for arg in elts:
             if isinstance(arg, ast.Starred):
-                val += await self.aeval(arg.value)
+                val += await EvalGenerator.sync_iter(await self.aeval(arg.value))
             else:
                 val.append(await self.aeval(arg))
         return val
@@ -1826,20 +2039,44 @@ class AstEval:
                     # assigned to, so deleting them will fail.
                     pass
 
-    async def listcomp_loop(self, generators, elt):
-        """Recursive list comprehension."""
-        out = []
-        gen = generators[0]
-        for loop_var in await self.aeval(gen.iter):
+    async def comp_iter(self, generators, first_iter):
+        """Yield once for each iteration of the innermost comprehension loop.
+
+        first_iter is the already evaluated outermost iterable.  The loop targets
+        are assigned and the ifs checked before each yield.  An explicit stack of
+        iterators is used instead of recursing on generators[1:], so nested loops
+        don't copy the generator list or build partial results.
+        """
+        num_gens = len(generators)
+        iters = [first_iter if isinstance(first_iter, EvalGenerator) else iter(first_iter)]
+        while iters:
+            depth = len(iters) - 1
+            this_iter = iters[-1]
+            try:
+                if isinstance(this_iter, EvalGenerator):
+                    loop_var = await this_iter.next_value()
+                else:
+                    loop_var = next(this_iter)
+            except (StopIteration, StopAsyncIteration):
+                iters.pop()
+                continue
+            gen = generators[depth]
             await self.recurse_assign(gen.target, loop_var)
             for cond in gen.ifs:
                 if not await self.aeval(cond):
                     break
             else:
-                if len(generators) == 1:
-                    out.append(await self.aeval(elt))
+                if depth + 1 == num_gens:
+                    yield
                 else:
-                    out += await self.listcomp_loop(generators[1:], elt)
+                    next_iter = await self.aeval(generators[depth + 1].iter)
+                    iters.append(next_iter if isinstance(next_iter, EvalGenerator) else iter(next_iter))
+
+    async def listcomp_loop(self, generators, elt):
+        """Evaluate list comprehension loops."""
+        out = []
+        async for _ in self.comp_iter(generators, await self.aeval(generators[0].iter)):
+            out.append(await self.aeval(elt))
         return out
 
     async def ast_listcomp(self, arg):
@@ -1865,23 +2102,14 @@ class AstEval:
         return val
 
     async def dictcomp_loop(self, generators, key, value):
-        """Recursive dict comprehension."""
+        """Evaluate dict comprehension loops."""
         out = {}
-        gen = generators[0]
-        for loop_var in await self.aeval(gen.iter):
-            await self.recurse_assign(gen.target, loop_var)
-            for cond in gen.ifs:
-                if not await self.aeval(cond):
-                    break
-            else:
-                if len(generators) == 1:
-                    #
-                    # key is evaluated before value starting in 3.8
-                    #
-                    key_val = await self.aeval(key)
-                    out[key_val] = await self.aeval(value)
-                else:
-                    out.update(await self.dictcomp_loop(generators[1:], key, value))
+        async for _ in self.comp_iter(generators, await self.aeval(generators[0].iter)):
+            #
+            # key is evaluated before value starting in 3.8
+            #
+            key_val = await self.aeval(key)
+            out[key_val] = await self.aeval(value)
         return out
 
     async def ast_dictcomp(self, arg):
@@ -1899,19 +2127,10 @@ class AstEval:
         return ret
 
     async def setcomp_loop(self, generators, elt):
-        """Recursive list comprehension."""
+        """Evaluate set comprehension loops."""
         out = set()
-        gen = generators[0]
-        for loop_var in await self.aeval(gen.iter):
-            await self.recurse_assign(gen.target, loop_var)
-            for cond in gen.ifs:
-                if not await self.aeval(cond):
-                    break
-            else:
-                if len(generators) == 1:
-                    out.add(await self.aeval(elt))
-                else:
-                    out.update(await self.setcomp_loop(generators[1:], elt))
+        async for _ in self.comp_iter(generators, await self.aeval(generators[0].iter)):
+            out.add(await self.aeval(elt))
         return out
 
     async def ast_setcomp(self, arg):
@@ -1921,6 +2140,13 @@ class AstEval:
         await self.loopvar_scope_restore(target_vars, save_values)
         return result
 
+    async def ast_generatorexp(self, arg):
+        """Evaluate generator expression, returning a lazy EvalGenerator."""
+        #
+        # like python, the outermost iterable is evaluated right away
+        #
+        return EvalGenerator(self, arg, await self.aeval(arg.generators[0].iter))
+
     async def ast_subscript(self, arg):
         """Evaluate subscript."""
         var = await self.aeval(arg.value)
@@ -1966,6 +2192,26 @@ class AstEval:
             func = func.get()
         return await self.call_func(func, func_name, *args, **kwargs)
 
+    async def await_suspend(self, awaitable):
+        """Await awaitable; if it really suspends, restart the loop hold clocks of the running functions."""
+        if not self.loop_hold_clocks:
+            return await awaitable
+        #
+        # the callback only runs if the loop gets control back before awaitable is done
+        #
+        suspended = []
+        handle = asyncio.get_running_loop().call_soon(suspended.append, True)
+        start = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            handle.cancel()
+            if suspended:
+                now = time.perf_counter()
+                for clock in self.loop_hold_clocks:
+                    clock[0] += start - clock[1]
+                    clock[1] = now
+
     async def call_func(self, func, func_name, *args, **kwargs):
         """Call a function with the given arguments."""
         if func_name is None:
@@ -2005,8 +2251,14 @@ class AstEval:
                 #
                 await inst.__init__evalfunc_wrap__.call(self, *args, **kwargs)
             return inst
+        for this_arg in args:
+            if isinstance(this_arg, EvalGenerator):
+                return await self.call_func_generator(func, func_name, args, kwargs)
+        for this_arg in kwargs.values():
+            if isinstance(this_arg, EvalGenerator):
+                return await self.call_func_generator(func, func_name, args, kwargs)
         if asyncio.iscoroutinefunction(func):
-            return await func(*args, **kwargs)
+            return await self.await_suspend(func(*args, **kwargs))
         if callable(func):
             if func == time.sleep:  # pylint: disable=comparison-with-callable
                 _LOGGER.warning(
@@ -2014,10 +2266,47 @@ class AstEval:
                     self.filename,
                     self.lineno,
                 )
-                return await asyncio.sleep(*args, **kwargs)
-            return func(*args, **kwargs)
+                return await self.await_suspend(asyncio.sleep(*args, **kwargs))
+            try:
+                return func(*args, **kwargs)
+            except StopIteration as err:
+                raise EvalStopIteration(err) from None
         raise TypeError(f"'{func_name}' is not callable (got {func})")
 
+    async def call_func_generator(self, func, func_name, args, kwargs):
+        """Call a python function with one or more generator expression arguments.
+
+        any, all, next and sum consume the generator lazily, so they stop as soon
+        as the result is known; other functions get an iterator over the values.
+        """
+        gen = args[0] if args else None
+        if isinstance(gen, EvalGenerator):
+            if func is builtins.any and len(args) == 1 and not kwargs:
+                async for val in gen:
+                    if val:
+                        return True
+                return False
+            if func is builtins.all and len(args) == 1 and not kwargs:
+                async for val in gen:
+                    if not val:
+                        return False
+                return True
+            if func is builtins.next and len(args) <= 2 and not kwargs:
+                try:
+                    return await gen.next_value()
+                except StopAsyncIteration:
+                    if len(args) == 2:
+                        return args[1]
+                    raise EvalStopIteration(StopIteration()) from None
+            if func is builtins.sum and len(args) + len(kwargs) <= 2 and set(kwargs) <= {"start"}:
+                total = args[1] if len(args) == 2 else kwargs.get("start", 0)
+                async for val in gen:
+                    total = total + val
+                return total
+        args = [await EvalGenerator.sync_iter(arg) for arg in args]
+        kwargs = {name: await EvalGenerator.sync_iter(arg) for name, arg in kwargs.items()}
+        return await self.call_func(func, func_name, *args, **kwargs)
+
     async def ast_ifexp(self, arg):
         """Evaluate if expression."""
         return await self.aeval(arg.body) if (await self.aeval(arg.test)) else await self.aeval(arg.orelse)
@@ -2058,7 +2347,7 @@ class AstEval:
         """Evaluate await expr."""
         coro = await self.aeval(arg.value)
         if coro and (asyncio.iscoroutine(coro) or asyncio.isfuture(coro)):
-            return await coro
+            return await self.await_suspend(coro)
         return coro
 
     async def get_target_names(self, lhs):
@@ -2120,7 +2409,7 @@ class AstEval:
                         for name in await self.get_target_names(item.optional_vars):
                             local_names.add(name)
                             names.add(name)
-            elif cls_name in {"ListComp", "DictComp", "SetComp"}:
+            elif cls_name in {"ListComp", "DictComp", "SetComp", "GeneratorExp"}:
                 target_vars, _ = await self.loopvar_scope_save(arg.generators)
                 for name in target_vars:
                     local_names.add(name)
@@ -2166,8 +2455,8 @@ class AstEval:
             await self.get_names_set(this_ast, names, nonlocal_names, global_names, local_names)
         return names
 
-    def parse(self, code_str, filename=None, mode="exec"):
-        """Parse the code_str source code into an AST tree."""
+    def parse(self, code_str, filename=None, mode="exec", tree=None):
+        """Parse the code_str source code into an AST tree, or use tree if already parsed."""
         self.exception = None
         self.exception_obj = None
         self.exception_long = None
@@ -2184,7 +2473,10 @@ class AstEval:
             else:
                 self.code_str = code_str
                 self.code_list = []
-            self.ast = ast.parse(self.code_str, filename=self.filename, mode=mode)
+            if tree is not None:
+                self.ast = tree
+            else:
+                self.ast = ast.parse(self.code_str, filename=self.filename, mode=mode)
             return True
         except SyntaxError as err:
             self.exception_obj = err
@@ -2334,7 +2626,7 @@ class AstEval:
                 val = await self.aeval(self.ast)
                 if isinstance(val, EvalStopFlow):
                     return None
-                return val
+                return await EvalGenerator.sync_iter(val)
             except asyncio.CancelledError:
                 raise
             except Exception as err:
@@ -2345,3 +2637,932 @@ class AstEval:
     def dump(self, this_ast=None):
         """Dump the AST tree for debugging."""
         return ast.dump(this_ast if this_ast else self.ast)
+
+
+class AstCompile:
+    """Compile AST nodes into trees of async closures that take an AstEval context.
+
+    Each closure does the same work as the corresponding AstEval.ast_* method, but the
+    dispatch on node class, operator lookups and child lists are resolved once at
+    compile time instead of on every visit.  Closures set lineno and col_offset and
+    record exceptions exactly like AstEval.aeval, so error reporting is unchanged.
+    Node types without a compiled form fall back to the AstEval.ast_* method, which
+    interprets that subtree as before.
+    """
+
+    BINOPS = {
+        ast.Add: operator.add,
+        ast.Sub: operator.sub,
+        ast.Mult: operator.mul,
+        ast.Div: operator.truediv,
+        ast.Mod: operator.mod,
+        ast.Pow: operator.pow,
+        ast.LShift: operator.lshift,
+        ast.RShift: operator.rshift,
+        ast.BitOr: operator.or_,
+        ast.BitXor: operator.xor,
+        ast.BitAnd: operator.and_,
+        ast.FloorDiv: operator.floordiv,
+    }
+
+    UNARYOPS = {
+        ast.Not: operator.not_,
+        ast.Invert: operator.invert,
+        ast.UAdd: lambda val: val,
+        ast.USub: operator.neg,
+    }
+
+    CMPOPS = {
+        ast.Eq: operator.eq,
+        ast.NotEq: operator.ne,
+        ast.Lt: operator.lt,
+        ast.LtE: operator.le,
+        ast.Gt: operator.gt,
+        ast.GtE: operator.ge,
+        ast.Is: operator.is_,
+        ast.IsNot: operator.is_not,
+        ast.In: lambda val0, val1: val0 in val1,
+        ast.NotIn: lambda val0, val1: val0 not in val1,
+    }
+
+    #
+    # compiled function bodies, keyed by the FunctionDef node so that inner
+    # functions and re-definitions of the same parsed code only compile once
+    #
+    body_cache = weakref.WeakKeyDictionary()
+
+    def __init__(self, names=None):
+        """Initialize the compiler; names is the EvalFunc.analyze_names result for a function body."""
+        if names is None:
+            self.global_names = self.local_names = None
+        else:
+            self.global_names = names["global_names"]
+            self.local_names = names["local_names"] - names["nonlocal_names"] - names["global_names"]
+
+    @classmethod
+    def compile_body_cached(cls, func_def):
+        """Return the list of (stmt, closure) pairs for a function body, compiling it if needed."""
+        body = cls.body_cache.get(func_def)
+        if body is None:
+            compiler = cls(getattr(func_def, "pyscript_names", None))
+            body = [(stmt, compiler.compile(stmt)) for stmt in func_def.body]
+            cls.body_cache[func_def] = body
+        return body
+
+    def name_scope(self, var_name):
+        """Return whether var_name is "global", "local" or "free" in the body being compiled, or None if unknown."""
+        if self.local_names is None:
+            return None
+        if var_name in self.global_names:
+            return "global"
+        if var_name in self.local_names:
+            return "local"
+        return "free"
+
+    def compile(self, node):
+        """Return an async closure that evaluates node given an AstEval context."""
+        method = getattr(self, "compile_" + node.__class__.__name__.lower(), None)
+        if method is not None:
+            compiled = method(node)
+            if compiled is not None:
+                return compiled
+        return self.compile_fallback(node)
+
+    def compile_nodes(self, nodes):
+        """Compile a list of nodes."""
+        return [self.compile(node) for node in nodes]
+
+    @staticmethod
+    def location(node):
+        """Return the lineno and col_offset of node, or None if it doesn't have one."""
+        if hasattr(node, "lineno"):
+            return node.lineno, node.col_offset
+        return None
+
+    def compile_fallback(self, node):
+        """Evaluate node with the AstEval.ast_* method for its class."""
+        handler = getattr(AstEval, "ast_" + node.__class__.__name__.lower(), AstEval.ast_not_implemented)
+        loc = self.location(node)
+
+        async def fallback(ctx):
+            try:
+                if loc:
+                    ctx.lineno, ctx.col_offset = loc
+                val = await handler(ctx, node)
+                if isinstance(val, EvalName):
+                    raise NameError(f"name '{val.name}' is not defined")
+                return val
+            except Exception as err:
+                if not ctx.exception_obj:
+                    ctx.capture_exception(err)
+                raise
+
+        return fallback
+
+    def compile_stmt_list(self, stmts):
+        """Compile a list of statements into a closure that stops on EvalStopFlow."""
+        body = self.compile_nodes(stmts)
+
+        async def stmt_list(ctx):
+            val = None
+            for stmt in body:
+                val = await stmt(ctx)
+                if isinstance(val, EvalStopFlow):
+                    return val
+            return val
+
+        return stmt_list
+
+    def compile_elt_list(self, elts):
+        """Compile list elements, which can include starred expressions."""
+        items = [
+            (True, self.compile(elt.value)) if isinstance(elt, ast.Starred) else (False, self.compile(elt))
+            for elt in elts
+        ]
+
+        async def elt_list(ctx):
+            val = []
+            for starred, item in items:
+                if starred:
+                    val += await EvalGenerator.sync_iter(await item(ctx))
+                else:
+                    val.append(await item(ctx))
+            return val
+
+        return elt_list
+
+    def compile_target(self, target):
+        """Compile an assignment target into a closure taking the context and value."""
+        if not isinstance(target, ast.Name):
+
+            async def assign_target(ctx, val):
+                await ctx.recurse_assign(target, val)
+
+            return assign_target
+
+        var_name = target.id
+        loc = self.location(target)
+        scope = self.name_scope(var_name)
+
+        if scope == "global":
+
+            async def assign_global(ctx, val):
+                if loc:
+                    ctx.lineno, ctx.col_offset = loc
+                ctx.global_sym_table[var_name] = val
+
+            return assign_global
+
+        if scope is not None:
+
+            async def assign_local(ctx, val):
+                if loc:
+                    ctx.lineno, ctx.col_offset = loc
+                sym_table = ctx.sym_table
+                if isinstance(sym_table.get(var_name), EvalLocalVar):
+                    sym_table[var_name].set(val)
+                else:
+                    sym_table[var_name] = val
+
+            return assign_local
+
+        async def assign_name(ctx, val):
+            if loc:
+                ctx.lineno, ctx.col_offset = loc
+            if ctx.curr_func and var_name in ctx.curr_func.global_names:
+                ctx.global_sym_table[var_name] = val
+                return
+            sym_table = ctx.sym_table
+            if var_name in sym_table and isinstance(sym_table[var_name], EvalLocalVar):
+                sym_table[var_name].set(val)
+            else:
+                sym_table[var_name] = val
+
+        return assign_name
+
+    def compile_expr(self, node):
+        """Compile expression statement."""
+        value = self.compile(node.value)
+        loc = self.location(node)
+
+        async def expr(ctx):
+            try:
+                if loc:
+                    ctx.lineno, ctx.col_offset = loc
+                return await value(ctx)
+            except Exception as err:
+                if not ctx.exception_obj:
+                    ctx.capture_exception(err)
+                raise
+
+        return expr
+
+    def compile_pass(self, node):
+        """Compile pass statement."""
+        loc = self.location(node)
+
+        async def pass_stmt(ctx):
+            if loc:
+                ctx.lineno, ctx.col_offset = loc
+
+        return pass_stmt
+
+    def compile_break(self, node):
+        """Compile break statement."""
+        loc = self.location(node)
+
+        async def break_stmt(ctx):
+            if loc:
+                ctx.lineno, ctx.col_offset = loc
+            return EvalBreak()
+
+        return break_stmt
+
+    def compile_continue(self, node):
+        """Compile continue statement."""
+        loc = self.location(node)
+
+        async def continue_stmt(ctx):
+            if loc:
+                ctx.lineno, ctx.col_offset = loc
+            return EvalContinue()
+
+        return continue_stmt
+
+    def compile_return(self, node):
+        """Compile return statement."""
+        value = self.compile(node.value) if node.value else None
+        loc = self.location(node)
+
+        async def return_stmt(ctx):
+            try:
+                if loc:
+                    ctx.lineno, ctx.col_offset = loc
+                return EvalReturn(await value(ctx) if value else None)
+            except Exception as err:
+                if not ctx.exception_obj:
+                    ctx.capture_exception(err)
+                raise
+
+        return return_stmt
+
+    def compile_assign(self, node):
+        """Compile assignment statement."""
+        value = self.compile(node.value)
+        targets = [self.compile_target(target) for target in node.targets]
+        loc = self.location(node)
+
+        async def assign(ctx):
+            try:
+                if loc:
+                    ctx.lineno, ctx.col_offset = loc
+                rhs = await value(ctx)
+                for target in targets:
+                    await target(ctx, rhs)
+            except Exception as err:
+                if not ctx.exception_obj:
+                    ctx.capture_exception(err)
+                raise
+
+        return assign
+
+    def compile_augassign(self, node):
+        """Compile augmented assignment to a plain name; other targets use the interpreter."""
+        if not isinstance(node.target, ast.Name) or type(node.op) not in self.BINOPS:
+            return None
+        load = self.compile(
+            ast.Name(
+                id=node.target.id,
+                ctx=ast.Load(),
+                lineno=node.target.lineno,
+                col_offset=node.target.col_offset,
+            )
+        )
+        value = self.compile(node.value)
+        binop = self.BINOPS[type(node.op)]
+        target = self.compile_target(node.target)
+        loc = self.location(node)
+
+        async def augassign(ctx):
+            try:
+                if loc:
+                    ctx.lineno, ctx.col_offset = loc
+                await target(ctx, binop(await load(ctx), await value(ctx)))
+            except Exception as err:
+                if not ctx.exception_obj:
+                    ctx.capture_exception(err)
+                raise
+
+        return augassign
+
+    def compile_if(self, node):
+        """Compile if statement."""
+        test = self.compile(node.test)
+        body = self.compile_stmt_list(node.body)
+        orelse = self.compile_stmt_list(node.orelse)
+        loc = self.location(node)
+
+        async def if_stmt(ctx):
+            try:
+                if loc:
+                    ctx.lineno, ctx.col_offset = loc
+                if await test(ctx):
+                    return await body(ctx)
+                return await orelse(ctx)
+            except Exception as err:
+                if not ctx.exception_obj:
+                    ctx.capture_exception(err)
+                raise
+
+        return if_stmt
+
+    def compile_for(self, node):
+        """Compile for statement."""
+        iterable = self.compile(node.iter)
+        target = self.compile_target(node.target)
+        body = self.compile_nodes(node.body)
+        orelse = self.compile_nodes(node.orelse)
+        loc = self.location(node)
+
+        async def for_stmt(ctx):
+            try:
+                if loc:
+                    ctx.lineno, ctx.col_offset = loc
+                val = None
+                values = await iterable(ctx)
+                if isinstance(values, EvalGenerator):
+                    values = await values.materialize()
+                for loop_var in values:
+                    await target(ctx, loop_var)
+                    for stmt in body:
+                        val = await stmt(ctx)
+                        if isinstance(val, EvalStopFlow):
+                            break
+                    if isinstance(val, EvalBreak):
+                        break
+                    if isinstance(val, EvalReturn):
+                        return val
+                else:
+                    for stmt in orelse:
+                        val = await stmt(ctx)
+                        if isinstance(val, EvalReturn):
+                            return val
+                return None
+            except Exception as err:
+                if not ctx.exception_obj:
+                    ctx.capture_exception(err)
+                raise
+
+        return for_stmt
+
+    def compile_asyncfor(self, node):
+        """Compile async for statement."""
+        return self.compile_for(node)
+
+    def compile_while(self, node):
+        """Compile while statement."""
+        test = self.compile(node.test)
+        body = self.compile_nodes(node.body)
+        orelse = self.compile_nodes(node.orelse)
+        loc = self.location(node)
+
+        async def while_stmt(ctx):
+            try:
+                if loc:
+                    ctx.lineno, ctx.col_offset = loc
+                val = None
+                while await test(ctx):
+                    for stmt in body:
+                        val = await stmt(ctx)
+                        if isinstance(val, EvalStopFlow):
+                            break
+                    if isinstance(val, EvalBreak):
+                        break
+                    if isinstance(val, EvalReturn):
+                        return val
+                else:
+                    for stmt in orelse:
+                        val = await stmt(ctx)
+                        if isinstance(val, EvalReturn):
+                            return val
+                return None
+            except Exception as err:
+                if not ctx.exception_obj:
+                    ctx.capture_exception(err)
+                raise
+
+        return while_stmt
+
+    def compile_try(self, node):
+        """Compile try...except statement; mirrors AstEval.ast_try."""
+        body = self.compile_nodes(node.body)
+        handlers = [
+            (
+                self.compile(handler.type) if handler.type else None,
+                handler.name,
+                self.compile_nodes(handler.body),
+            )
+            for handler in node.handlers
+        ]
+        orelse = self.compile_stmt_list(node.orelse)
+        finalbody = self.compile_stmt_list(node.finalbody)
+        loc = self.location(node)
+
+        async def try_body(ctx):
+            try:
+                for stmt in body:
+                    val = await stmt(ctx)
+                    if isinstance(val, EvalStopFlow):
+                        return val
+                    if ctx.exception_obj is not None:
+                        raise ctx.exception_obj
+            except Exception as err:
+                curr_exc = ctx.exception_curr
+                ctx.exception_curr = caught = EvalStopIteration.unwrap(err)
+                for handler_type, handler_name, handler_body in handlers:
+                    match = False
+                    if handler_type:
+                        exc_list = await handler_type(ctx)
+                        if not isinstance(exc_list, tuple):
+                            exc_list = [exc_list]
+                        for exc in exc_list:
+                            if isinstance(caught, exc):
+                                match = True
+                                break
+                    else:
+                        match = True
+                    if not match:
+                        continue
+                    save_obj = ctx.exception_obj
+                    save_exc_long = ctx.exception_long
+                    save_exc = ctx.exception
+                    ctx.exception_obj = None
+                    ctx.exception = None
+                    ctx.exception_long = None
+                    if handler_name is not None:
+                        if handler_name in ctx.sym_table and isinstance(
+                            ctx.sym_table[handler_name], EvalLocalVar
+                        ):
+                            ctx.sym_table[handler_name].set(err)
+                        else:
+                            ctx.sym_table[handler_name] = err
+                    for stmt in handler_body:
+                        try:
+                            val = await stmt(ctx)
+                            if isinstance(val, EvalStopFlow):
+                                if handler_name is not None:
+                                    del ctx.sym_table[handler_name]
+                                ctx.exception_curr = curr_exc
+                                return val
+                        except Exception:
+                            if ctx.exception_obj is not None:
+                                if handler_name is not None:
+                                    del ctx.sym_table[handler_name]
+                                ctx.exception_curr = curr_exc
+                                if ctx.exception_obj == save_obj:
+                                    ctx.exception_long = save_exc_long
+                                    ctx.exception = save_exc
+                                else:
+                                    ctx.exception_long = (
+                                        save_exc_long
+                                        + "\n\nDuring handling of the above exception, another exception occurred:\n\n"
+                                        + ctx.exception_long
+                                    )
+                                raise ctx.exception_obj  # pylint: disable=raise-missing-from
+                    if handler_name is not None:
+                        del ctx.sym_table[handler_name]
+                    break
+                else:
+                    ctx.exception_curr = curr_exc
+                    raise err
+            else:
+                val = await orelse(ctx)
+                if isinstance(val, EvalStopFlow):
+                    return val
+            finally:
+                val = await finalbody(ctx)
+                if isinstance(val, EvalStopFlow):
+                    return val  # pylint: disable=lost-exception,return-in-finally
+            return None
+
+        async def try_stmt(ctx):
+            try:
+                if loc:
+                    ctx.lineno, ctx.col_offset = loc
+                return await try_body(ctx)
+            except Exception as err:
+                if not ctx.exception_obj:
+                    ctx.capture_exception(err)
+                raise
+
+        return try_stmt
+
+    def compile_constant(self, node):
+        """Compile constant."""
+        value = node.value
+        loc = self.location(node)
+
+        async def constant(ctx):
+            if loc:
+                ctx.lineno, ctx.col_offset = loc
+            return value
+
+        return constant
+
+    def compile_name(self, node):
+        """Compile identifier load; stores are handled by compile_target or recurse_assign.
+
+        Inside a function body each name is classified once, using the function's name
+        analysis, so the closure only checks the symbol tables that can hold it.  Anything
+        not found on the fast path goes through ast_name, which raises the same errors.
+        """
+        if not isinstance(node.ctx, ast.Load):
+            return None
+        loc = self.location(node)
+        var_name = node.id
+        scope = self.name_scope(var_name)
+
+        async def slow_name(ctx):
+            val = await ctx.ast_name(node)
+            if isinstance(val, EvalName):
+                raise NameError(f"name '{val.name}' is not defined")
+            return val
+
+        if scope == "global":
+
+            async def name_global(ctx):
+                try:
+                    if loc:
+                        ctx.lineno, ctx.col_offset = loc
+                    if var_name in ctx.global_sym_table:
+                        return ctx.global_sym_table[var_name]
+                    raise NameError(f"global name '{var_name}' is not defined")
+                except Exception as err:
+                    if not ctx.exception_obj:
+                        ctx.capture_exception(err)
+                    raise
+
+            return name_global
+
+        if scope == "local":
+
+            async def name_local(ctx):
+                try:
+                    if loc:
+                        ctx.lineno, ctx.col_offset = loc
+                    sym_table = ctx.sym_table
+                    if var_name in sym_table:
+                        val = sym_table[var_name]
+                        if isinstance(val, EvalLocalVar):
+                            return val.get()
+                        return val
+                    return await slow_name(ctx)
+                except Exception as err:
+                    if not ctx.exception_obj:
+                        ctx.capture_exception(err)
+                    raise
+
+            return name_local
+
+        if scope == "free":
+            #
+            # builtins can't change, so look them up now; the symbol tables are still
+            # checked first since they can shadow builtins
+            #
+            builtin_factory = BUILTIN_AST_FUNCS_FACTORY.get(var_name)
+            builtin_val = None
+            if (
+                builtin_factory is None
+                and hasattr(builtins, var_name)
+                and var_name not in BUILTIN_EXCLUDE
+                and var_name[0] != "_"
+            ):
+                builtin_val = getattr(builtins, var_name)
+            if builtin_factory is not None or builtin_val is not None:
+
+                async def name_free(ctx):
+                    try:
+                        if loc:
+                            ctx.lineno, ctx.col_offset = loc
+                        if var_name in ctx.sym_table:
+                            val = ctx.sym_table[var_name]
+                            if isinstance(val, EvalLocalVar):
+                                return val.get()
+                            return val
+                        if var_name in ctx.local_sym_table:
+                            return ctx.local_sym_table[var_name]
+                        if var_name in ctx.global_sym_table:
+                            return ctx.global_sym_table[var_name]
+                        if builtin_factory is not None:
+                            return builtin_factory(ctx)
+                        return builtin_val
+                    except Exception as err:
+                        if not ctx.exception_obj:
+                            ctx.capture_exception(err)
+                        raise
+
+                return name_free
+
+        async def name(ctx):
+            try:
+                if loc:
+                    ctx.lineno, ctx.col_offset = loc
+                val = await ctx.ast_name(node)
+                if isinstance(val, EvalName):
+                    raise NameError(f"name '{val.name}' is not defined")
+                return val
+            except Exception as err:
+                if not ctx.exception_obj:
+                    ctx.capture_exception(err)
+                raise
+
+        return name
+
+    def compile_binop(self, node):
+        """Compile binary operator."""
+        if type(node.op) not in self.BINOPS:
+            return None
+        binop = self.BINOPS[type(node.op)]
+        left = self.compile(node.left)
+        right = self.compile(node.right)
+        loc = self.location(node)
+
+        async def binop_expr(ctx):
+            try:
+                if loc:
+                    ctx.lineno, ctx.col_offset = loc
+                return binop(await left(ctx), await right(ctx))
+            except Exception as err:
+                if not ctx.exception_obj:
+                    ctx.capture_exception(err)
+                raise
+
+        return binop_expr
+
+    def compile_unaryop(self, node):
+        """Compile unary operator."""
+        if type(node.op) not in self.UNARYOPS:
+            return None
+        unaryop = self.UNARYOPS[type(node.op)]
+        operand = self.compile(node.operand)
+        loc = self.location(node)
+
+        async def unaryop_expr(ctx):
+            try:
+                if loc:
+                    ctx.lineno, ctx.col_offset = loc
+                return unaryop(await operand(ctx))
+            except Exception as err:
+                if not ctx.exception_obj:
+                    ctx.capture_exception(err)
+                raise
+
+        return unaryop_expr
+
+    def compile_compare(self, node):
+        """Compile comparison; like AstEval.ast_compare, each pair evaluates both operands."""
+        if any(type(cmp_op) not in self.CMPOPS for cmp_op in node.ops):
+            return None
+        operands = self.compile_nodes([node.left, *node.comparators])
+        pairs = [
+            (self.CMPOPS[type(cmp_op)], operands[i], operands[i + 1]) for i, cmp_op in enumerate(node.ops)
+        ]
+        #
+        # in and not in consume generator expressions lazily (see EvalGenerator.contains)
+        #
+        contains_ops = {self.CMPOPS[ast.In]: True, self.CMPOPS[ast.NotIn]: False}
+        loc = self.location(node)
+
+        async def compare(ctx):
+            try:
+                if loc:
+                    ctx.lineno, ctx.col_offset = loc
+                for cmp_op, left, right in pairs:
+                    val0, val1 = await left(ctx), await right(ctx)
+                    if isinstance(val1, EvalGenerator) and cmp_op in contains_ops:
+                        if await val1.contains(val0) != contains_ops[cmp_op]:
+                            return False
+                    elif not cmp_op(val0, val1):
+                        return False
+                return True
+            except Exception as err:
+                if not ctx.exception_obj:
+                    ctx.capture_exception(err)
+                raise
+
+        return compare
+
+    def compile_boolop(self, node):
+        """Compile boolean operators and and or."""
+        values = self.compile_nodes(node.values)
+        is_and = isinstance(node.op, ast.And)
+        loc = self.location(node)
+
+        async def boolop(ctx):
+            try:
+                if loc:
+                    ctx.lineno, ctx.col_offset = loc
+                val = is_and
+                for value in values:
+                    val = await value(ctx)
+                    if bool(val) != is_and:
+                        return val
+                return val
+            except Exception as err:
+                if not ctx.exception_obj:
+                    ctx.capture_exception(err)
+                raise
+
+        return boolop
+
+    def compile_ifexp(self, node):
+        """Compile if expression."""
+        test = self.compile(node.test)
+        body = self.compile(node.body)
+        orelse = self.compile(node.orelse)
+        loc = self.location(node)
+
+        async def ifexp(ctx):
+            try:
+                if loc:
+                    ctx.lineno, ctx.col_offset = loc
+                return await body(ctx) if (await test(ctx)) else await orelse(ctx)
+            except Exception as err:
+                if not ctx.exception_obj:
+                    ctx.capture_exception(err)
+                raise
+
+        return ifexp
+
+    def compile_call(self, node):
+        """Compile function call."""
+        func = self.compile(node.func)
+        keywords = [(kw_arg.arg, self.compile(kw_arg.value)) for kw_arg in node.keywords]
+        args = self.compile_elt_list(node.args)
+        func_name = None
+        if isinstance(node.func, ast.Name):
+            func_name = node.func.id
+        elif isinstance(node.func, ast.Attribute):
+            func_name = node.func.attr
+        loc = self.location(node)
+
+        async def call(ctx):
+            try:
+                if loc:
+                    ctx.lineno, ctx.col_offset = loc
+                this_func = await func(ctx)
+                kwargs = {}
+                for kw_name, kw_value in keywords:
+                    if kw_name is None:
+                        kwargs.update(await kw_value(ctx))
+                    else:
+                        kwargs[kw_name] = await kw_value(ctx)
+                this_args = await args(ctx)
+                this_func_name = func_name
+                if isinstance(this_func, EvalLocalVar):
+                    this_func_name = this_func.get_name()
+                    this_func = this_func.get()
+                val = await ctx.call_func(this_func, this_func_name, *this_args, **kwargs)
+                if isinstance(val, EvalName):
+                    raise NameError(f"name '{val.name}' is not defined")
+                return val
+            except Exception as err:
+                if not ctx.exception_obj:
+                    ctx.capture_exception(err)
+                raise
+
+        return call
+
+    def compile_sequence(self, node, factory):
+        """Compile a list, tuple or set display built by factory from its elements."""
+        elts = self.compile_elt_list(node.elts)
+        loc = self.location(node)
+
+        async def sequence(ctx):
+            try:
+                if loc:
+                    ctx.lineno, ctx.col_offset = loc
+                return factory(await elts(ctx))
+            except Exception as err:
+                if not ctx.exception_obj:
+                    ctx.capture_exception(err)
+                raise
+
+        return sequence
+
+    def compile_list(self, node):
+        """Compile list display."""
+        if not isinstance(node.ctx, ast.Load):
+            return None
+        return self.compile_sequence(node, lambda val: val)
+
+    def compile_tuple(self, node):
+        """Compile tuple display."""
+        return self.compile_sequence(node, tuple)
+
+    def compile_set(self, node):
+        """Compile set display."""
+        return self.compile_sequence(node, set)
+
+    def compile_dict(self, node):
+        """Compile dict display."""
+        items = [
+            (self.compile(key) if key is not None else None, self.compile(value))
+            for key, value in zip(node.keys, node.values)
+        ]
+        loc = self.location(node)
+
+        async def dict_expr(ctx):
+            try:
+                if loc:
+                    ctx.lineno, ctx.col_offset = loc
+                val = {}
+                for key, value in items:
+                    this_val = await value(ctx)
+                    if key is None:
+                        val.update(this_val)
+                    else:
+                        val[await key(ctx)] = this_val
+                return val
+            except Exception as err:
+                if not ctx.exception_obj:
+                    ctx.capture_exception(err)
+                raise
+
+        return dict_expr
+
+    def compile_subscript(self, node):
+        """Compile subscript load."""
+        if not isinstance(node.ctx, ast.Load):
+            return None
+        value = self.compile(node.value)
+        loc = self.location(node)
+        if isinstance(node.slice, ast.Slice):
+            bounds = [
+                self.compile(bound) if bound else None
+                for bound in (node.slice.lower, node.slice.upper, node.slice.step)
+            ]
+
+            async def index(ctx):
+                return slice(*[(await bound(ctx)) if bound else None for bound in bounds])
+
+        else:
+            index = self.compile(node.slice)
+
+        async def subscript(ctx):
+            try:
+                if loc:
+                    ctx.lineno, ctx.col_offset = loc
+                var = await value(ctx)
+                val = var[await index(ctx)]
+                if isinstance(val, EvalName):
+                    raise NameError(f"name '{val.name}' is not defined")
+                return val
+            except Exception as err:
+                if not ctx.exception_obj:
+                    ctx.capture_exception(err)
+                raise
+
+        return subscript
+
+    def compile_joinedstr(self, node):
+        """Compile joined string."""
+        values = self.compile_nodes(node.values)
+        loc = self.location(node)
+
+        async def joinedstr(ctx):
+            try:
+                if loc:
+                    ctx.lineno, ctx.col_offset = loc
+                val = ""
+                for value in values:
+                    val = val + str(await value(ctx))
+                return val
+            except Exception as err:
+                if not ctx.exception_obj:
+                    ctx.capture_exception(err)
+                raise
+
+        return joinedstr
+
+    def compile_formattedvalue(self, node):
+        """Compile formatted value."""
+        value = self.compile(node.value)
+        format_spec = self.compile(node.format_spec) if node.format_spec is not None else None
+        loc = self.location(node)
+
+        async def formattedvalue(ctx):
+            try:
+                if loc:
+                    ctx.lineno, ctx.col_offset = loc
+                val = await value(ctx)
+                if format_spec is not None:
+                    fmt = await format_spec(ctx)
+                    return f"{val:{fmt}}"
+                return f"{val}"
+            except Exception as err:
+                if not ctx.exception_obj:
+                    ctx.capture_exception(err)
+                raise
+
+        return formattedvalue
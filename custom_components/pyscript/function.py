@@ -1,12 +1,19 @@
 """Function call handling."""
 
 import asyncio
+import concurrent.futures
 import logging
 import traceback
 
 from homeassistant.core import Context
 
-from .const import LOGGER_PATH, SERVICE_RESPONSE_NONE, SERVICE_RESPONSE_ONLY
+from .const import (
+    CONF_LOOP_HOLD_WARN,
+    CONF_POOL_WORKERS,
+    LOGGER_PATH,
+    SERVICE_RESPONSE_NONE,
+    SERVICE_RESPONSE_ONLY,
+)
 
 _LOGGER = logging.getLogger(LOGGER_PATH + ".function")
 
@@ -76,6 +83,19 @@ class Function:
     #
     service2global_ctx = {}
 
+    #
+    # bounded thread pool for @pyscript_pool functions, created on first use
+    #
+    pool = None
+    pool_workers = 2
+
+    #
+    # warn when a pyscript function holds the event loop for more than loop_hold_warn
+    # seconds on LOOP_HOLD_WARN_COUNT calls; 0 disables the check
+    #
+    loop_hold_warn = 0
+    LOOP_HOLD_WARN_COUNT = 3
+
     def __init__(self):
         """Warn on Function instantiation."""
         _LOGGER.error("Function class is not meant to be instantiated")
@@ -164,6 +184,31 @@ class Function:
             cls.task_waiter_q = asyncio.Queue(0)
             cls.task_waiter = cls.create_task(task_waiter(cls.task_waiter_q))
 
+    @classmethod
+    def set_pyscript_config(cls, config):
+        """Set pyscript yaml config."""
+        cls.loop_hold_warn = config.get(CONF_LOOP_HOLD_WARN, 0)
+        pool_workers = config.get(CONF_POOL_WORKERS, 2)
+        if pool_workers != cls.pool_workers:
+            cls.pool_stop()
+            cls.pool_workers = pool_workers
+
+    @classmethod
+    async def pool_executor_job(cls, func, *args):
+        """Run func(*args) on the bounded @pyscript_pool thread pool."""
+        if cls.pool is None:
+            cls.pool = concurrent.futures.ThreadPoolExecutor(
+                max_workers=cls.pool_workers, thread_name_prefix="pyscript_pool"
+            )
+        return await cls.hass.loop.run_in_executor(cls.pool, func, *args)
+
+    @classmethod
+    def pool_stop(cls):
+        """Shut down the @pyscript_pool thread pool; running calls finish in the background."""
+        if cls.pool is not None:
+            cls.pool.shutdown(wait=False)
+            cls.pool = None
+
     @classmethod
     def reaper_cancel(cls, task):
         """Send a task to be canceled by the reaper."""
@@ -1,15 +1,17 @@
 """Global context handling."""
 
+import ast
 import logging
 import os
 from types import ModuleType
-from typing import Any, Callable, Dict, List, Optional, Set, Union
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Union
 
 from homeassistant.config_entries import ConfigEntry
 
 from .const import CONF_HASS_IS_GLOBAL, CONFIG_ENTRY, DOMAIN, FOLDER, LOGGER_PATH
-from .eval import AstEval, EvalFunc
+from .eval import AstEval, EvalFunc, EvalFuncVar
 from .function import Function
+from .parse_cache import ParseCache
 from .trigger import TrigInfo
 
 _LOGGER = logging.getLogger(LOGGER_PATH + ".global_ctx")
@@ -284,6 +286,7 @@ class GlobalContextMgr:
         if name in cls.contexts:
             global_ctx = cls.contexts[name]
             global_ctx.stop()
+            ParseCache.forget(global_ctx.get_file_path())
             del cls.contexts[name]
 
     @classmethod
@@ -330,7 +333,7 @@ class GlobalContextMgr:
         ast_ctx = AstEval(global_ctx.get_name(), global_ctx)
         Function.install_ast_funcs(ast_ctx)
 
-        if not ast_ctx.parse(source, filename=file_path):
+        if not await ParseCache.parse(ast_ctx, source, file_path):
             exc = ast_ctx.get_exception_long()
             ast_ctx.get_logger().error(exc)
             global_ctx.stop()
@@ -350,3 +353,111 @@ class GlobalContextMgr:
         _LOGGER.info("%s %s", "Reloaded" if reload else "Loaded", file_path)
 
         return True, None
+
+    @staticmethod
+    def split_module(tree: ast.Module) -> Optional[Tuple[Dict[str, ast.AST], List[ast.stmt]]]:
+        """Split a module into its top-level function definitions and its other statements.
+
+        Returns None if a function is defined more than once.
+        """
+        defs = {}
+        other = []
+        for stmt in tree.body:
+            if isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                if stmt.name in defs:
+                    return None
+                defs[stmt.name] = stmt
+            else:
+                other.append(stmt)
+        return defs, other
+
+    @classmethod
+    async def reload_incremental(
+        cls, global_ctx: GlobalContext, file_path: str, source: str, mtime: float
+    ) -> bool:
+        """Reload a changed file by redefining just the top-level functions that changed.
+
+        Unchanged functions keep running their triggers, including pending state_hold
+        waits.  Returns False without changing global_ctx if the file needs a full
+        reload, ie: if module-level code other than function definitions changed or
+        uses a changed function.
+        """
+        old_ctx = AstEval(global_ctx.get_name(), global_ctx)
+        ast_ctx = AstEval(global_ctx.get_name(), global_ctx)
+        Function.install_ast_funcs(ast_ctx)
+        if global_ctx.get_source() is None or not await ParseCache.parse(
+            old_ctx, global_ctx.get_source(), file_path
+        ):
+            return False
+        if not await ParseCache.parse(ast_ctx, source, file_path):
+            return False
+        old_split = cls.split_module(old_ctx.ast)
+        new_split = cls.split_module(ast_ctx.ast)
+        if old_split is None or new_split is None:
+            return False
+        old_defs, old_other = old_split
+        new_defs, new_other = new_split
+        if [ast.dump(stmt) for stmt in old_other] != [ast.dump(stmt) for stmt in new_other]:
+            return False
+
+        changed = {
+            name
+            for name, stmt in new_defs.items()
+            if name not in old_defs or ast.dump(stmt) != ast.dump(old_defs[name])
+        }
+        removed = set(old_defs) - set(new_defs)
+        #
+        # functions whose decorators use a changed function need to be redefined too
+        #
+        while True:
+            more = {
+                name
+                for name, stmt in new_defs.items()
+                if name not in changed
+                and any(
+                    isinstance(node, ast.Name) and node.id in changed | removed
+                    for dec in stmt.decorator_list
+                    for node in ast.walk(dec)
+                )
+            }
+            if not more:
+                break
+            changed |= more
+        for stmt in new_other:
+            for node in ast.walk(stmt):
+                if isinstance(node, ast.Name) and node.id in changed | removed:
+                    return False
+
+        sym_table = global_ctx.global_sym_table
+        for name in (changed | removed) & set(old_defs):
+            old_val = sym_table.get(name)
+            if isinstance(old_val, EvalFuncVar) and old_val.get_func():
+                old_val.get_func().trigger_stop()
+                global_ctx.trigger_unregister(old_val.get_func())
+        for name in removed:
+            sym_table.pop(name, None)
+
+        for name, stmt in new_defs.items():
+            if name in changed:
+                ast_ctx.parse(source, filename=file_path, tree=ast.Module(body=[stmt], type_ignores=[]))
+                await ast_ctx.eval()
+                exc = ast_ctx.get_exception_long()
+                if exc is not None:
+                    ast_ctx.get_logger().error(exc)
+            elif ast.dump(stmt, include_attributes=True) != ast.dump(old_defs[name], include_attributes=True):
+                old_val = sym_table.get(name)
+                if isinstance(old_val, EvalFuncVar) and old_val.get_func():
+                    await old_val.get_func().update_def(ast_ctx, stmt)
+
+        global_ctx.source = source
+        global_ctx.file_path = file_path
+        global_ctx.mtime = mtime
+        _LOGGER.info(
+            "Reloaded %s incrementally (%d functions changed, %d removed, %d unchanged)",
+            file_path,
+            len(changed),
+            len(removed),
+            len(new_defs) - len(changed),
+        )
+        return True
+
@@ -0,0 +1,200 @@
+"""Persistent cache of parsed pyscript source files."""
+
+import ast
+import hashlib
+import inspect
+import logging
+import os
+import pickle
+import sys
+
+from .const import LOGGER_PATH, PARSE_CACHE_FOLDER, PARSE_CACHE_VERSION
+from .eval import AstEval, EvalFunc
+
+_LOGGER = logging.getLogger(LOGGER_PATH + ".parse_cache")
+
+
+class ParseCache:
+    """Define parse cache functions.
+
+    Parsed ASTs are pickled under .storage, keyed by a hash of the source, the
+    parse mode, the Python version, PARSE_CACHE_VERSION and a hash of eval.py.  Each
+    FunctionDef in a cached tree also carries its name analysis (see
+    EvalFunc.analyze_names), so an unchanged file skips both ast.parse and get_names
+    when it is loaded again; hashing eval.py makes sure a cached analysis is never
+    used by a different version of the code that produced it.  Every lookup
+    unpickles a fresh tree, since evaluation can modify the AST.
+    """
+
+    #
+    # Global hass instance
+    #
+    hass = None
+
+    #
+    # directory holding one pickle file per cache key
+    #
+    cache_dir = None
+
+    #
+    # hash of eval.py, which does the name analysis; set on the first parse
+    #
+    analysis_hash = None
+
+    #
+    # pickled trees for keys used in this session, and the current key per file
+    #
+    key2data = {}
+    file2key = {}
+
+    #
+    # keys of the currently loaded files; others are removed by prune()
+    #
+    keys_used = set()
+
+    def __init__(self):
+        """Warn on ParseCache instantiation."""
+        _LOGGER.error("ParseCache class is not meant to be instantiated")
+
+    @classmethod
+    def init(cls, hass):
+        """Initialize ParseCache."""
+        cls.hass = hass
+        cls.cache_dir = hass.config.path(".storage", PARSE_CACHE_FOLDER)
+
+    @classmethod
+    def get_key(cls, source, mode):
+        """Return the cache key for the given source and parse mode."""
+        key_str = f"{PARSE_CACHE_VERSION}\0{cls.analysis_hash}\0{sys.version}\0{mode}\0{source}"
+        return hashlib.sha256(key_str.encode("utf-8", errors="surrogatepass")).hexdigest()
+
+    @classmethod
+    def hash_analysis(cls):
+        """Return a hash of the source of the name analysis code; runs in an executor."""
+        try:
+            with open(inspect.getfile(EvalFunc), "rb") as file_desc:
+                return hashlib.sha256(file_desc.read()).hexdigest()
+        except OSError as exc:
+            _LOGGER.debug("hash_analysis: unable to read eval source: %s", exc)
+            return ""
+
+    @classmethod
+    def read_entry(cls, key):
+        """Read a pickled tree from the cache directory; runs in an executor."""
+        try:
+            with open(os.path.join(cls.cache_dir, f"{key}.pickle"), "rb") as file_desc:
+                return file_desc.read()
+        except FileNotFoundError:
+            return None
+        except OSError as exc:
+            _LOGGER.debug("read_entry: unable to read %s: %s", key, exc)
+            return None
+
+    @classmethod
+    def write_entry(cls, key, data):
+        """Write a pickled tree to the cache directory; runs in an executor."""
+        path = os.path.join(cls.cache_dir, f"{key}.pickle")
+        try:
+            os.makedirs(cls.cache_dir, exist_ok=True)
+            with open(path + ".tmp", "wb") as file_desc:
+                file_desc.write(data)
+            os.replace(path + ".tmp", path)
+        except OSError as exc:
+            _LOGGER.debug("write_entry: unable to write %s: %s", path, exc)
+
+    @classmethod
+    def remove_entry(cls, key):
+        """Remove a pickled tree from the cache directory; runs in an executor."""
+        try:
+            os.remove(os.path.join(cls.cache_dir, f"{key}.pickle"))
+        except FileNotFoundError:
+            pass
+        except OSError as exc:
+            _LOGGER.debug("remove_entry: unable to remove %s: %s", key, exc)
+
+    @classmethod
+    def drop_key(cls, key):
+        """Drop the in-memory entry for key, unless another file still uses it; returns True if dropped."""
+        if key in cls.file2key.values():
+            return False
+        cls.key2data.pop(key, None)
+        cls.keys_used.discard(key)
+        return True
+
+    @classmethod
+    def forget(cls, filename):
+        """Drop the in-memory entry for filename, eg: when its global context is deleted.
+
+        The pickle file is kept, so reloading an unchanged file doesn't need to parse it.
+        """
+        key = cls.file2key.pop(filename, None)
+        if key is not None:
+            cls.drop_key(key)
+
+    @classmethod
+    async def parse(cls, ast_ctx: AstEval, source: str, filename: str, mode: str = "exec") -> bool:
+        """Set ast_ctx's AST for source, from the cache if possible; returns False on parse error."""
+        if cls.hass is None:
+            return ast_ctx.parse(source, filename=filename, mode=mode)
+
+        if cls.analysis_hash is None:
+            cls.analysis_hash = await cls.hass.async_add_executor_job(cls.hash_analysis)
+        key = cls.get_key(source, mode)
+        cls.keys_used.add(key)
+        old_key = cls.file2key.get(filename)
+        cls.file2key[filename] = key
+        if old_key is not None and old_key != key and cls.drop_key(old_key):
+            #
+            # the file changed, so its old entry is stale
+            #
+            await cls.hass.async_add_executor_job(cls.remove_entry, old_key)
+
+        data = cls.key2data.get(key)
+        if data is None:
+            data = await cls.hass.async_add_executor_job(cls.read_entry, key)
+        if data is not None:
+            try:
+                tree = pickle.loads(data)
+                cls.key2data[key] = data
+                _LOGGER.debug("parse: using cached AST for %s", filename)
+                return ast_ctx.parse(source, filename=filename, mode=mode, tree=tree)
+            except Exception as exc:
+                _LOGGER.debug("parse: ignoring bad cache entry for %s: %s", filename, exc)
+
+        if not ast_ctx.parse(source, filename=filename, mode=mode):
+            return False
+        #
+        # do the name analysis now, so it's saved in the cache entry
+        #
+        for node in ast.walk(ast_ctx.ast):
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                await EvalFunc.analyze_names(ast_ctx, node)
+        try:
+            data = pickle.dumps(ast_ctx.ast, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as exc:
+            _LOGGER.debug("parse: unable to pickle AST for %s: %s", filename, exc)
+            return True
+        cls.key2data[key] = data
+        await cls.hass.async_add_executor_job(cls.write_entry, key, data)
+        return True
+
+    @classmethod
+    async def prune(cls):
+        """Remove cache entries that haven't been used since startup."""
+        if cls.cache_dir is None:
+            return
+
+        def prune_files(cache_dir, keys_used):
+            try:
+                file_names = os.listdir(cache_dir)
+            except OSError:
+                return
+            for file_name in file_names:
+                if file_name.endswith(".pickle") and file_name[: -len(".pickle")] in keys_used:
+                    continue
+                try:
+                    os.remove(os.path.join(cache_dir, file_name))
+                except OSError as exc:
+                    _LOGGER.debug("prune: unable to remove %s: %s", file_name, exc)
+
+        await cls.hass.async_add_executor_job(prune_files, cls.cache_dir, cls.keys_used.copy())
@@ -2,7 +2,9 @@
 
 import asyncio
 from datetime import datetime
+import functools
 import logging
+import time
 
 from homeassistant.const import STATE_UNAVAILABLE, STATE_UNKNOWN
 from homeassistant.core import Context
@@ -18,14 +20,20 @@ from homeassistant.helpers.template import (
 )
 from homeassistant.util import dt as dt_util
 
-from .const import LOGGER_PATH
+from .const import CONF_STATE_TRIGGER_COALESCE, LOGGER_PATH
 from .entity import PyscriptEntity
 from .function import Function
+from .stats import TrigStats
 
 _LOGGER = logging.getLogger(LOGGER_PATH + ".state")
 
 STATE_VIRTUAL_ATTRS = {"entity_id", "last_changed", "last_updated", "last_reported"}
 
+#
+# how many resolution plans for distinct sets of var names notify_var_get keeps
+#
+VAR_PLANS_MAX = 1024
+
 
 class StateVal(str):
     """Class for representing the value and attributes of a state variable."""
@@ -96,6 +104,24 @@ class State:
     #
     notify = {}
 
+    #
+    # resolution plan for the union of names watched by all the queues of each
+    # state variable; built on first use and cleared when the subscribers change
+    #
+    notify_plan = {}
+
+    #
+    # when set, state changes are held until the end of the current event loop
+    # iteration, and a burst of changes to the same variable is delivered once
+    #
+    notify_coalesce = False
+
+    #
+    # pending coalesced notifications by variable name, and the flush handle
+    #
+    notify_pending = {}
+    notify_flush_handle = None
+
     #
     # Last value of state variable notifications.  We maintain this
     # so that trigger evaluation can use the last notified value,
@@ -154,6 +180,7 @@ class State:
             if state_var_name not in cls.notify:
                 cls.notify[state_var_name] = {}
             cls.notify[state_var_name][queue] = var_names
+            cls.notify_plan.pop(state_var_name, None)
             added = True
         return added
 
@@ -169,40 +196,128 @@ class State:
             if state_var_name not in cls.notify or queue not in cls.notify[state_var_name]:
                 return
             del cls.notify[state_var_name][queue]
+            cls.notify_plan.pop(state_var_name, None)
 
     @classmethod
     async def update(cls, new_vars, func_args):
         """Deliver all notifications for state variable changes."""
 
-        notify = {}
+        if cls.notify_coalesce:
+            cls.update_coalesce(new_vars, func_args)
+            return
+
+        start = time.monotonic()
         for var_name, var_val in new_vars.items():
             if var_name in cls.notify:
                 cls.notify_var_last[var_name] = var_val
-                notify.update(cls.notify[var_name])
 
-        if notify:
+        cls.notify_deliver(new_vars, func_args)
+        TrigStats.state_update.add(time.monotonic() - start)
+
+    @classmethod
+    def update_coalesce(cls, new_vars, func_args):
+        """Hold a state change so that a burst of changes to a variable is delivered once."""
+        var_name = func_args.get("var_name")
+        if var_name not in cls.notify:
+            return
+        cls.notify_var_last[var_name] = new_vars.get(var_name)
+        pending = cls.notify_pending.get(var_name)
+        if pending is None:
+            cls.notify_pending[var_name] = [new_vars, func_args]
+        else:
+            TrigStats.state_coalesced += 1
+            #
+            # keep the old value from the first change of the burst
+            #
+            old_name = f"{var_name}.old"
+            new_vars = {**new_vars, old_name: pending[0].get(old_name)}
+            func_args = {**func_args, "old_value": pending[1].get("old_value")}
+            pending[0], pending[1] = new_vars, func_args
+        if cls.notify_flush_handle is None:
+            cls.notify_flush_handle = cls.hass.loop.call_soon(cls.notify_flush)
+
+    @classmethod
+    def notify_flush(cls):
+        """Deliver the coalesced state changes."""
+        cls.notify_flush_handle = None
+        pending, cls.notify_pending = cls.notify_pending, {}
+        for new_vars, func_args in pending.values():
+            start = time.monotonic()
+            cls.notify_deliver(new_vars, func_args)
+            TrigStats.state_update.add(time.monotonic() - start)
+
+    @classmethod
+    def notify_deliver(cls, new_vars, func_args):
+        """Send the notification for new_vars to every subscribed queue.
+
+        The notify vars, ie: new_vars plus the values of every name watched by any of the
+        queues, are resolved once; each queue gets its own copy, since receivers use it
+        as a symbol table that trigger expressions can assign to.
+        """
+        notify_vars = None
+        notify_queues = {}
+        for var_name in new_vars:
+            queues = cls.notify.get(var_name)
+            if not queues:
+                continue
+            if notify_vars is None:
+                notify_vars = new_vars.copy()
+            plan = cls.notify_plan.get(var_name)
+            if plan is None:
+                names = set()
+                for var_names in queues.values():
+                    names.update(var_names if isinstance(var_names, set) else {var_names})
+                plan = cls.notify_plan[var_name] = cls.var_plan(names)
+            cls.notify_var_resolve(plan, notify_vars)
+            notify_queues.update(queues)
+
+        if notify_queues:
             _LOGGER.debug("state.update(%s, %s)", new_vars, func_args)
-            for queue, var_names in notify.items():
-                await queue.put(["state", [cls.notify_var_get(var_names, new_vars), func_args.copy()]])
+            for queue in notify_queues:
+                queue.put_nowait(["state", [notify_vars.copy(), func_args.copy()]])
 
     @classmethod
-    def notify_var_get(cls, var_names, new_vars):
-        """Add values of var_names to new_vars, or default to None."""
-        notify_vars = new_vars.copy()
-        for var_name in var_names if var_names is not None else []:
+    def var_plan(cls, var_names):
+        """Pre-split var_names into (name, root, attr, old_root, check_exist) tuples."""
+        plan = []
+        for var_name in var_names:
+            parts = var_name.split(".")
+            root = attr = old_root = None
+            if len(parts) == 3:
+                root, attr = f"{parts[0]}.{parts[1]}", parts[2]
+            elif len(parts) == 4 and parts[2] == "old":
+                old_root, attr = f"{parts[0]}.{parts[1]}.old", parts[3]
+            plan.append((var_name, root, attr, old_root, 2 <= len(parts) <= 4))
+        return tuple(plan)
+
+    @classmethod
+    @functools.lru_cache(maxsize=VAR_PLANS_MAX)
+    def var_plan_cached(cls, var_names):
+        """Return var_plan for the frozenset var_names, keeping the recently used ones."""
+        return cls.var_plan(var_names)
+
+    @classmethod
+    def notify_var_resolve(cls, plan, notify_vars):
+        """Add the values for each name in plan that isn't already in notify_vars."""
+        var_last = cls.notify_var_last
+        for var_name, root, attr, old_root, check_exist in plan:
             if var_name in notify_vars:
                 continue
-            parts = var_name.split(".")
-            if var_name in cls.notify_var_last:
-                notify_vars[var_name] = cls.notify_var_last[var_name]
-            elif len(parts) == 3 and f"{parts[0]}.{parts[1]}" in cls.notify_var_last:
-                notify_vars[var_name] = getattr(
-                    cls.notify_var_last[f"{parts[0]}.{parts[1]}"], parts[2], None
-                )
-            elif len(parts) == 4 and parts[2] == "old" and f"{parts[0]}.{parts[1]}.old" in notify_vars:
-                notify_vars[var_name] = getattr(notify_vars[f"{parts[0]}.{parts[1]}.old"], parts[3], None)
-            elif 1 <= var_name.count(".") <= 3 and not cls.exist(var_name):
+            if var_name in var_last:
+                notify_vars[var_name] = var_last[var_name]
+            elif root is not None and root in var_last:
+                notify_vars[var_name] = getattr(var_last[root], attr, None)
+            elif old_root is not None and old_root in notify_vars:
+                notify_vars[var_name] = getattr(notify_vars[old_root], attr, None)
+            elif check_exist and not cls.exist(var_name):
                 notify_vars[var_name] = None
+
+    @classmethod
+    def notify_var_get(cls, var_names, new_vars):
+        """Add values of var_names to new_vars, or default to None."""
+        notify_vars = new_vars.copy()
+        if var_names:
+            cls.notify_var_resolve(cls.var_plan_cached(frozenset(var_names)), notify_vars)
         return notify_vars
 
     @classmethod
@@ -492,3 +607,4 @@ class State:
         cls.pyscript_config.clear()
         for name, value in config.items():
             cls.pyscript_config[name] = value
+        cls.notify_coalesce = bool(config.get(CONF_STATE_TRIGGER_COALESCE, False))
@@ -0,0 +1,198 @@
+"""Per-trigger latency and throughput statistics."""
+
+import asyncio
+import logging
+import time
+
+from .const import CONF_TRIGGER_STATS_SENSORS, LOGGER_PATH
+
+_LOGGER = logging.getLogger(LOGGER_PATH + ".stats")
+
+
+class Histogram:
+    """Latency histogram with fixed millisecond buckets."""
+
+    #
+    # upper bounds of each bucket in msec; the last bucket is everything larger
+    #
+    BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+    def __init__(self):
+        """Initialize an empty histogram."""
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.counts = [0] * (len(self.BUCKETS) + 1)
+
+    def add(self, secs):
+        """Add one sample, in seconds."""
+        msecs = secs * 1000.0
+        self.count += 1
+        self.total += msecs
+        if msecs > self.max:
+            self.max = msecs
+        for idx, bound in enumerate(self.BUCKETS):
+            if msecs <= bound:
+                self.counts[idx] += 1
+                return
+        self.counts[-1] += 1
+
+    def avg(self):
+        """Return the average sample in msec."""
+        return self.total / self.count if self.count else 0.0
+
+    def as_dict(self):
+        """Return the histogram as a dict, with times in msec."""
+        buckets = {f"<={bound}": cnt for bound, cnt in zip(self.BUCKETS, self.counts) if cnt}
+        if self.counts[-1]:
+            buckets[f">{self.BUCKETS[-1]}"] = self.counts[-1]
+        return {
+            "count": self.count,
+            "avg": round(self.avg(), 3),
+            "max": round(self.max, 3),
+            "buckets": buckets,
+        }
+
+
+class TrigQueue(asyncio.Queue):
+    """Trigger notify queue that records how long each item waited in the queue.
+
+    Items are queued together with their enqueue time; put() and get() go through
+    put_nowait() and get_nowait(), so those are the only methods that need wrapping.
+    """
+
+    def __init__(self, maxsize=0):
+        """Initialize the queue."""
+        super().__init__(maxsize)
+        self.get_wait = 0.0
+
+    def put_nowait(self, item):
+        """Put item in the queue, along with the current time."""
+        super().put_nowait((time.monotonic(), item))
+
+    def get_nowait(self):
+        """Return the next item, setting get_wait to how long it was queued."""
+        put_time, item = super().get_nowait()
+        self.get_wait = time.monotonic() - put_time
+        return item
+
+
+class TrigFuncStats:
+    """Latency histograms and counters for one trigger function."""
+
+    HISTOGRAMS = ("queue_wait", "eval", "action", "total")
+
+    def __init__(self, name):
+        """Initialize the statistics for trigger name."""
+        self.name = name
+        self.sensor_time = 0.0
+        self.reset()
+
+    def reset(self):
+        """Clear the histograms and counters."""
+        self.hist = {kind: Histogram() for kind in self.HISTOGRAMS}
+        self.counts = {}
+
+    def add(self, kind, secs):
+        """Add a latency sample to one of the histograms."""
+        self.hist[kind].add(secs)
+
+    def count(self, what):
+        """Increment one of the counters."""
+        self.counts[what] = self.counts.get(what, 0) + 1
+
+    def as_dict(self):
+        """Return the statistics as a dict."""
+        info = {kind: hist.as_dict() for kind, hist in self.hist.items()}
+        info["counts"] = dict(self.counts)
+        return info
+
+
+class TrigStats:
+    """Define trigger statistics functions."""
+
+    #
+    # Global hass instance
+    #
+    hass = None
+
+    #
+    # whether to mirror each function's statistics into a sensor state
+    #
+    sensors = False
+
+    #
+    # minimum seconds between sensor updates for each function
+    #
+    SENSOR_INTERVAL = 30
+
+    #
+    # TrigFuncStats for each trigger name
+    #
+    funcs = {}
+
+    #
+    # time State.update takes to deliver each state change, and how many
+    # changes were merged by coalescing
+    #
+    state_update = Histogram()
+    state_coalesced = 0
+
+    def __init__(self):
+        """Warn on TrigStats instantiation."""
+        _LOGGER.error("TrigStats class is not meant to be instantiated")
+
+    @classmethod
+    def init(cls, hass):
+        """Initialize TrigStats."""
+        cls.hass = hass
+
+    @classmethod
+    def set_pyscript_config(cls, config):
+        """Set pyscript yaml config."""
+        cls.sensors = config.get(CONF_TRIGGER_STATS_SENSORS, False)
+
+    @classmethod
+    def get(cls, name):
+        """Return the TrigFuncStats for trigger name, creating it if needed."""
+        func_stats = cls.funcs.get(name)
+        if func_stats is None:
+            func_stats = cls.funcs[name] = TrigFuncStats(name)
+        return func_stats
+
+    @classmethod
+    def action_done(cls, func_stats):
+        """Update the function's sensor after an action finishes, at most every SENSOR_INTERVAL secs."""
+        if not cls.sensors or cls.hass is None:
+            return
+        now = time.monotonic()
+        if now < func_stats.sensor_time + cls.SENSOR_INTERVAL:
+            return
+        func_stats.sensor_time = now
+        ev_name = func_stats.name.replace(".", "_")
+        attrs = func_stats.as_dict()
+        attrs["unit_of_measurement"] = "ms"
+        attrs["friendly_name"] = f"pyscript {func_stats.name} latency"
+        cls.hass.states.async_set(
+            f"sensor.pyscript_{ev_name}_latency".lower(), round(func_stats.hist["total"].avg(), 3), attrs
+        )
+
+    @classmethod
+    def report(cls, name_prefix=None, reset=False):
+        """Return the statistics of all trigger functions whose names start with name_prefix."""
+        funcs = {
+            name: func_stats.as_dict()
+            for name, func_stats in sorted(cls.funcs.items())
+            if name_prefix is None or name.startswith(name_prefix)
+        }
+        result = {
+            "state_update": cls.state_update.as_dict(),
+            "state_coalesced": cls.state_coalesced,
+            "functions": funcs,
+        }
+        if reset:
+            for name in funcs:
+                cls.funcs[name].reset()
+            cls.state_update = Histogram()
+            cls.state_coalesced = 0
+        return result
@@ -133,6 +133,14 @@ def pyscript_executor() -> Callable[..., Any]:
     ...
 
 
+def pyscript_pool() -> Callable[..., Any]:
+    """Compile the wrapped function and run each call on pyscript's bounded thread pool.
+
+    Use it for CPU-heavy code; the number of worker threads is set by ``pool_workers``.
+    """
+    ...
+
+
 class log:
     """Logging helpers that mirror Home Assistant's logging levels."""
 
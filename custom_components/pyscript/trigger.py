@@ -1,8 +1,10 @@
 """Implements all the trigger logic."""
 
+import ast
 import asyncio
 import datetime as dt
 import functools
+import heapq
 import locale
 import logging
 import math
@@ -16,11 +18,12 @@ from homeassistant.helpers import sun
 from homeassistant.util import dt as dt_util
 
 from .const import LOGGER_PATH
-from .eval import AstEval, EvalFunc, EvalFuncVar
+from .eval import AstCompile, AstEval, EvalFunc, EvalFuncVar
 from .event import Event
 from .function import Function
 from .mqtt import Mqtt
 from .state import STATE_VIRTUAL_ATTRS, State
+from .stats import TrigQueue, TrigStats
 from .webhook import Webhook
 
 _LOGGER = logging.getLogger(LOGGER_PATH + ".trigger")
@@ -56,6 +59,29 @@ def parse_time_offset(offset_str):
     return value * scale
 
 
+@functools.lru_cache(maxsize=4096)
+def split_var_name(var_name):
+    """Return the dot-separated pieces of a watched variable name."""
+    return tuple(var_name.split("."))
+
+
+@functools.lru_cache(maxsize=1024)
+def time_spec_parse(spec):
+    """Return the cron expression, once() split and period() split of a time_trigger spec."""
+    cron_match = re.search(r"cron\((?P<cron_expr>.*)\)", spec)
+    return (
+        cron_match.group("cron_expr") if cron_match else None,
+        re.split(r"once\((.*)\)", spec),
+        re.split(r"period\(([^,]*),([^,]*)(?:,([^,]*))?\)", spec),
+    )
+
+
+@functools.lru_cache(maxsize=1024)
+def cron_is_valid(cron_expr):
+    """Return whether cron_expr is a valid cron expression."""
+    return croniter.is_valid(cron_expr)
+
+
 def ident_any_values_changed(func_args, ident):
     """Check for any changes to state or attributes on ident vars."""
     var_name = func_args.get("var_name", None)
@@ -70,7 +96,7 @@ def ident_any_values_changed(func_args, ident):
             return True
 
         if check_var.startswith(f"{var_name}."):
-            var_pieces = check_var.split(".")
+            var_pieces = split_var_name(check_var)
             if len(var_pieces) == 3 and f"{var_pieces[0]}.{var_pieces[1]}" == var_name:
                 if var_pieces[2] == "*":
                     # catch all has been requested, check all attributes for change
@@ -98,7 +124,7 @@ def ident_values_changed(func_args, ident):
     old_value = func_args["old_value"]
 
     for check_var in ident:
-        var_pieces = check_var.split(".")
+        var_pieces = split_var_name(check_var)
         if len(var_pieces) < 2 or len(var_pieces) > 3:
             continue
         var_root = f"{var_pieces[0]}.{var_pieces[1]}"
@@ -126,6 +152,24 @@ class TrigTime:
     #
     dow2int = {}
 
+    #
+    # Shared timer heap for trigger tasks waiting on a time; each entry is
+    # [deadline, seq, trigger name, notify_q, time_next, active], with deadline
+    # in event loop time.  Cancelled entries stay in the heap until popped or
+    # compacted.
+    #
+    timer_heap = []
+    timer_seq = 0
+    timer_cancelled = 0
+    timer_handle = None
+    timer_handle_when = None
+    timer_stats = {"fired": 0, "lag_last": 0.0, "lag_max": 0.0, "lag_total": 0.0}
+
+    #
+    # croniter instances, one per cron expression, reused via set_current()
+    #
+    cron_iters = {}
+
     def __init__(self):
         """Warn on TrigTime instantiation."""
         _LOGGER.error("TrigTime class is not meant to be instantiated")
@@ -214,6 +258,89 @@ class TrigTime:
                 cls.dow2int[name] = idx
                 cls.dow2int[name[0:3]] = idx
 
+    @classmethod
+    def timer_add(cls, name, timeout, notify_q, time_next=None):
+        """Send ["timer", entry] to notify_q after timeout seconds; returns the entry."""
+        loop = cls.hass.loop
+        cls.timer_seq += 1
+        entry = [loop.time() + max(0, timeout), cls.timer_seq, name, notify_q, time_next, True]
+        heapq.heappush(cls.timer_heap, entry)
+        if cls.timer_handle_when is None or entry[0] < cls.timer_handle_when:
+            cls.timer_schedule()
+        return entry
+
+    @classmethod
+    def timer_cancel(cls, entry):
+        """Cancel a timer added with timer_add; does nothing if it has already fired."""
+        if entry is None or not entry[5]:
+            return
+        entry[5] = False
+        cls.timer_cancelled += 1
+        if cls.timer_cancelled > 64 and cls.timer_cancelled > len(cls.timer_heap) // 2:
+            cls.timer_heap = [entry for entry in cls.timer_heap if entry[5]]
+            heapq.heapify(cls.timer_heap)
+            cls.timer_cancelled = 0
+
+    @classmethod
+    def timer_schedule(cls):
+        """Arrange for timer_fire to run when the earliest active entry is due."""
+        heap = cls.timer_heap
+        while heap and not heap[0][5]:
+            heapq.heappop(heap)
+            cls.timer_cancelled -= 1
+        if cls.timer_handle:
+            cls.timer_handle.cancel()
+            cls.timer_handle = cls.timer_handle_when = None
+        if heap:
+            cls.timer_handle_when = heap[0][0]
+            cls.timer_handle = cls.hass.loop.call_at(cls.timer_handle_when, cls.timer_fire)
+
+    @classmethod
+    def timer_fire(cls):
+        """Wake every trigger whose timer is due."""
+        cls.timer_handle = cls.timer_handle_when = None
+        heap = cls.timer_heap
+        stats = cls.timer_stats
+        now = cls.hass.loop.time()
+        while heap and heap[0][0] <= now:
+            entry = heapq.heappop(heap)
+            if not entry[5]:
+                cls.timer_cancelled -= 1
+                continue
+            entry[5] = False
+            lag = now - entry[0]
+            stats["fired"] += 1
+            stats["lag_last"] = lag
+            stats["lag_total"] += lag
+            stats["lag_max"] = max(stats["lag_max"], lag)
+            entry[3].put_nowait(["timer", entry])
+        cls.timer_schedule()
+
+    @classmethod
+    def scheduler_stats(cls, count=20):
+        """Return the next count timer fires and the scheduling lag statistics."""
+        now = cls.hass.loop.time()
+        upcoming = []
+        for entry in heapq.nsmallest(count, (entry for entry in cls.timer_heap if entry[5])):
+            upcoming.append(
+                {
+                    "trigger": entry[2],
+                    "time_next": entry[4].isoformat() if entry[4] else None,
+                    "seconds": round(entry[0] - now, 6),
+                }
+            )
+        stats = cls.timer_stats
+        cron_info = cron_is_valid.cache_info()
+        return {
+            "timers_active": len(cls.timer_heap) - cls.timer_cancelled,
+            "timers_fired": stats["fired"],
+            "lag_last": round(stats["lag_last"], 6),
+            "lag_max": round(stats["lag_max"], 6),
+            "lag_avg": round(stats["lag_total"] / stats["fired"], 6) if stats["fired"] else 0.0,
+            "cron_exprs_cached": cron_info.currsize,
+            "upcoming": upcoming,
+        }
+
     @classmethod
     async def wait_until(
         cls,
@@ -733,7 +860,7 @@ class TrigTime:
             cron_match = re.match(r"cron\((?P<cron_expr>.*)\)", active_str)
             range_expr = re.match(r"range\(([^,]+),\s?([^,]+)\)", active_str)
             if cron_match:
-                if not croniter.is_valid(cron_match.group("cron_expr")):
+                if not cron_is_valid(cron_match.group("cron_expr")):
                     _LOGGER.error("Invalid cron expression: %s", cron_match)
                     return False
 
@@ -775,12 +902,10 @@ class TrigTime:
         if not isinstance(time_spec, list):
             time_spec = [time_spec]
         for spec in time_spec:
-            cron_match = re.search(r"cron\((?P<cron_expr>.*)\)", spec)
-            match1 = re.split(r"once\((.*)\)", spec)
-            match2 = re.split(r"period\(([^,]*),([^,]*)(?:,([^,]*))?\)", spec)
-            if cron_match:
-                if not croniter.is_valid(cron_match.group("cron_expr")):
-                    _LOGGER.error("Invalid cron expression: %s", cron_match)
+            cron_expr, match1, match2 = time_spec_parse(spec)
+            if cron_expr is not None:
+                if not cron_is_valid(cron_expr):
+                    _LOGGER.error("Invalid cron expression: %s", cron_expr)
                     continue
 
                 #
@@ -798,7 +923,11 @@ class TrigTime:
                 # Also, datetime doesn't correctly subtract datetimes in different timezones, so we need to compute
                 # the different in UTC.  See https://blog.ganssle.io/articles/2018/02/aware-datetime-arithmetic.html.
                 #
-                cron_iter = croniter(cron_match.group("cron_expr"), now, dt.datetime)
+                cron_iter = cls.cron_iters.get(cron_expr)
+                if cron_iter is None:
+                    cron_iter = cls.cron_iters[cron_expr] = croniter(cron_expr, now, dt.datetime)
+                else:
+                    cron_iter.set_current(now, force=True)
                 delta = None
                 while delta is None or delta.total_seconds() <= 0:
                     val = cron_iter.get_next()
@@ -867,6 +996,212 @@ class TrigTime:
         return next_time, next_time_adj
 
 
+class StateTrigExpr:
+    """Compiled @state_trigger or @state_active expression with cached sub-expressions.
+
+    The expression is split into terms: the elements of the any([...]) used to
+    combine several @state_trigger strings, or the operands of a top-level and/or.
+    Each term is compiled once with AstCompile.  Terms that only use state variables,
+    constants, operators and a few builtin conversions are pure, so their last result
+    is reused when the values of the state variables they depend on haven't changed.
+    """
+
+    PURE_FUNCS = {"abs", "bool", "float", "int", "len", "max", "min", "round", "str"}
+
+    PURE_NODES = (
+        ast.BoolOp,
+        ast.BinOp,
+        ast.UnaryOp,
+        ast.IfExp,
+        ast.Compare,
+        ast.Constant,
+        ast.Attribute,
+        ast.Name,
+        ast.List,
+        ast.Tuple,
+        ast.Set,
+        ast.Call,
+        ast.keyword,
+        ast.boolop,
+        ast.operator,
+        ast.unaryop,
+        ast.cmpop,
+        ast.Load,
+    )
+
+    def __init__(self, ast_ctx):
+        """Split and compile the expression already parsed by ast_ctx."""
+        self.ast_ctx = ast_ctx
+        self.eval_cnt = 0
+        self.skip_cnt = 0
+        body = ast_ctx.ast.body
+        global_sym_table = ast_ctx.global_sym_table
+        if (
+            isinstance(body, ast.Call)
+            and isinstance(body.func, ast.Name)
+            and body.func.id in {"any", "all"}
+            and body.func.id not in global_sym_table
+            and len(body.args) == 1
+            and not body.keywords
+            and isinstance(body.args[0], (ast.List, ast.Tuple))
+            and not any(isinstance(elt, ast.Starred) for elt in body.args[0].elts)
+        ):
+            self.combine = body.func.id
+            terms = body.args[0].elts
+        elif isinstance(body, ast.BoolOp):
+            self.combine = "and" if isinstance(body.op, ast.And) else "or"
+            terms = body.values
+        else:
+            self.combine = None
+            terms = [body]
+        compiler = AstCompile()
+        #
+        # each term is [compiled, state var names, names a global could shadow, last inputs, last value]
+        #
+        self.terms = []
+        for term in terms:
+            names, shadow = self.pure_names(term) or (None, None)
+            self.terms.append([compiler.compile(term), names, shadow, None, None])
+        #
+        # map of each state variable name to the terms that depend on it
+        #
+        self.depends = {}
+        for idx, term in enumerate(self.terms):
+            for name in term[1] or []:
+                self.depends.setdefault(name, []).append(idx)
+
+    def pure_names(self, term):
+        """Return the state variable names and shadowable names used by term, or None if it isn't pure."""
+        names = set()
+        shadow = set()
+
+        def walk(node):
+            if not isinstance(node, self.PURE_NODES):
+                return False
+            if isinstance(node, ast.Compare) and any(isinstance(op, (ast.Is, ast.IsNot)) for op in node.ops):
+                #
+                # identity depends on the objects, not just their values
+                #
+                return False
+            if isinstance(node, ast.Call):
+                if (
+                    not isinstance(node.func, ast.Name)
+                    or node.func.id not in self.PURE_FUNCS
+                    or any(isinstance(arg, ast.Starred) for arg in node.args)
+                    or any(kw.arg is None for kw in node.keywords)
+                ):
+                    return False
+                shadow.add(node.func.id)
+                return all(walk(child) for child in node.args + [kw.value for kw in node.keywords])
+            if isinstance(node, ast.Name):
+                #
+                # a plain identifier isn't a state variable
+                #
+                return False
+            if isinstance(node, ast.Attribute):
+                pieces = [node.attr]
+                base = node.value
+                while isinstance(base, ast.Attribute):
+                    pieces.append(base.attr)
+                    base = base.value
+                if not isinstance(base, ast.Name):
+                    return False
+                pieces.append(base.id)
+                names.add(".".join(reversed(pieces)))
+                shadow.add(base.id)
+                return True
+            return all(walk(child) for child in ast.iter_child_nodes(node))
+
+        if not walk(term):
+            return None
+        return tuple(sorted(names)), tuple(sorted(shadow))
+
+    async def eval_term(self, term, notify_vars):
+        """Evaluate one term, reusing its last result if its inputs are unchanged."""
+        compiled, names, shadow, last_inputs, last_val = term
+        inputs = None
+        if names is not None:
+            #
+            # a global with the same name hides a builtin or the state variable domain
+            #
+            global_sym_table = self.ast_ctx.global_sym_table
+            if not any(name in global_sym_table for name in shadow):
+                inputs = []
+                for name in names:
+                    if name not in notify_vars:
+                        inputs = None
+                        break
+                    value = notify_vars[name]
+                    inputs.append((type(value), value))
+            if inputs is not None and inputs == last_inputs:
+                self.skip_cnt += 1
+                return last_val
+        self.eval_cnt += 1
+        term[3] = None
+        val = await compiled(self.ast_ctx)
+        term[3], term[4] = inputs, val
+        return val
+
+    async def eval(self, new_state_vars=None):
+        """Evaluate the expression; mirrors AstEval.eval, and returns None on exception."""
+        ast_ctx = self.ast_ctx
+        ast_ctx.exception = None
+        ast_ctx.exception_obj = None
+        ast_ctx.exception_long = None
+        if new_state_vars:
+            #
+            # the notify vars are only read during evaluation, so no copy is needed
+            #
+            ast_ctx.local_sym_table = new_state_vars
+        notify_vars = ast_ctx.local_sym_table
+        try:
+            if self.combine in {"any", "all"}:
+                #
+                # like the original list, all the terms are evaluated
+                #
+                vals = [await self.eval_term(term, notify_vars) for term in self.terms]
+                return any(vals) if self.combine == "any" else all(vals)
+            if self.combine == "and":
+                val = True
+                for term in self.terms:
+                    val = await self.eval_term(term, notify_vars)
+                    if not val:
+                        return val
+                return val
+            if self.combine == "or":
+                val = False
+                for term in self.terms:
+                    val = await self.eval_term(term, notify_vars)
+                    if val:
+                        return val
+                return val
+            return await self.eval_term(self.terms[0], notify_vars)
+        except asyncio.CancelledError:
+            raise
+        except Exception as err:
+            if ast_ctx.exception_long is None:
+                ast_ctx.exception_long = ast_ctx.format_exc(err, ast_ctx.lineno, ast_ctx.col_offset)
+        return None
+
+    def get_exception_long(self):
+        """Return the last exception in a longer str form."""
+        return self.ast_ctx.get_exception_long()
+
+    def get_logger(self):
+        """Get the expression's logger."""
+        return self.ast_ctx.get_logger()
+
+    def debug_info(self):
+        """Return the evaluation counters and dependency map."""
+        return {
+            "terms": len(self.terms),
+            "pure_terms": sum(1 for term in self.terms if term[1] is not None),
+            "evals_performed": self.eval_cnt,
+            "evals_skipped": self.skip_cnt,
+            "depends": {name: list(idx) for name, idx in self.depends.items()},
+        }
+
+
 class TrigInfo:
     """Class for all trigger-decorated functions."""
 
@@ -905,11 +1240,15 @@ class TrigInfo:
         self.task_unique_kwargs = trig_cfg.get("task_unique", {}).get("kwargs", None)
         self.action = trig_cfg.get("action")
         self.global_sym_table = trig_cfg.get("global_sym_table", {})
-        self.notify_q = asyncio.Queue(0)
+        self.notify_q = TrigQueue(0)
+        self.stats = TrigStats.get(self.name)
         self.active_expr = None
+        self.active_expr_eval = None
         self.state_active_ident = None
         self.state_trig_expr = None
         self.state_trig_eval = None
+        self.state_trig_expr_eval = None
+        self.state_trig_unchanged_cnt = 0
         self.state_trig_ident = None
         self.state_trig_ident_any = set()
         self.event_trig_expr = None
@@ -930,6 +1269,7 @@ class TrigInfo:
             if exc is not None:
                 self.active_expr.get_logger().error(exc)
                 return
+            self.active_expr_eval = StateTrigExpr(self.active_expr)
 
         if "time_trigger" in trig_cfg and self.time_trigger is None:
             self.run_on_startup = True
@@ -974,6 +1314,7 @@ class TrigInfo:
                 if exc is not None:
                     self.state_trig_eval.get_logger().error(exc)
                     return
+                self.state_trig_expr_eval = StateTrigExpr(self.state_trig_eval)
             self.have_trigger = True
 
         if self.event_trigger is not None:
@@ -1027,6 +1368,7 @@ class TrigInfo:
         """Stop this trigger task."""
 
         if self.task:
+            _LOGGER.debug("trigger %s: stopping; %s", self.name, self.debug_info())
             if self.state_trig_ident:
                 State.notify_del(self.state_trig_ident, self.notify_q)
             if self.event_trigger is not None:
@@ -1045,6 +1387,15 @@ class TrigInfo:
             action_future = self.call_action(notify_type, notify_info, run_task=False)
             Function.waiter_await(action_future)
 
+    def debug_info(self):
+        """Return the state trigger evaluation counters for debugging."""
+        info = {"state_trig_unchanged": self.state_trig_unchanged_cnt}
+        if self.state_trig_expr_eval:
+            info["state_trigger"] = self.state_trig_expr_eval.debug_info()
+        if self.active_expr_eval:
+            info["state_active"] = self.active_expr_eval.debug_info()
+        return info
+
     def start(self):
         """Start this trigger task."""
         if not self.task and self.setup_ok:
@@ -1104,6 +1455,7 @@ class TrigInfo:
                 state_trig_timeout = False
                 notify_info = None
                 notify_type = None
+                queue_wait = None
                 now = dt_now()
                 if startup_time is None:
                     startup_time = now
@@ -1145,19 +1497,25 @@ class TrigInfo:
                             time_next = now + dt.timedelta(seconds=timeout)
                             state_trig_timeout = True
                     if timeout is not None:
-                        while True:
-                            try:
-                                timeout = max(0, timeout)
-                                _LOGGER.debug("trigger %s waiting for %.6g secs", self.name, timeout)
-                                notify_type, notify_info = await asyncio.wait_for(
-                                    self.notify_q.get(), timeout=timeout
-                                )
-                                state_trig_timeout = False
-                                now = dt_now()
-                            except asyncio.TimeoutError:
+                        _LOGGER.debug("trigger %s waiting for %.6g secs", self.name, max(0, timeout))
+                        timer = TrigTime.timer_add(self.name, timeout, self.notify_q, time_next)
+                        try:
+                            while True:
+                                notify_type, notify_info = await self.notify_q.get()
+                                if notify_type != "timer":
+                                    queue_wait = self.notify_q.get_wait
+                                    state_trig_timeout = False
+                                    now = dt_now()
+                                    break
+                                if notify_info is not timer:
+                                    #
+                                    # stale wakeup from a timer that fired just as we were cancelling it
+                                    #
+                                    continue
                                 actual_now = dt_now()
                                 if actual_now < time_next:
                                     timeout = (time_next - actual_now).total_seconds()
+                                    timer = TrigTime.timer_add(self.name, timeout, self.notify_q, time_next)
                                     continue
                                 now = time_next
                                 if not state_trig_timeout:
@@ -1166,10 +1524,15 @@ class TrigInfo:
                                         "trigger_type": "time",
                                         "trigger_time": time_next,
                                     }
-                            break
+                                break
+                        finally:
+                            TrigTime.timer_cancel(timer)
                     elif self.have_trigger:
                         _LOGGER.debug("trigger %s waiting for state change or event", self.name)
                         notify_type, notify_info = await self.notify_q.get()
+                        while notify_type == "timer":
+                            notify_type, notify_info = await self.notify_q.get()
+                        queue_wait = self.notify_q.get_wait
                         now = dt_now()
                     else:
                         _LOGGER.debug("trigger %s finished", self.name)
@@ -1178,6 +1541,11 @@ class TrigInfo:
                 #
                 # check the trigger-specific expressions
                 #
+                trig_start = time.monotonic()
+                if queue_wait is not None:
+                    self.stats.add("queue_wait", queue_wait)
+                    trig_start -= queue_wait
+                self.stats.count(f"notify_{notify_type if not state_trig_timeout else 'state_hold'}")
                 trig_ok = True
                 new_vars = {}
                 user_kwargs = {}
@@ -1195,10 +1563,14 @@ class TrigInfo:
                         if "var_name" in func_args and not ident_values_changed(
                             func_args, self.state_trig_ident
                         ):
+                            self.state_trig_unchanged_cnt += 1
+                            self.stats.count("skipped_unchanged")
                             continue
 
                         if self.state_trig_eval:
-                            trig_ok = await self.state_trig_eval.eval(new_vars)
+                            eval_start = time.monotonic()
+                            trig_ok = await self.state_trig_expr_eval.eval(new_vars)
+                            self.stats.add("eval", time.monotonic() - eval_start)
                             exc = self.state_trig_eval.get_exception_long()
                             if exc is not None:
                                 self.state_trig_eval.get_logger().error(exc)
@@ -1292,7 +1664,9 @@ class TrigInfo:
                 #
                 if trig_ok and self.active_expr:
                     active_vars = State.notify_var_get(self.state_active_ident, new_vars)
-                    trig_ok = await self.active_expr.eval(active_vars)
+                    eval_start = time.monotonic()
+                    trig_ok = await self.active_expr_eval.eval(active_vars)
+                    self.stats.add("eval", time.monotonic() - eval_start)
                     exc = self.active_expr.get_exception_long()
                     if exc is not None:
                         self.active_expr.get_logger().error(exc)
@@ -1306,6 +1680,7 @@ class TrigInfo:
                         self.name,
                         notify_type,
                     )
+                    self.stats.count("skipped_false")
                     continue
 
                 if (
@@ -1319,10 +1694,11 @@ class TrigInfo:
                         self.name,
                         self.time_active_hold_off,
                     )
+                    self.stats.count("skipped_hold_off")
                     continue
 
                 func_args.update(user_kwargs)
-                if self.call_action(notify_type, func_args):
+                if self.call_action(notify_type, func_args, trig_start=trig_start):
                     last_trig_time = time.monotonic()
 
         except asyncio.CancelledError:
@@ -1341,8 +1717,8 @@ class TrigInfo:
                 Webhook.notify_del(self.webhook_trigger[0], self.notify_q)
             return
 
-    def call_action(self, notify_type, func_args, run_task=True):
-        """Call the trigger action function."""
+    def call_action(self, notify_type, func_args, run_task=True, trig_start=None):
+        """Call the trigger action function; trig_start is when the notification was queued."""
         action_ast_ctx = AstEval(f"{self.action.global_ctx_name}.{self.action.name}", self.action.global_ctx)
         Function.install_ast_funcs(action_ast_ctx)
         task_unique_func = None
@@ -1363,6 +1739,7 @@ class TrigInfo:
                 notify_type,
                 self.name,
             )
+            self.stats.count("dropped_task_unique")
             return False
 
         # Create new HASS Context with incoming as parent
@@ -1392,9 +1769,17 @@ class TrigInfo:
 
             if task_unique and task_unique_func:
                 await task_unique_func(task_unique)
+            action_start = time.monotonic()
             await ast_ctx.call_func(func, None, **kwargs)
+            action_end = time.monotonic()
+            self.stats.count("run")
+            self.stats.add("action", action_end - action_start)
+            if trig_start is not None:
+                self.stats.add("total", action_end - trig_start)
             if ast_ctx.get_exception_obj():
+                self.stats.count("error")
                 ast_ctx.get_logger().error(ast_ctx.get_exception_long())
+            TrigStats.action_done(self.stats)
 
         func = do_func_call(
             self.action,
@@ -28,10 +28,14 @@ from .const import (
 )
 from .helpers.config import get_device_id
 from .helpers.device_config import possible_matches
+from .helpers.gateway import TuyaGateway
 from .helpers.log import log_json
+from .helpers.transport import HEARTBEAT_INTERVAL, TuyaTransport
 
 _LOGGER = logging.getLogger(__name__)
 
+_MISSING = object()
+
 
 def _collect_possible_matches(cached_state, product_ids):
     """Collect possible matches from generator into an array."""
@@ -65,6 +69,9 @@ class TuyaLocalDevice(object):
         """
         self._name = name
         self._children = []
+        # dp id -> the entities using it, and the dps cleared by full polls
+        self._dp_entities = {}
+        self._nonpersistent_dps = set()
         self._force_dps = []
         self._product_ids = []
         self._running = False
@@ -81,13 +88,20 @@ class TuyaLocalDevice(object):
                     parent_lock = hass.data[DOMAIN][dev_id].get(
                         "tuyadevicelock", asyncio.Lock()
                     )
+                    gateway = hass.data[DOMAIN][dev_id].get("tuyagateway")
+                    if gateway is None:
+                        gateway = TuyaGateway(hass, parent)
+                        hass.data[DOMAIN][dev_id]["tuyagateway"] = gateway
                 else:
                     parent = tinytuya.Device(dev_id, address, local_key)
                     parent_lock = asyncio.Lock()
+                    gateway = None
                     if name != "Test":
+                        gateway = TuyaGateway(hass, parent)
                         hass.data[DOMAIN][dev_id] = {
                             "tuyadevice": parent,
                             "tuyadevicelock": parent_lock,
+                            "tuyagateway": gateway,
                         }
                 self._api = tinytuya.Device(
                     dev_cid,
@@ -101,13 +115,20 @@ class TuyaLocalDevice(object):
                     self._api_lock = hass.data[DOMAIN][dev_id].get(
                         "tuyadevicelock", asyncio.Lock()
                     )
+                    gateway = hass.data[DOMAIN][dev_id].get("tuyagateway")
+                    if gateway is None:
+                        gateway = TuyaGateway(hass, self._api)
+                        hass.data[DOMAIN][dev_id]["tuyagateway"] = gateway
                 else:
                     self._api = tinytuya.Device(dev_id, address, local_key)
                     self._api_lock = asyncio.Lock()
+                    gateway = None
                     if name != "Test":
+                        gateway = TuyaGateway(hass, self._api)
                         hass.data[DOMAIN][dev_id] = {
                             "tuyadevice": self._api,
                             "tuyadevicelock": self._api_lock,
+                            "tuyagateway": gateway,
                         }
         except Exception as e:
             _LOGGER.error(
@@ -123,8 +144,14 @@ class TuyaLocalDevice(object):
         if self._api.parent:
             # Retries cause problems for other children of the parent device
             self._api.parent.set_socketRetryLimit(1)
+        # Sub devices, and gateways with sub devices, share the gateway's
+        # connection.  Without one (while testing the config) sub devices
+        # stay on tinytuya's blocking calls.
+        self._transport = None if dev_cid else TuyaTransport(self._api)
+        self._gateway = gateway
 
         self._refresh_task = None
+        self._pending_expiry = None
         self._protocol_configured = protocol_version
         self._poll_only = poll_only
         self._temporary_poll = False
@@ -170,9 +197,25 @@ class TuyaLocalDevice(object):
     @property
     def has_returned_state(self):
         """Return True if the device has returned some state."""
-        cached = self._get_cached_state()
+        cached = (
+            self._get_cached_state() if self._pending_updates else self._cached_state
+        )
         return len(cached) > 1 or cached.get("updated_at", 0) > 0
 
+    def cache_refresh_info(self):
+        """
+        Return what is needed to keep the cached state fresh.
+
+        Returns a tuple of when the cached state was last updated, how long
+        it stays fresh and the dps to request with updatedps (empty when
+        the device does not support it).
+        """
+        return (
+            self._cached_state.get("updated_at", 0),
+            self._CACHE_TIMEOUT,
+            self._force_dps if self._api_protocol_working else [],
+        )
+
     @callback
     def actually_start(self, event=None):
         _LOGGER.debug("Starting monitor loop for %s", self.name)
@@ -200,11 +243,14 @@ class TuyaLocalDevice(object):
         _LOGGER.debug("Stopping monitor loop for %s", self.name)
         self._running = False
         self._children.clear()
+        self._dp_entities.clear()
+        self._nonpersistent_dps.clear()
         self._force_dps.clear()
+        if self._pending_expiry:
+            self._pending_expiry.cancel()
+            self._pending_expiry = None
         if self._refresh_task:
-            self._api.set_socketPersistent(False)
-            if self._api.parent:
-                self._api.parent.set_socketPersistent(False)
+            self._set_socket_persistent(False)
             await self._refresh_task
         _LOGGER.debug("Monitor loop for %s stopped", self.name)
         self._refresh_task = None
@@ -216,6 +262,7 @@ class TuyaLocalDevice(object):
         should_poll = len(self._children) == 0 and not self._hass.is_running
 
         self._children.append(entity)
+        self._index_entity_dps(entity)
         for dp in entity._config.dps():
             if dp.force and dp.id not in self._force_dps:
                 self._force_dps.append(int(dp.id))
@@ -227,8 +274,20 @@ class TuyaLocalDevice(object):
         elif should_poll:
             entity.async_schedule_update_ha_state(True)
 
+    def _index_entity_dps(self, entity):
+        for dp in entity._config.dps():
+            entities = self._dp_entities.setdefault(dp.id, [])
+            if entity not in entities:
+                entities.append(entity)
+            if not dp.persist:
+                self._nonpersistent_dps.add(dp.id)
+
     async def async_unregister_entity(self, entity):
         self._children.remove(entity)
+        self._dp_entities.clear()
+        self._nonpersistent_dps.clear()
+        for child in self._children:
+            self._index_entity_dps(child)
         if not self._children:
             try:
                 await self.async_stop()
@@ -246,18 +305,49 @@ class TuyaLocalDevice(object):
                         log_json(poll),
                     )
                     full_poll = poll.pop("full_poll", False)
-                    self._cached_state = self._cached_state | poll
-                    self._cached_state["updated_at"] = time()
+                    cached = self._cached_state
+                    had_state = len(cached) > 1 or cached.get("updated_at", 0) > 0
+                    changed = [
+                        dp_id
+                        for dp_id, value in poll.items()
+                        if cached.get(dp_id, _MISSING) != value
+                    ]
+                    cached.update(poll)
+                    cached["updated_at"] = time()
+                    # Optimistic values that were confirmed, rejected or
+                    # have timed out no longer hide the cached state.
+                    pending = list(self._pending_updates)
                     self._remove_properties_from_pending_updates(poll)
-
-                    for entity in self._children:
+                    remaining = self._get_pending_updates()
+                    changed.extend(k for k in pending if k not in remaining)
+                    # clear non-persistant dps that were not in a full poll
+                    if full_poll:
+                        for dp_id in self._nonpersistent_dps.difference(poll):
+                            if dp_id in cached:
+                                del cached[dp_id]
+                                changed.append(dp_id)
+
+                    # Only entities using a changed dp need a state write,
+                    # unless this is the first state, which makes them all
+                    # available.  Dicts are used as ordered sets.
+                    if had_state:
+                        updated = {
+                            entity: None
+                            for dp_id in changed
+                            for entity in self._dp_entities.get(dp_id, ())
+                        }
+                    else:
+                        updated = dict.fromkeys(self._children)
+                    receivers = {
+                        entity: None
+                        for dp_id in poll
+                        for entity in self._dp_entities.get(dp_id, ())
+                    }
+                    for entity in receivers:
                         # let entities trigger off poll contents directly
-                        entity.on_receive(poll, full_poll)
-                        # clear non-persistant dps that were not in a full poll
-                        if full_poll:
-                            for dp in entity._config.dps():
-                                if not dp.persist and dp.id not in poll:
-                                    self._cached_state.pop(dp.id, None)
+                        if entity.on_receive(poll, full_poll):
+                            updated[entity] = None
+                    for entity in updated:
                         entity.schedule_update_ha_state()
                 else:
                     _LOGGER.debug(
@@ -271,9 +361,7 @@ class TuyaLocalDevice(object):
             _LOGGER.exception(
                 "%s receive loop terminated by exception %s", self.name, t
             )
-            self._api.set_socketPersistent(False)
-            if self._api.parent:
-                self._api.parent.set_socketPersistent(False)
+            self._set_socket_persistent(False)
 
     @property
     def should_poll(self):
@@ -281,9 +369,7 @@ class TuyaLocalDevice(object):
 
     def pause(self):
         self._temporary_poll = True
-        self._api.set_socketPersistent(False)
-        if self._api.parent:
-            self._api.parent.set_socketPersistent(False)
+        self._set_socket_persistent(False)
 
     def resume(self):
         self._temporary_poll = False
@@ -297,13 +383,13 @@ class TuyaLocalDevice(object):
         # all dps updated
         dps_updated = False
 
-        self._api.set_socketPersistent(persist)
-        if self._api.parent:
-            self._api.parent.set_socketPersistent(persist)
+        self._set_socket_persistent(persist)
 
         while self._running:
             error_count = self._api_working_protocol_failures
             force_backoff = False
+            transport = None
+            gateway = None
             try:
                 await self._api_lock.acquire()
                 last_cache = self._cached_state.get("updated_at", 0)
@@ -318,11 +404,21 @@ class TuyaLocalDevice(object):
                     _LOGGER.debug(
                         "%s persistant connection set to %s", self.name, persist
                     )
-                    self._api.set_socketPersistent(persist)
-                    if self._api.parent:
-                        self._api.parent.set_socketPersistent(persist)
-
-                if now - last_cache > self._CACHE_TIMEOUT:
+                    self._set_socket_persistent(persist)
+
+                if persist and self._uses_gateway:
+                    if self._transport and self._transport.connected:
+                        # sub devices were added since it connected
+                        self._transport.close()
+                    gateway = self._gateway
+                    gateway.register(self)
+                elif persist and self._transport and not self._api.children:
+                    transport = self._transport
+
+                if now - last_cache > self._CACHE_TIMEOUT and not (
+                    (transport and transport.connected)
+                    or (gateway and gateway.connected)
+                ):
                     if (
                         self._force_dps
                         and not dps_updated
@@ -340,6 +436,52 @@ class TuyaLocalDevice(object):
                         )
                         dps_updated = False
                         full_poll = True
+                elif transport:
+                    # Everything goes through the transport while it is
+                    # connected, as devices often accept a single connection.
+                    try:
+                        if not transport.connected:
+                            await transport.async_connect()
+                        if (
+                            now - last_cache > self._CACHE_TIMEOUT
+                            and now - transport.last_query >= HEARTBEAT_INTERVAL
+                        ):
+                            if (
+                                self._force_dps
+                                and not dps_updated
+                                and self._api_protocol_working
+                            ):
+                                await transport.async_updatedps(self._force_dps)
+                                dps_updated = True
+                            else:
+                                await transport.async_status()
+                                dps_updated = False
+                        elif time() - transport.last_sent >= HEARTBEAT_INTERVAL:
+                            await transport.async_heartbeat()
+                        poll, full_poll = await transport.async_receive(
+                            transport.last_sent + HEARTBEAT_INTERVAL - time()
+                        )
+                        if poll and "Error" not in poll:
+                            self._api_working_protocol_failures = 0
+                    except (OSError, EOFError) as e:
+                        transport.close()
+                        if not self._running:
+                            break
+                        poll = tinytuya.error_json(tinytuya.ERR_CONNECT, str(e))
+                        force_backoff = True
+                elif gateway:
+                    # The gateway polls its sub devices together and routes
+                    # their messages, so the others are not held up while
+                    # this one waits.
+                    self._api_lock.release()
+                    try:
+                        poll, full_poll = await gateway.async_receive(
+                            self, HEARTBEAT_INTERVAL
+                        )
+                    finally:
+                        await self._api_lock.acquire()
+                    if poll and "Error" not in poll:
+                        self._api_working_protocol_failures = 0
                 elif persist:
                     await self._hass.async_add_executor_job(
                         self._api.heartbeat,
@@ -380,9 +522,7 @@ class TuyaLocalDevice(object):
             except CancelledError:
                 self._running = False
                 # Close the persistent connection when exiting the loop
-                self._api.set_socketPersistent(False)
-                if self._api.parent:
-                    self._api.parent.set_socketPersistent(False)
+                self._set_socket_persistent(False)
                 raise
             except Exception as t:
                 _LOGGER.exception(
@@ -391,21 +531,42 @@ class TuyaLocalDevice(object):
                     type(t).__name__,
                     t,
                 )
-                self._api.set_socketPersistent(False)
-                if self._api.parent:
-                    self._api.parent.set_socketPersistent(False)
+                self._set_socket_persistent(False)
                 force_backoff = True
             finally:
                 if self._api_lock.locked():
                     self._api_lock.release()
             if not self.has_returned_state:
                 force_backoff = True
-            await asyncio.sleep(5 if force_backoff else 0.1)
+            if force_backoff:
+                await asyncio.sleep(5)
+            elif not (transport or gateway):
+                # the transport and gateway wait for the device by themselves
+                await asyncio.sleep(0.1)
 
         # Close the persistent connection when exiting the loop
-        self._api.set_socketPersistent(False)
-        if self._api.parent:
-            self._api.parent.set_socketPersistent(False)
+        self._set_socket_persistent(False)
+
+    @property
+    def _uses_gateway(self):
+        return self._gateway is not None and bool(
+            self._api.parent or self._api.children
+        )
+
+    def _set_socket_persistent(self, persist):
+        # the gateway's connection is shared, so it is not ours to change
+        if not self._uses_gateway:
+            self._api.set_socketPersistent(persist)
+            if self._api.parent:
+                self._api.parent.set_socketPersistent(persist)
+        if not persist:
+            self._close_transport()
+
+    def _close_transport(self):
+        if self._transport:
+            self._transport.close()
+        if self._gateway:
+            self._gateway.unregister(self)
 
     def set_detected_product_id(self, product_id):
         self._product_ids.append(product_id)
@@ -475,6 +636,10 @@ class TuyaLocalDevice(object):
             )
 
     def get_property(self, dps_id):
+        # entities read many properties per state write, avoid copying the
+        # state when there is nothing pending to overlay
+        if not self._pending_updates:
+            return self._cached_state.get(dps_id)
         cached_state = self._get_cached_state()
         return cached_state.get(dps_id)
 
@@ -588,25 +753,79 @@ class TuyaLocalDevice(object):
             log_json(pending_properties),
         )
 
-        await self._retry_on_failed_connection(
-            lambda: self._set_values(pending_properties),
-            "Failed to update device state.",
-        )
+        connection = None
+        if self._transport and self._transport.connected:
+            connection = self._transport
+        elif self._gateway and self._gateway.serves(self):
+            connection = self._gateway
+        if connection:
+            try:
+                await connection.async_set_values(pending_properties, self._api)
+                self._set_values_sent(pending_properties)
+            except (OSError, EOFError) as e:
+                _LOGGER.debug(
+                    "%s transport failed to send update, retrying: %s",
+                    self.name,
+                    e,
+                )
+                connection.close()
+                connection = None
+
+        if not connection:
+            await self._retry_on_failed_connection(
+                lambda: self._set_values(pending_properties),
+                "Failed to update device state.",
+            )
+        self._schedule_pending_expiry()
+
+    def _schedule_pending_expiry(self):
+        """Rewrite the entities when their optimistic values time out."""
+        if self._pending_expiry:
+            return
+        sent = [
+            info["updated_at"]
+            for info in self._pending_updates.values()
+            if info["sent"]
+        ]
+        if sent:
+            self._pending_expiry = self._hass.loop.call_later(
+                max(min(sent) + self._FAKE_IT_TIMEOUT - time(), 0),
+                self._expire_pending_updates,
+            )
+
+    @callback
+    def _expire_pending_updates(self):
+        self._pending_expiry = None
+        pending = list(self._pending_updates)
+        remaining = self._get_pending_updates()
+        # without a poll reporting the dp, nothing else would show that the
+        # device did not take the new value
+        for entity in {
+            entity: None
+            for dp_id in pending
+            if dp_id not in remaining
+            for entity in self._dp_entities.get(dp_id, ())
+        }:
+            entity.async_schedule_update_ha_state()
+        self._schedule_pending_expiry()
 
     def _set_values(self, properties):
         try:
             self._lock.acquire()
             self._api.set_multiple_values(properties, nowait=True)
-            self._cached_state["updated_at"] = 0
-            now = time()
-            self._last_connection = now
-            pending_updates = self._get_pending_updates()
-            for key in properties.keys():
-                pending_updates[key]["updated_at"] = now
-                pending_updates[key]["sent"] = True
+            self._set_values_sent(properties)
         finally:
             self._lock.release()
 
+    def _set_values_sent(self, properties):
+        self._cached_state["updated_at"] = 0
+        now = time()
+        self._last_connection = now
+        pending_updates = self._get_pending_updates()
+        for key in properties.keys():
+            pending_updates[key]["updated_at"] = now
+            pending_updates[key]["sent"] = True
+
     async def _retry_on_failed_connection(self, func, error_message):
         if self._api_protocol_version_index is None:
             await self._rotate_api_protocol_version()
@@ -687,6 +906,7 @@ class TuyaLocalDevice(object):
         return self._pending_updates
 
     async def _rotate_api_protocol_version(self):
+        self._close_transport()
         if self._api_protocol_version_index is None:
             try:
                 self._api_protocol_version_index = API_PROTOCOL_VERSIONS.index(
@@ -724,6 +944,9 @@ class TuyaLocalDevice(object):
                 self._api.parent.set_version,
                 new_version,
             )
+            if self._gateway:
+                # the connection was made with the previous version
+                self._gateway.close()
 
     @staticmethod
     def get_key_for_value(obj, value, fallback=None):
@@ -751,6 +974,7 @@ def setup_device(hass: HomeAssistant, config: dict):
         "device": device,
         "tuyadevice": device._api,
         "tuyadevicelock": device._api_lock,
+        "tuyagateway": device._gateway,
     }
 
     return device
@@ -763,3 +987,4 @@ async def async_delete_device(hass: HomeAssistant, config: dict):
     del hass.data[DOMAIN][device_id]["device"]
     del hass.data[DOMAIN][device_id]["tuyadevice"]
     del hass.data[DOMAIN][device_id]["tuyadevicelock"]
+    hass.data[DOMAIN][device_id].pop("tuyagateway", None)
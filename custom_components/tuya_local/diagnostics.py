@@ -114,6 +114,10 @@ def _async_device_as_dict(
         "cached_state": redact_dps(device, device._cached_state),
         "pending_state": redact_dps(device, device._pending_updates),
         "connected": device._running,
+        "transport_connected": bool(
+            device._transport and device._transport.connected
+        ),
+        "gateway_connected": bool(device._gateway and device._gateway.serves(device)),
         "force_dps": device._force_dps,
     }
 
@@ -123,8 +123,14 @@ class TuyaLocalEntity:
         await self._device.async_unregister_entity(self)
 
     def on_receive(self, dps, full_poll):
-        """Override to process dps directly as they are received"""
-        pass
+        """
+        Override to process dps directly as they are received.
+
+        Only called when the entity uses one of the received dps.  Return
+        True if the state needs to be written even if none of the dps
+        changed value.
+        """
+        return False
 
 
 UNIT_ASCII_MAP = {
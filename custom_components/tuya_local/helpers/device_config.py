@@ -2,14 +2,16 @@
 Config parser for Tuya Local devices.
 """
 
+import json
 import logging
 from base64 import b64decode, b64encode
 from collections.abc import Sequence
 from datetime import datetime
 from fnmatch import fnmatch
 from numbers import Number
-from os import scandir
+from os import replace, scandir
 from os.path import dirname, exists, join, splitext
+from threading import Lock
 
 from homeassistant.util import slugify
 from homeassistant.util.yaml import load_yaml
@@ -18,6 +20,19 @@ import custom_components.tuya_local.devices as config_dir
 
 _LOGGER = logging.getLogger(__name__)
 
+_DPS_TYPES = {
+    "boolean": bool,
+    "integer": int,
+    "string": str,
+    "float": float,
+    "bitfield": int,
+    "json": str,
+    "base64": str,
+    "utf16b64": str,
+    "hex": str,
+    "unixtime": int,
+}
+
 
 def _typematch(vtype, value):
     # Workaround annoying legacy of bool being a subclass of int in Python
@@ -79,6 +94,10 @@ def _equal_or_in(value1, values2):
         return value1 == values2
 
 
+# Cached active conditions and values per dp, cleared when full
+_DECODE_CACHE_SIZE = 256
+
+
 def _remove_duplicates(seq):
     """Remove dulicates from seq, maintaining order."""
     if not seq:
@@ -236,6 +255,8 @@ class TuyaEntityConfig:
     def __init__(self, device, config):
         self._device = device
         self._config = config
+        self._dps_by_name = None
+        self._compiled = {}
 
     @property
     def name(self):
@@ -333,10 +354,19 @@ class TuyaEntityConfig:
 
     def find_dps(self, name):
         """Find a dps with the specified name."""
-        for d in self.dps():
-            if d.name == name:
-                return d
-        return None
+        if self._dps_by_name is None:
+            self._dps_by_name = {}
+            for d in self._config["dps"]:
+                self._dps_by_name.setdefault(d["name"], d)
+        d = self._dps_by_name.get(name)
+        return None if d is None else TuyaDpsConfig(self, d)
+
+    def _compiled_dps(self, config):
+        """Return the lookup tables for one of this entity's dps configs."""
+        compiled = self._compiled.get(id(config))
+        if compiled is None:
+            compiled = self._compiled[id(config)] = _CompiledDps(self, config)
+        return compiled
 
     def available(self, device):
         """Return whether this entity should be available, with state as given."""
@@ -360,34 +390,89 @@ class TuyaEntityConfig:
         return not hidden and not self.deprecated
 
 
+def _static_mapping(config):
+    """Return whether the mapping of a dp config can be looked up by value."""
+    return config["type"] != "bitfield" and not any(
+        "available" in m for m in config.get("mapping") or []
+    )
+
+
+def _pure_mapping(config):
+    """Return whether the value of a dp only depends on its raw value."""
+    return _static_mapping(config) and not any(
+        "conditions" in m or "value_redirect" in m or "value_mirror" in m
+        for m in config.get("mapping") or []
+    )
+
+
+class _CompiledDps:
+    """
+    Lookup tables compiled once from the mapping of a dp config.
+
+    by_dps_val and default replace the scan of the mapping list, unless a
+    mapping depends on the availability of other dps or the dp is a
+    bitfield (static is False).  When the value only depends on the raw
+    value (pure), decoded values are cached by raw value.
+
+    Active conditions are cached by the raw value of their constraint dp,
+    so they are recomputed only when that value changes.  constraints maps
+    the mappings this applies to (conditions not depending on availability,
+    and a constraint dp whose decoded value only depends on its raw value)
+    to the constraint dp id, or None if the entity does not have it.
+    """
+
+    def __init__(self, entity, config):
+        mapping = config.get("mapping") or []
+        self.static = _static_mapping(config)
+        self.pure = _pure_mapping(config)
+        self.by_dps_val = {}
+        self.default = None
+        self.constraints = {}
+        self.conditions = {}
+        self.values = {}
+        for m in mapping:
+            if "dps_val" in m:
+                self.by_dps_val.setdefault(str(m["dps_val"]), m)
+            else:
+                self.default = m
+            conditions = m.get("conditions")
+            constraint = m.get("constraint", config["name"])
+            if (
+                not conditions
+                or not constraint
+                or any("available" in c for c in conditions)
+            ):
+                continue
+            c_dps = entity.find_dps(constraint)
+            if c_dps is None:
+                self.constraints[id(m)] = None
+            elif c_dps.rawtype not in ("base64", "hex") or _pure_mapping(
+                c_dps._config
+            ):
+                self.constraints[id(m)] = c_dps.id
+
+
 class TuyaDpsConfig:
     """Representation of a dps config."""
 
     def __init__(self, entity, config):
         self._entity = entity
         self._config = config
+        self._tables = None
         self.stringify = False
 
+    def _compiled_tables(self):
+        if self._tables is None:
+            self._tables = self._entity._compiled_dps(self._config)
+        return self._tables
+
     @property
     def id(self):
         return str(self._config["id"])
 
     @property
     def type(self):
-        t = self._config["type"]
-        types = {
-            "boolean": bool,
-            "integer": int,
-            "string": str,
-            "float": float,
-            "bitfield": int,
-            "json": str,
-            "base64": str,
-            "utf16b64": str,
-            "hex": str,
-            "unixtime": int,
-        }
-        return types.get(t)
+        return _DPS_TYPES.get(self._config["type"])
 
     @property
     def rawtype(self):
@@ -452,9 +537,30 @@ class TuyaDpsConfig:
 
     def get_value(self, device):
         """Return the value of the dps from the given device."""
-        mask = self.mask
         # Get raw value directly avoiding accidental scaling by decoded_value()
         raw_from_device = device.get_property(self.id)
+        compiled = self._tables or self._compiled_tables()
+        if not compiled.pure:
+            return self._value_from_raw(raw_from_device, device)
+        # bool and int values are equal but not mapped the same
+        key = (type(raw_from_device), raw_from_device)
+        cache = compiled.values
+        try:
+            value, self.stringify = cache[key]
+            return value
+        except KeyError:
+            pass
+        except TypeError:
+            # unhashable value
+            return self._value_from_raw(raw_from_device, device)
+        value = self._value_from_raw(raw_from_device, device)
+        if len(cache) >= _DECODE_CACHE_SIZE:
+            cache.clear()
+        cache[key] = (value, self.stringify)
+        return value
+
+    def _value_from_raw(self, raw_from_device, device):
+        mask = self.mask
         bytevalue = self.decode_value(raw_from_device, device)
 
         if mask and isinstance(bytevalue, bytes):
@@ -694,6 +800,9 @@ class TuyaDpsConfig:
         return self._config.get("class")
 
     def _find_map_for_dps(self, value, device):
+        compiled = self._tables or self._compiled_tables()
+        if compiled.static:
+            return compiled.by_dps_val.get(str(value), compiled.default)
         default = None
         for m in self._config.get("mapping", {}):
             if not self.mapping_available(m, device) and "conditions" not in m:
@@ -876,6 +985,28 @@ class TuyaDpsConfig:
         return default
 
     def _active_condition(self, mapping, device, value=None):
+        if not mapping.get("conditions"):
+            return None
+        compiled = self._tables or self._compiled_tables()
+        if value is not None or id(mapping) not in compiled.constraints:
+            return self._find_active_condition(mapping, device, value)
+        # the active condition only depends on the value of the constraint
+        c_id = compiled.constraints[id(mapping)]
+        key = (id(mapping), None if c_id is None else device.get_property(c_id))
+        cache = compiled.conditions
+        try:
+            return cache[key]
+        except KeyError:
+            pass
+        except TypeError:
+            # unhashable value
+            return self._find_active_condition(mapping, device)
+        if len(cache) >= _DECODE_CACHE_SIZE:
+            cache.clear()
+        cond = cache[key] = self._find_active_condition(mapping, device)
+        return cond
+
+    def _find_active_condition(self, mapping, device, value=None):
         constraint = mapping.get("constraint", self.name)
         conditions = mapping.get("conditions")
         c_match = None
@@ -1106,10 +1237,161 @@ def available_configs():
             yield direntry.name
 
 
+# Bump when the summary format changes so that stale index files are rebuilt.
+_INDEX_VERSION = 1
+_INDEX_FILE = join(dirname(dirname(config_dir.__file__)), ".devices_index.json")
+_index_lock = Lock()
+_index = None
+
+
+def _summarize_config(cfg):
+    """Return the parts of a config needed to preselect match candidates."""
+    parsed = TuyaDeviceConfig(cfg)
+    dps = {}
+    required = set()
+    for dp in parsed._get_all_dps():
+        types = dps.setdefault(dp.id, [])
+        if dp.rawtype not in types:
+            types.append(dp.rawtype)
+        if not dp.optional:
+            required.add(dp.id)
+    return {
+        "legacy_type": parsed.legacy_type,
+        "products": [p["id"] for p in parsed._config.get("products", []) if "id" in p],
+        "required": sorted(required),
+        "dps": dps,
+    }
+
+
+class _ConfigIndex:
+    """Compiled summary of all the device configs.
+
+    Holds the product ids, legacy type and dps (ids, types and whether they
+    are required) of each config, with inverted indexes from product id and
+    from one of the required dps to the configs, so that matching only needs
+    to load the yaml of a handful of plausible configs.  The summaries are
+    persisted in _INDEX_FILE and refreshed by comparing file mtimes, so only
+    added or modified configs are parsed again.
+    """
+
+    def __init__(self, entries):
+        self.entries = entries
+        self.by_product = {}
+        self.by_dp = {}
+        self.unconditional = []
+        self.by_legacy_type = {}
+        for cfg, entry in entries.items():
+            summary = entry["summary"]
+            if summary is None:
+                # failed to load, let TuyaDeviceConfig report it when matching
+                self.unconditional.append(cfg)
+                continue
+            for product_id in summary["products"]:
+                self.by_product.setdefault(product_id, []).append(cfg)
+            if summary["required"]:
+                # all the required dps must be present for a match (unless the
+                # product matches) so indexing just one of them is enough
+                self.by_dp.setdefault(summary["required"][0], []).append(cfg)
+            else:
+                self.unconditional.append(cfg)
+            self.by_legacy_type.setdefault(summary["legacy_type"], cfg)
+
+    def candidates(self, dps, product_ids):
+        """Return, in config dir order, the configs which could match."""
+        candidates = set(self.unconditional)
+        for product_id in product_ids or ():
+            candidates.update(self.by_product.get(product_id, ()))
+        for dp_id in dps:
+            candidates.update(self.by_dp.get(dp_id, ()))
+
+        for cfg in self.entries:
+            if cfg not in candidates:
+                continue
+            summary = self.entries[cfg]["summary"]
+            if summary is not None and not _summary_may_match(
+                summary, dps, product_ids
+            ):
+                continue
+            yield cfg
+
+
+def _summary_may_match(summary, dps, product_ids):
+    """Quick version of TuyaDeviceConfig.matches working on the summary."""
+    for dp_id, rawtypes in summary["dps"].items():
+        if dp_id in dps:
+            for rawtype in rawtypes:
+                vtype = _DPS_TYPES.get(rawtype)
+                # leave unknown types to matches, which will report the error
+                if vtype is not None and not _typematch(vtype, dps[dp_id]):
+                    return False
+    if product_ids and any(p in product_ids for p in summary["products"]):
+        return True
+    return all(dp_id in dps for dp_id in summary["required"])
+
+
+def _load_index_file():
+    try:
+        with open(_INDEX_FILE, encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") == _INDEX_VERSION:
+            return data["configs"]
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        _LOGGER.warning("Ignoring unreadable device config index: %s", e)
+    return {}
+
+
+def _save_index_file(entries):
+    try:
+        tmpfile = f"{_INDEX_FILE}.tmp"
+        with open(tmpfile, "w", encoding="utf-8") as f:
+            json.dump({"version": _INDEX_VERSION, "configs": entries}, f)
+        replace(tmpfile, _INDEX_FILE)
+    except OSError as e:
+        _LOGGER.warning("Unable to save device config index: %s", e)
+
+
+def _get_index():
+    """Return the config index, updating it for any added, modified or
+    removed config file.  Blocking, so call it from the executor."""
+    global _index
+    _CONFIG_DIR = dirname(config_dir.__file__)
+    with _index_lock:
+        if _index is None:
+            known = _load_index_file()
+        else:
+            known = _index.entries
+        entries = {}
+        changed = False
+        for direntry in scandir(_CONFIG_DIR):
+            if not (direntry.is_file() and fnmatch(direntry.name, "*.yaml")):
+                continue
+            cfg = direntry.name
+            mtime = direntry.stat().st_mtime_ns
+            entry = known.get(cfg)
+            if entry is None or entry["mtime"] != mtime:
+                try:
+                    summary = _summarize_config(cfg)
+                except Exception as e:
+                    _LOGGER.error("Unable to index %s: %s", cfg, e)
+                    summary = None
+                entry = {"mtime": mtime, "summary": summary}
+                changed = True
+            entries[cfg] = entry
+        if changed or len(entries) != len(known):
+            _LOGGER.debug("Device config index updated (%d configs)", len(entries))
+            _save_index_file(entries)
+            _index = _ConfigIndex(entries)
+        elif _index is None:
+            _index = _ConfigIndex(entries)
+        return _index
+
+
 def possible_matches(dps, product_ids=None):
     """Return possible matching configs for a given set of
     dps values and product_ids."""
-    for cfg in available_configs():
+    for cfg in _get_index().candidates(dps, product_ids):
         parsed = TuyaDeviceConfig(cfg)
         try:
             if parsed.matches(dps, product_ids):
@@ -1138,9 +1420,8 @@ def config_for_legacy_use(conf_type):
     to be the correct config for the device, so only use it for looking up
     the legacy class during the transition period.
     """
-    for cfg in available_configs():
-        parsed = TuyaDeviceConfig(cfg)
-        if parsed.legacy_type == conf_type:
-            return parsed
+    cfg = _get_index().by_legacy_type.get(conf_type)
+    if cfg:
+        return TuyaDeviceConfig(cfg)
 
     return None
@@ -0,0 +1,195 @@
+"""
+Shared connection for the sub devices of a Tuya gateway.
+
+Sub devices are reached through their gateway's connection, and gateways
+often accept a single one.  Rather than each sub device running its own
+persistent connection through the shared tinytuya parent, the gateway owns
+one asyncio transport, sends the status requests of all its sub devices
+together and routes the replies and pushed updates to the sub device they
+are for, using the cid in the message.
+"""
+
+import asyncio
+import logging
+from time import time
+
+import tinytuya
+
+from .transport import HEARTBEAT_INTERVAL, TuyaTransport, message_cid
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class TuyaGateway:
+    """Multiplexes a gateway connection between its sub devices."""
+
+    def __init__(self, hass, api):
+        """
+        Args:
+            hass (HomeAssistant): The Home Assistant instance.
+            api (tinytuya.Device): The gateway, parent of the sub devices.
+        """
+        self._hass = hass
+        self._api = api
+        self._transport = TuyaTransport(api)
+        # sub device id (None for the gateway itself) -> TuyaLocalDevice
+        self._devices = {}
+        self._queues = {}
+        self._queried = {}
+        self._dps_updated = set()
+        self._task = None
+
+    @property
+    def connected(self):
+        return self._transport.connected
+
+    def serves(self, device):
+        """Return True if messages for the device go through the gateway."""
+        return self.connected and self._devices.get(device.dev_cid) is device
+
+    def register(self, device):
+        """Route the messages for a device, connecting if needed."""
+        cid = device.dev_cid
+        if self._devices.get(cid) is not device:
+            _LOGGER.debug("%s joining gateway %s", device.name, self._api.id)
+            self._devices[cid] = device
+            self._queues[cid] = asyncio.Queue()
+            self._queried.pop(cid, None)
+            self._dps_updated.discard(cid)
+        if not self._task:
+            self._task = self._hass.async_create_background_task(
+                self._async_run(), f"tuya_local gateway {self._api.id}"
+            )
+
+    def unregister(self, device):
+        """Stop routing messages to a device, disconnecting after the last."""
+        cid = device.dev_cid
+        if self._devices.get(cid) is device:
+            _LOGGER.debug("%s leaving gateway %s", device.name, self._api.id)
+            del self._devices[cid]
+            # wake up the device if it is waiting for a message
+            self._queues.pop(cid).put_nowait((None, False))
+            if not self._devices:
+                self.close()
+
+    def close(self):
+        """Close the connection, it is reopened when a device registers."""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        self._transport.close()
+
+    async def async_receive(self, device, timeout):
+        """
+        Wait up to timeout seconds for a message for the device.
+
+        Returns a tuple of the decoded message (None if there was none) and
+        whether it is the reply to a status request.
+        """
+        queue = self._queues.get(device.dev_cid)
+        if queue is None:
+            return None, False
+        try:
+            async with asyncio.timeout(timeout):
+                return await queue.get()
+        except TimeoutError:
+            return None, False
+
+    async def async_set_values(self, properties, api):
+        """Send new dp values for a sub device."""
+        await self._transport.async_set_values(properties, api)
+
+    async def _async_run(self):
+        transport = self._transport
+        try:
+            while self._devices:
+                try:
+                    if not transport.connected:
+                        await transport.async_connect()
+                        # the devices could have missed updates while
+                        # disconnected
+                        self._queried.clear()
+                    next_query = await self._async_query_stale()
+                    if time() - transport.last_sent >= HEARTBEAT_INTERVAL:
+                        await transport.async_heartbeat()
+                    result, full_poll = await transport.async_receive(
+                        min(transport.last_sent + HEARTBEAT_INTERVAL, next_query)
+                        - time()
+                    )
+                    if result is not None:
+                        self._route(result, full_poll)
+                except (OSError, EOFError) as e:
+                    transport.close()
+                    if not self._devices:
+                        break
+                    _LOGGER.debug(
+                        "gateway %s connection failed: %s", self._api.id, e
+                    )
+                    error = tinytuya.error_json(tinytuya.ERR_CONNECT, str(e))
+                    for queue in self._queues.values():
+                        queue.put_nowait((error, False))
+                    await asyncio.sleep(5)
+                except Exception as e:
+                    _LOGGER.exception(
+                        "gateway %s error %s:%s", self._api.id, type(e).__name__, e
+                    )
+                    transport.close()
+                    await asyncio.sleep(5)
+        finally:
+            # a cancelled task can finish after a new one was started
+            if self._task is asyncio.current_task():
+                self._task = None
+                transport.close()
+
+    async def _async_query_stale(self):
+        """
+        Request the state of the devices whose cached state is stale.
+
+        Once one device needs a status, every device that has not been
+        refreshed for half of its cache timeout is queried in the same
+        batch, so the sub devices end up polled together rather than each
+        on its own schedule.  Returns when the next query is due.
+        """
+        now = time()
+        next_query = now + HEARTBEAT_INTERVAL
+        due = False
+        batch = []
+        for cid, device in self._devices.items():
+            updated, cache_timeout, force_dps = device.cache_refresh_info()
+            # at most one query per heartbeat interval
+            queried = self._queried.get(cid, 0) + HEARTBEAT_INTERVAL
+            stale_at = max(updated + cache_timeout, queried)
+            if stale_at <= now:
+                due = True
+            else:
+                next_query = min(next_query, stale_at)
+            if max(updated + cache_timeout / 2, queried) <= now:
+                batch.append((cid, device, force_dps))
+        if not due:
+            return next_query
+
+        for cid, device, force_dps in batch:
+            self._queried[cid] = now
+            if force_dps and cid not in self._dps_updated:
+                await self._transport.async_updatedps(force_dps, device._api)
+                self._dps_updated.add(cid)
+            else:
+                await self._transport.async_status(device._api)
+                self._dps_updated.discard(cid)
+        _LOGGER.debug(
+            "gateway %s queried %d of %d devices",
+            self._api.id,
+            len(batch),
+            len(self._devices),
+        )
+        return next_query
+
+    def _route(self, result, full_poll):
+        cid = message_cid(result)
+        queue = self._queues.get(cid)
+        if queue is None:
+            _LOGGER.debug(
+                "gateway %s discarding message for %s", self._api.id, cid or "itself"
+            )
+            return
+        queue.put_nowait((result, full_poll))
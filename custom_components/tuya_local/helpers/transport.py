@@ -0,0 +1,222 @@
+"""
+Asyncio transport for persistent Tuya connections.
+
+tinytuya does blocking socket I/O, so each persistent connection used to
+keep an executor thread waiting on the device.  This transport keeps the
+connection on the event loop instead, while the tinytuya Device object is
+still used to build and encrypt the payloads, negotiate the 3.4/3.5 session
+key and decode the replies, so all protocol versions behave the same as
+through tinytuya.
+"""
+
+import asyncio
+import logging
+import socket
+import struct
+from time import time
+
+import tinytuya
+
+_LOGGER = logging.getLogger(__name__)
+
+# Keep-alive period.  Devices drop idle connections after about 30s.
+HEARTBEAT_INTERVAL = 10
+
+_PREFIXES = (tinytuya.PREFIX_55AA_BIN, tinytuya.PREFIX_6699_BIN)
+_PREFIX_LEN = len(tinytuya.PREFIX_55AA_BIN)
+_HEADER_LEN = {
+    tinytuya.PREFIX_55AA_BIN: struct.calcsize(tinytuya.MESSAGE_HEADER_FMT_55AA),
+    tinytuya.PREFIX_6699_BIN: struct.calcsize(tinytuya.MESSAGE_HEADER_FMT_6699),
+}
+
+
+def message_cid(result):
+    """Return the sub device id a decoded message is for, or None."""
+    cid = result.get("cid")
+    if cid is None and isinstance(result.get("data"), dict):
+        cid = result["data"].get("cid")
+    return cid
+
+
+class TuyaTransport:
+    """A persistent connection to a Tuya device driven by asyncio streams."""
+
+    def __init__(self, api):
+        """
+        Args:
+            api (tinytuya.Device): The device used to encode and decode
+                messages.  It must not be a sub device.
+        """
+        self._api = api
+        self._reader = None
+        self._writer = None
+        self._ready = False
+        # sub device id (None for the device itself) -> pending query command
+        self._queries = {}
+        self._acked = set()
+        self.last_sent = 0
+        self.last_received = 0
+        self.last_query = 0
+
+    @property
+    def connected(self):
+        return self._ready and not self._writer.is_closing()
+
+    async def async_connect(self):
+        """Open the connection, negotiating a session key if needed."""
+        api = self._api
+        self.close()
+        # make sure tinytuya does not hold a connection of its own
+        api.set_socketPersistent(False)
+        async with asyncio.timeout(api.connection_timeout):
+            self._reader, self._writer = await asyncio.open_connection(
+                api.address, api.port
+            )
+        sock = self._writer.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        if api.version >= 3.4:
+            await self._async_write(api._negotiate_session_key_generate_step_1())
+            step3 = None
+            try:
+                for _ in range(2):
+                    # the device may ack before sending its nonce
+                    response = await self._async_read_message(
+                        api.connection_timeout
+                    )
+                    if response.payload:
+                        step3 = api._negotiate_session_key_generate_step_3(response)
+                        break
+            except (TimeoutError, tinytuya.DecodeError) as e:
+                raise ConnectionError(f"Session key negotiation failed: {e}") from e
+            if not step3:
+                raise ConnectionError("Session key negotiation failed")
+            await self._async_write(step3)
+            api._negotiate_session_key_generate_finalize()
+        self._ready = True
+        self.last_received = time()
+        _LOGGER.debug("%s connected over asyncio transport", api.id)
+
+    def close(self):
+        """Close the connection.  A pending receive will fail."""
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = None
+        self._writer = None
+        self._ready = False
+        self._queries.clear()
+        self._acked.clear()
+
+    async def async_heartbeat(self):
+        await self._async_write(self._api.generate_payload(tinytuya.HEART_BEAT))
+
+    async def async_status(self, api=None):
+        """
+        Request the full status, the reply is returned by async_receive.
+
+        Args:
+            api (tinytuya.Device): A sub device to query instead of the
+                device itself.
+        """
+        api = api or self._api
+        payload = api.generate_payload(tinytuya.DP_QUERY)
+        # device22 queries go out as CONTROL_NEW, and come back as such
+        self._queries[api.cid] = payload.cmd
+        self._acked.discard(api.cid)
+        self.last_query = time()
+        await self._async_write(payload)
+
+    async def async_updatedps(self, index, api=None):
+        """Request the device to push the current values of some dps."""
+        api = api or self._api
+        self.last_query = time()
+        await self._async_write(api.generate_payload(tinytuya.UPDATEDPS, index))
+
+    async def async_set_values(self, properties, api=None):
+        """Send new dp values without waiting for the device to confirm."""
+        api = api or self._api
+        data = {str(key): value for key, value in properties.items()}
+        if api.max_simultaneous_dps > 0 and len(data) > api.max_simultaneous_dps:
+            for key, value in data.items():
+                await self._async_write(
+                    api.generate_payload(tinytuya.CONTROL, {key: value})
+                )
+        else:
+            await self._async_write(api.generate_payload(tinytuya.CONTROL, data))
+
+    async def async_receive(self, timeout):
+        """
+        Wait up to timeout seconds for a message from the device.
+
+        Returns a tuple of the decoded message (None for timeouts, acks and
+        messages that could not be decoded) and whether it is the reply to
+        a status request.  Connection errors are raised, as well as a
+        ConnectionError if the device stopped answering the heartbeats.
+        """
+        try:
+            msg = await self._async_read_message(timeout)
+        except TimeoutError:
+            if time() - self.last_received > 3 * HEARTBEAT_INTERVAL:
+                self.close()
+                raise ConnectionError("Device stopped responding")
+            return None, False
+        except tinytuya.DecodeError as e:
+            _LOGGER.debug("%s discarding message: %s", self._api.id, e)
+            return None, False
+        if not msg.payload:
+            # some devices ack the query and send the status separately,
+            # queries are answered in order so the ack is for the oldest
+            for cid, cmd in self._queries.items():
+                if cmd == msg.cmd and cid not in self._acked:
+                    self._acked.add(cid)
+                    break
+            return None, False
+
+        result = self._api._decode_payload(msg.payload)
+        if result is None:
+            return None, False
+        cid = message_cid(result)
+        full_poll = (
+            "dps" in result
+            and cid in self._queries
+            and (cid in self._acked or msg.cmd == self._queries[cid])
+        )
+        if full_poll:
+            del self._queries[cid]
+            self._acked.discard(cid)
+        return result, full_poll
+
+    async def _async_write(self, payload):
+        if self._writer is None or self._writer.is_closing():
+            raise ConnectionError("Not connected")
+        self._writer.write(self._api._encode_message(payload))
+        self.last_sent = time()
+        await self._writer.drain()
+
+    async def _async_read_message(self, timeout):
+        """Read and unpack one message, resynchronising on the prefix."""
+        reader = self._reader
+        if reader is None:
+            raise ConnectionError("Not connected")
+        # Nothing is consumed from the stream until the prefix is complete,
+        # so timing out here leaves it in a consistent state.
+        async with asyncio.timeout(timeout):
+            data = await reader.readexactly(_PREFIX_LEN)
+        try:
+            async with asyncio.timeout(self._api.connection_timeout):
+                while data not in _PREFIXES:
+                    data = data[1:] + await reader.readexactly(1)
+                data += await reader.readexactly(_HEADER_LEN[data] - _PREFIX_LEN)
+                header = tinytuya.parse_header(data)
+                data += await reader.readexactly(header.total_length - len(data))
+        except TimeoutError as e:
+            raise ConnectionError("Timed out in the middle of a message") from e
+        self.last_received = time()
+        api = self._api
+        hmac_key = api.local_key if api.version >= 3.4 else None
+        msg = tinytuya.unpack_message(data, hmac_key=hmac_key, header=header)
+        # 6699 (3.5) frames are AES-GCM, a bad tag means the payload is garbage
+        if msg.prefix == tinytuya.PREFIX_6699_VALUE and not msg.crc_good:
+            raise tinytuya.DecodeError("GCM tag check failed, message discarded")
+        return msg
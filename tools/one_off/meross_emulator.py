@@ -0,0 +1,427 @@
+#!/usr/bin/env python3
+"""Offline Meross device emulator replaying meross_lan trace files.
+
+Serves the Appliance.* namespaces recorded in a meross_lan trace (the tab
+separated file ConfigEntryManager.trace writes under
+custom_components/meross_lan/traces) so that the http/mqtt clients and the
+polling code can be exercised without real hardware:
+
+- every emulated device gets its own http endpoint (POST /config) on 127.0.0.1
+- a minimal MQTT 3.1.1 broker stand-in (no TLS, no auth, QoS 0/1) routes
+  /appliance/<uuid>/subscribe messages to the emulated devices which reply on
+  the topic set in the request header 'from' (the app reply topic)
+
+GET replies the last GETACK (or PUSH) payload seen in the trace, SET merges
+the request payload into that state (keys not already there are ignored just
+like the real devices do) and Appliance.Control.Multiple is unpacked and
+answered as a whole. Without --trace a small synthetic mss310 is served.
+
+Needs an environment with homeassistant installed (meross_lan imports it):
+
+  python3 tools/one_off/meross_emulator.py --trace 2024-01-01_mss310.csv --devices 4
+
+On startup a single json line describing the endpoints is written to stdout
+({"devices": {uuid: http_port}, "mqtt": port, "key": key}) so that
+meross_emulator_bench.py (or any other script) can drive it.
+"""
+
+import argparse
+import asyncio
+import copy
+import json
+import struct
+import sys
+from pathlib import Path
+from time import time
+
+from aiohttp import web
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from custom_components.meross_lan.merossclient import (  # noqa: E402
+    json_dumps,
+    update_dict_strict,
+    update_dict_strict_by_key,
+)
+from custom_components.meross_lan.merossclient.protocol import (  # noqa: E402
+    const as mc,
+)
+from custom_components.meross_lan.merossclient.protocol.message import (  # noqa: E402
+    MerossAckReply,
+    build_message,
+    compute_message_signature,
+)
+
+TRACE_RX = "RX"
+NS_ALL = "Appliance.System.All"
+NS_ABILITY = "Appliance.System.Ability"
+NS_MULTIPLE = "Appliance.Control.Multiple"
+
+
+def load_trace(path):
+    """Return {namespace: payload} with the last GETACK (else PUSH) payload received in the trace."""
+    getacks = {}
+    pushes = {}
+    with open(path, encoding="utf8", newline="") as trace_file:
+        for line in trace_file:
+            columns = line.rstrip("\r\n").split("\t", 5)
+            if len(columns) != 6:
+                continue
+            _time, rxtx, _protocol, method, namespace, data = columns
+            if rxtx != TRACE_RX:
+                continue
+            if method == mc.METHOD_GETACK:
+                getacks[namespace] = json.loads(data)
+            elif method == mc.METHOD_PUSH and data != "{}":
+                pushes[namespace] = json.loads(data)
+    namespaces = pushes | getacks
+    for namespace in (NS_ALL, NS_ABILITY):
+        if namespace not in namespaces:
+            raise ValueError(f"{path} doesn't contain a {namespace} GETACK")
+    return namespaces
+
+
+def synthetic_namespaces():
+    """Return the state of a (made up) mss310 smart plug."""
+    return {
+        NS_ALL: {
+            "all": {
+                "system": {
+                    "hardware": {
+                        "type": "mss310",
+                        "subType": "us",
+                        "version": "2.0.0",
+                        "chipType": "mt7682",
+                        "uuid": "",
+                        "macAddress": "",
+                    },
+                    "firmware": {
+                        "version": "6.1.8",
+                        "compileTime": "2021/01/01-00:00:00",
+                        "innerIp": "127.0.0.1",
+                        "server": "",
+                        "port": 0,
+                        "userId": 0,
+                    },
+                    "time": {"timestamp": 0, "timezone": "", "timeRule": []},
+                    "online": {"status": 1},
+                },
+                "digest": {
+                    "togglex": [{"channel": 0, "onoff": 1, "lmTime": 0}],
+                    "triggerx": [],
+                    "timerx": [],
+                },
+            }
+        },
+        NS_ABILITY: {
+            "payloadVersion": 1,
+            "ability": {
+                NS_ALL: {},
+                NS_ABILITY: {},
+                "Appliance.System.Runtime": {},
+                "Appliance.System.DNDMode": {},
+                NS_MULTIPLE: {"maxCmdNum": 5},
+                "Appliance.Control.ToggleX": {},
+                "Appliance.Control.Electricity": {},
+                "Appliance.Control.ConsumptionX": {},
+            },
+        },
+        "Appliance.System.Runtime": {"runtime": {"signal": 78}},
+        "Appliance.System.DNDMode": {"DNDMode": {"mode": 0}},
+        "Appliance.Control.ToggleX": {
+            "togglex": [{"channel": 0, "onoff": 1, "lmTime": 0}]
+        },
+        "Appliance.Control.Electricity": {
+            "electricity": {
+                "channel": 0,
+                "current": 512,
+                "voltage": 1203,
+                "power": 58210,
+                "config": {"voltageRatio": 188, "electricityRatio": 100},
+            }
+        },
+        "Appliance.Control.ConsumptionX": {
+            "consumptionx": [
+                {"date": f"2024-01-{day:02}", "time": 1704067200 + day * 86400, "value": 1200 + day}
+                for day in range(1, 31)
+            ]
+        },
+    }
+
+
+class EmulatorDevice:
+    """A device answering from (a private copy of) the recorded namespaces state."""
+
+    def __init__(self, uuid, key, namespaces):
+        self.uuid = uuid
+        self.key = key
+        self.topic_publish = f"/appliance/{uuid}/publish"
+        self.namespaces = copy.deepcopy(namespaces)
+        self.messages = 0
+        p_hardware = self.namespaces[NS_ALL]["all"]["system"]["hardware"]
+        p_hardware["uuid"] = uuid
+        p_hardware["macAddress"] = ":".join(uuid[i : i + 2] for i in range(20, 32, 2))
+        # the clients would need the ECDHE key exchange else
+        p_ability = self.namespaces[NS_ABILITY]["ability"]
+        for namespace in [ns for ns in p_ability if ns.startswith("Appliance.Encrypt.")]:
+            del p_ability[namespace]
+
+    @property
+    def multiple_max(self):
+        """Return the maxCmdNum advertised for ns_multiple (0 when not supported)."""
+        return self.namespaces[NS_ABILITY]["ability"].get(NS_MULTIPLE, {}).get("maxCmdNum", 0)
+
+    def handle(self, message):
+        """Process a request message and return the reply message."""
+        header = message[mc.KEY_HEADER]
+        if self.key and header.get(mc.KEY_SIGN) != compute_message_signature(
+            header[mc.KEY_MESSAGEID], self.key, header[mc.KEY_TIMESTAMP]
+        ):
+            return self._error(header, mc.ERROR_INVALIDKEY, "sign error")
+        return self._reply(header, message[mc.KEY_PAYLOAD])
+
+    def _reply(self, header, payload):
+        self.messages += 1
+        namespace = header[mc.KEY_NAMESPACE]
+        method = header[mc.KEY_METHOD]
+        if namespace == NS_MULTIPLE:
+            # inner messages only carry messageId, method and namespace
+            return MerossAckReply(
+                header,
+                {
+                    mc.KEY_MULTIPLE: [
+                        self._reply(_message[mc.KEY_HEADER], _message[mc.KEY_PAYLOAD])
+                        for _message in payload[mc.KEY_MULTIPLE]
+                    ]
+                },
+                self.key,
+                self.topic_publish,
+            )
+
+        state = self.namespaces.get(namespace)
+        if state is None:
+            return self._error(header, 5000, "namespace not supported")
+        if method == mc.METHOD_GET:
+            if namespace == NS_ALL:
+                state["all"]["system"]["time"]["timestamp"] = int(time())
+            return MerossAckReply(header, state, self.key, self.topic_publish)
+        if method == mc.METHOD_SET:
+            for key, value in payload.items():
+                p_state = state.get(key)
+                if type(p_state) is list:
+                    for p_channel in value if type(value) is list else (value,):
+                        try:
+                            update_dict_strict_by_key(p_state, p_channel)
+                        except KeyError:
+                            pass
+                elif type(p_state) is dict and type(value) is dict:
+                    update_dict_strict(p_state, value)
+            return MerossAckReply(header, {}, self.key, self.topic_publish)
+        return self._error(header, 5000, f"method {method} not supported")
+
+    def _error(self, header, code, detail):
+        return build_message(
+            header[mc.KEY_NAMESPACE],
+            mc.METHOD_ERROR,
+            {mc.KEY_ERROR: {mc.KEY_CODE: code, "detail": detail}},
+            header[mc.KEY_MESSAGEID],
+            self.key,
+            self.topic_publish,
+        )
+
+
+class EmulatorHttpServer:
+    """One aiohttp site (POST /config) per emulated device."""
+
+    def __init__(self, host="127.0.0.1"):
+        self.host = host
+        self.ports = {}
+        self._runners = []
+
+    async def async_add_device(self, device):
+        async def _handle_config(request):
+            reply = device.handle(json.loads(await request.text()))
+            return web.Response(text=json_dumps(reply), content_type="application/json")
+
+        app = web.Application()
+        app.router.add_post("/config", _handle_config)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, self.host, 0)
+        await site.start()
+        self._runners.append(runner)
+        self.ports[device.uuid] = port = site._server.sockets[0].getsockname()[1]  # type: ignore
+        return port
+
+    async def async_shutdown(self):
+        for runner in self._runners:
+            await runner.cleanup()
+        self._runners.clear()
+
+
+class MQTTBrokerStandIn:
+    """Just enough of an MQTT 3.1.1 broker to route app requests to the emulated devices.
+
+    Supports CONNECT, SUBSCRIBE/UNSUBSCRIBE (with '+' and '#' wildcards), PUBLISH at
+    QoS 0/1 (always delivered at QoS 0), PINGREQ and DISCONNECT. Devices are attached
+    in process and answer on the topic carried in the request header 'from'.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0):
+        self.host = host
+        self.port = port
+        self.published = 0
+        self._devices = {}
+        self._subscriptions = {}  # writer -> set of topic filters
+        self._server = None
+
+    def add_device(self, device):
+        self._devices[f"/appliance/{device.uuid}/subscribe"] = device
+
+    async def async_start(self):
+        self._server = await asyncio.start_server(self._client_connected, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def async_shutdown(self):
+        if self._server:
+            self._server.close()
+            for writer in list(self._subscriptions):
+                writer.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    @staticmethod
+    def topic_matches(topic_filter, topic):
+        """Return True if topic matches the (possibly wildcarded) topic_filter."""
+        filter_levels = topic_filter.split("/")
+        topic_levels = topic.split("/")
+        for index, level in enumerate(filter_levels):
+            if level == "#":
+                return True
+            if index >= len(topic_levels) or (level != "+" and level != topic_levels[index]):
+                return False
+        return len(filter_levels) == len(topic_levels)
+
+    def publish(self, topic, payload):
+        """Deliver payload (bytes) to the emulated devices and subscribed clients."""
+        self.published += 1
+        if device := self._devices.get(topic):
+            request = json.loads(payload)
+            reply_topic = request[mc.KEY_HEADER].get(mc.KEY_FROM)
+            if not (reply_topic and reply_topic.startswith("/")):
+                reply_topic = device.topic_publish
+            self.publish(reply_topic, json_dumps(device.handle(request)).encode("utf-8"))
+            return
+        topic_bytes = topic.encode("utf-8")
+        body = struct.pack("!H", len(topic_bytes)) + topic_bytes + payload
+        packet = b"\x30" + _encode_length(len(body)) + body
+        for writer, topic_filters in self._subscriptions.items():
+            if any(self.topic_matches(topic_filter, topic) for topic_filter in topic_filters):
+                writer.write(packet)
+
+    async def _client_connected(self, reader, writer):
+        self._subscriptions[writer] = topic_filters = set()
+        try:
+            while True:
+                first_byte = (await reader.readexactly(1))[0]
+                length = await _read_length(reader)
+                body = await reader.readexactly(length) if length else b""
+                packet_type = first_byte >> 4
+                if packet_type == 1:  # CONNECT
+                    writer.write(b"\x20\x02\x00\x00")
+                elif packet_type == 3:  # PUBLISH
+                    qos = (first_byte >> 1) & 0x03
+                    topic_length = struct.unpack_from("!H", body)[0]
+                    topic = body[2 : 2 + topic_length].decode("utf-8")
+                    offset = 2 + topic_length
+                    if qos:
+                        writer.write(b"\x40\x02" + body[offset : offset + 2])
+                        offset += 2
+                    self.publish(topic, body[offset:])
+                elif packet_type == 8:  # SUBSCRIBE
+                    offset = 2
+                    granted = bytearray()
+                    while offset < length:
+                        topic_length = struct.unpack_from("!H", body, offset)[0]
+                        offset += 2
+                        topic_filters.add(body[offset : offset + topic_length].decode("utf-8"))
+                        offset += topic_length
+                        granted.append(min(body[offset], 1))
+                        offset += 1
+                    writer.write(b"\x90" + _encode_length(2 + len(granted)) + body[:2] + granted)
+                elif packet_type == 10:  # UNSUBSCRIBE
+                    offset = 2
+                    while offset < length:
+                        topic_length = struct.unpack_from("!H", body, offset)[0]
+                        offset += 2
+                        topic_filters.discard(body[offset : offset + topic_length].decode("utf-8"))
+                        offset += topic_length
+                    writer.write(b"\xb0\x02" + body[:2])
+                elif packet_type == 12:  # PINGREQ
+                    writer.write(b"\xd0\x00")
+                elif packet_type == 14:  # DISCONNECT
+                    break
+                # PUBACK (4) and the others are just ignored
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._subscriptions.pop(writer, None)
+            writer.close()
+
+
+def _encode_length(length):
+    encoded = bytearray()
+    while True:
+        digit = length % 128
+        length //= 128
+        encoded.append(digit | 0x80 if length else digit)
+        if not length:
+            return bytes(encoded)
+
+
+async def _read_length(reader):
+    multiplier = 1
+    length = 0
+    while True:
+        digit = (await reader.readexactly(1))[0]
+        length += (digit & 0x7F) * multiplier
+        if not digit & 0x80:
+            return length
+        multiplier *= 128
+
+
+def build_devices(namespaces, count, key=""):
+    """Return count EmulatorDevice(s) sharing the same recorded state (with unique uuids)."""
+    return [EmulatorDevice(f"{0xE1E1 + index:04x}".rjust(32, "0"), key, namespaces) for index in range(count)]
+
+
+async def main(args):
+    """Start the endpoints, print their description and serve until interrupted."""
+    namespaces = load_trace(args.trace) if args.trace else synthetic_namespaces()
+    devices = build_devices(namespaces, args.devices, args.key)
+    http_server = EmulatorHttpServer(args.host)
+    broker = MQTTBrokerStandIn(args.host, args.mqtt_port)
+    for device in devices:
+        await http_server.async_add_device(device)
+        broker.add_device(device)
+    await broker.async_start()
+    print(json.dumps({"devices": http_server.ports, "mqtt": broker.port, "key": args.key}), flush=True)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await broker.async_shutdown()
+        await http_server.async_shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--trace", help="meross_lan trace file (default: synthetic mss310)")
+    parser.add_argument("--devices", type=int, default=1, help="number of emulated devices")
+    parser.add_argument("--host", default="127.0.0.1", help="address to bind")
+    parser.add_argument("--mqtt-port", type=int, default=0, help="broker port (0: any free port)")
+    parser.add_argument("--key", default="", help="device key used to check/sign the messages")
+    try:
+        asyncio.run(main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""Load test: meross_lan http/mqtt clients and ns_multiple packing against emulated devices.
+
+Spawns meross_emulator.py (in a separate process so that its cpu time doesn't
+pollute the measures) serving N copies of a traced (or synthetic) device and
+then runs polling cycles over every namespace meross_lan would poll for it
+(the ones in POLLING_STRATEGY_CONF the device answered in the trace):
+
+- http single: one MerossHttpClient request per namespace (devices in parallel)
+- http multiple: the same requests packed by Device._multiple_requests_pack into
+  Appliance.Control.Multiple (device limits as computed by Device.__init__)
+- mqtt: one request per namespace through the meross_lan paho client and the
+  emulator broker stand-in, replies decoded as MerossLazyResponse like
+  MQTTConnection does
+
+For each mode it reports the cycle latency (median/p95/max), the round trips
+and the namespaces answered per cycle, the ns_multiple fill (response bytes
+against device_response_size_max) and the cpu time (this process) per message.
+
+Needs an environment with homeassistant installed (meross_lan imports it):
+
+  python3 tools/one_off/meross_emulator_bench.py --devices 20 --cycles 30
+  python3 tools/one_off/meross_emulator_bench.py --trace 2024-01-01_mss310.csv
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from uuid import uuid4
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from custom_components.meross_lan.helpers.device import Device  # noqa: E402
+from custom_components.meross_lan.helpers.namespaces import (  # noqa: E402
+    POLLING_STRATEGY_CONF,
+)
+from custom_components.meross_lan.merossclient import HostAddress  # noqa: E402
+from custom_components.meross_lan.merossclient.httpclient import (  # noqa: E402
+    MerossHttpClient,
+)
+from custom_components.meross_lan.merossclient.mqttclient import (  # noqa: E402
+    _MerossMQTTClient,
+)
+from custom_components.meross_lan.merossclient.protocol import (  # noqa: E402
+    const as mc,
+    namespaces as mn,
+)
+from custom_components.meross_lan.merossclient.protocol.message import (  # noqa: E402
+    MerossLazyResponse,
+    MerossRequest,
+)
+
+EMULATOR = Path(__file__).resolve().with_name("meross_emulator.py")
+
+
+class CycleStats:
+    """Accumulates the measures of the polling cycles of one mode."""
+
+    def __init__(self, name):
+        self.name = name
+        self.latencies = []
+        self.round_trips = 0
+        self.messages = 0
+        self.response_bytes = 0
+        self.multiple_fill = []
+        self.pack_time = 0.0
+        self.cpu = 0.0
+
+    def row(self):
+        cycles = len(self.latencies)
+        latencies = sorted(self.latencies)
+        return (
+            f"{self.name:<16} {statistics.median(latencies) * 1000:>9.2f}"
+            f" {latencies[int(0.95 * (cycles - 1))] * 1000:>8.2f} {latencies[-1] * 1000:>8.2f}"
+            f" {self.round_trips / cycles:>8.1f} {self.messages / cycles:>8.1f}"
+            f" {self.response_bytes / max(self.round_trips, 1):>8.0f}"
+            f" {(statistics.mean(self.multiple_fill) * 100 if self.multiple_fill else 0):>6.1f}"
+            f" {self.pack_time / cycles * 1e6:>8.1f} {self.cpu / max(self.messages, 1) * 1e6:>9.1f}"
+        )
+
+
+def polled_requests(ability):
+    """Return the (request, expected response size) meross_lan would poll for a device."""
+    requests = []
+    for namespace, conf in POLLING_STRATEGY_CONF.items():
+        if (namespace.name in ability) and conf[4] and (namespace is not mn.Appliance_System_Ability):
+            requests.append((namespace.request_default, conf[2] + conf[3]))
+    return requests
+
+
+def build_multiple(requests):
+    """Return the Appliance.Control.Multiple payload the way Device builds it."""
+    return {
+        mn.Appliance_Control_Multiple.key: [
+            {
+                mc.KEY_HEADER: {
+                    mc.KEY_MESSAGEID: uuid4().hex,
+                    mc.KEY_METHOD: request[0][1],
+                    mc.KEY_NAMESPACE: request[0][0],
+                },
+                mc.KEY_PAYLOAD: request[0][2],
+            }
+            for request in requests
+        ]
+    }
+
+
+async def http_cycle(clients, requests, stats, pack):
+    """Poll every device (in parallel) with one request per namespace or packed in ns_multiple."""
+
+    async def _poll(client, packer):
+        if not pack:
+            for namespace, method, payload in (request[0] for request in requests):
+                response = await client.async_request(namespace, method, payload)
+                stats.round_trips += 1
+                stats.messages += 1
+                stats.response_bytes += len(response.json())
+            return
+        epoch = time.perf_counter()
+        batches = Device._multiple_requests_pack(packer, requests)
+        stats.pack_time += time.perf_counter() - epoch
+        for expected_size, batch in batches:
+            if len(batch) == 1:
+                response = await client.async_request(*batch[0][0])
+            else:
+                response = await client.async_request(
+                    mn.Appliance_Control_Multiple.name, mc.METHOD_SET, build_multiple(batch)
+                )
+            response_size = len(response.json())
+            stats.round_trips += 1
+            stats.messages += len(batch)
+            stats.response_bytes += response_size
+            if len(batch) > 1:
+                stats.multiple_fill.append(response_size / packer.device_response_size_max)
+
+    await asyncio.gather(*(_poll(client, packer) for client, packer in clients))
+
+
+class BenchMQTTClient(_MerossMQTTClient):
+    """App-like client resolving the pending requests with the replies from the devices."""
+
+    def __init__(self, loop):
+        self.topic_reply = f"/app/0-{uuid4().hex}/subscribe"
+        super().__init__(f"app:{uuid4().hex}", [(self.topic_reply, 1)], loop=loop)
+        self.pending = {}
+
+    async def async_mqtt_message(self, msg):
+        message = MerossLazyResponse(msg.payload.decode("utf-8"))
+        if future := self.pending.pop(message[mc.KEY_HEADER][mc.KEY_MESSAGEID], None):
+            future.set_result(message)
+
+
+async def mqtt_cycle(client, uuids, key, requests, stats):
+    """Send every namespace request to every device at once and wait for all the replies."""
+    loop = asyncio.get_running_loop()
+    futures = []
+    for uuid in uuids:
+        topic = f"/appliance/{uuid}/subscribe"
+        for namespace, method, payload in (request[0] for request in requests):
+            request = MerossRequest(namespace, method, payload, key, client.topic_reply)
+            client.pending[request.messageid] = future = loop.create_future()
+            futures.append(future)
+            client.publish(topic, request.json())
+    for response in await asyncio.wait_for(asyncio.gather(*futures), 30):
+        stats.response_bytes += len(response.json())
+        # what the device would parse
+        response[mc.KEY_PAYLOAD]
+    stats.round_trips += len(futures)
+    stats.messages += len(futures)
+
+
+async def main(args):
+    """Start the emulator, run the cycles for each mode and print a table."""
+    command = [sys.executable, str(EMULATOR), "--devices", str(args.devices), "--key", args.key]
+    if args.trace:
+        command += ["--trace", args.trace]
+    emulator = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    try:
+        endpoints = json.loads(emulator.stdout.readline())  # type: ignore
+        ports = endpoints["devices"]
+
+        probe = MerossHttpClient(f"127.0.0.1:{next(iter(ports.values()))}", args.key)
+        ability = (await probe.async_request(mn.Appliance_System_Ability.name, mc.METHOD_GET, {}))[
+            mc.KEY_PAYLOAD
+        ][mc.KEY_ABILITY]
+        requests = polled_requests(ability)
+        multiple_max = ability.get(mn.Appliance_Control_Multiple.name, {}).get("maxCmdNum", 0)
+        print(
+            f"{len(ports)} devices, {len(requests)} polled namespaces per device, maxCmdNum={multiple_max}:"
+            f" {', '.join(request[0][0] for request in requests)}"
+        )
+
+        clients = []
+        for port in ports.values():
+            # just what Device._multiple_requests_pack needs
+            packer = SimpleNamespace(
+                multiple_max=multiple_max,
+                device_response_size_max=multiple_max * 800,
+                _lazypoll_requests=[],
+                _polling_epoch=0.0,
+            )
+            clients.append((MerossHttpClient(f"127.0.0.1:{port}", args.key), packer))
+
+        results = []
+        if args.transport in ("http", "both"):
+            for name, pack in (("http single", False), ("http multiple", True)):
+                if pack and not multiple_max:
+                    continue
+                stats = CycleStats(name)
+                await http_cycle(clients, requests, CycleStats("warmup"), pack)
+                cpu = time.process_time()
+                for _ in range(args.cycles):
+                    epoch = time.perf_counter()
+                    await http_cycle(clients, requests, stats, pack)
+                    stats.latencies.append(time.perf_counter() - epoch)
+                stats.cpu = time.process_time() - cpu
+                results.append(stats)
+
+        if args.transport in ("mqtt", "both"):
+            mqtt_client = BenchMQTTClient(asyncio.get_running_loop())
+            await asyncio.wait_for(
+                await mqtt_client.async_connect(HostAddress("127.0.0.1", endpoints["mqtt"])), 10
+            )
+            stats = CycleStats("mqtt")
+            await mqtt_cycle(mqtt_client, list(ports), args.key, requests, CycleStats("warmup"))
+            cpu = time.process_time()
+            for _ in range(args.cycles):
+                epoch = time.perf_counter()
+                await mqtt_cycle(mqtt_client, list(ports), args.key, requests, stats)
+                stats.latencies.append(time.perf_counter() - epoch)
+            stats.cpu = time.process_time() - cpu
+            results.append(stats)
+            await mqtt_client.async_shutdown()
+
+        print(
+            f"{'mode':<16} {'median ms':>9} {'p95 ms':>8} {'max ms':>8} {'rtt/cyc':>8} {'msg/cyc':>8}"
+            f" {'B/rtt':>8} {'fill%':>6} {'pack us':>8} {'cpu us/msg':>9}"
+        )
+        for stats in results:
+            print(stats.row())
+        await MerossHttpClient.async_shutdown_session()
+    finally:
+        emulator.terminate()
+        emulator.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--trace", help="meross_lan trace file (default: synthetic mss310)")
+    parser.add_argument("--devices", type=int, default=10, help="number of emulated devices")
+    parser.add_argument("--cycles", type=int, default=20, help="measured polling cycles per mode")
+    parser.add_argument("--transport", choices=("http", "mqtt", "both"), default="both")
+    parser.add_argument("--key", default="", help="device key (signatures are checked when set)")
+    asyncio.run(main(parser.parse_args()))
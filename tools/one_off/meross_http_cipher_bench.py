@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""Microbenchmark: meross_lan encrypted HTTP transport codec.
+
+Compares the buffer based MerossHttpClient._encrypt/_decrypt against the
+previous implementation (a new bytes object for padding, b64encode/b64decode
+round trips through str and rstrip on the decoded text) for payloads between
+1 KB and 16 KB.
+
+Needs an environment with homeassistant installed (meross_lan imports it):
+
+  python3 tools/one_off/meross_http_cipher_bench.py --loops 2000
+"""
+
+import argparse
+import asyncio
+from base64 import b64decode, b64encode
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from custom_components.meross_lan.merossclient.httpclient import (  # noqa: E402
+    MerossHttpClient,
+)
+
+SIZES = (1024, 2048, 4096, 8192, 16384)
+
+
+def build_payload(size):
+    """Return a Meross-like json message of roughly size bytes."""
+    channels = []
+    message = {
+        "header": {
+            "messageId": "a" * 32,
+            "namespace": "Appliance.Control.Multiple",
+            "method": "SETACK",
+            "payloadVersion": 1,
+            "from": "/appliance/1234/publish",
+            "timestamp": 1700000000,
+            "timestampMs": 123,
+            "sign": "b" * 32,
+        },
+        "payload": {"multiple": channels},
+    }
+    while len(json.dumps(message, separators=(",", ":"))) < size:
+        channels.append({"channel": len(channels), "power": 123456, "current": 789, "voltage": 2301})
+    return json.dumps(message, separators=(",", ":"))
+
+
+def legacy_encrypt(cipher, request):
+    """Encrypt the request the way MerossHttpClient used to."""
+    request_bytes = request.encode("utf-8")
+    request_bytes += bytes(16 - (len(request_bytes) % 16))
+    encryptor = cipher.encryptor()
+    return b64encode(encryptor.update(request_bytes) + encryptor.finalize()).decode("utf-8")
+
+
+def legacy_decrypt(cipher, response):
+    """Decrypt the (str) response the way MerossHttpClient used to."""
+    decryptor = cipher.decryptor()
+    decrypted_bytes = decryptor.update(b64decode(response))
+    decrypted_bytes += decryptor.finalize()
+    return decrypted_bytes.decode("utf8").rstrip("\0")
+
+
+def time_loops(func, arg, loops, repeat=5):
+    """Return the average time of func(arg) in usecs, best of repeat runs."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(loops):
+            func(arg)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best / loops * 1e6
+
+
+async def main(loops):
+    """Check both codecs agree and time them for each payload size."""
+    client = MerossHttpClient("127.0.0.1", "key")
+    client.set_encryption(os.urandom(16).hex().encode("utf-8"))
+    cipher = client._encryption_cipher
+
+    print(f"{'size':>6} {'enc legacy us':>14} {'enc new us':>11} {'dec legacy us':>14} {'dec new us':>11}")
+    for size in SIZES:
+        request = build_payload(size)
+        encrypted = client._encrypt(request)
+        assert encrypted.decode("ascii") == legacy_encrypt(cipher, request)
+        assert client._decrypt(encrypted) == legacy_decrypt(cipher, encrypted.decode("ascii")) == request
+
+        t_enc_legacy = time_loops(lambda req: legacy_encrypt(cipher, req), request, loops)
+        t_enc_new = time_loops(client._encrypt, request, loops)
+        # the legacy path got the response through response.text()
+        t_dec_legacy = time_loops(lambda resp: legacy_decrypt(cipher, resp.decode("utf-8")), encrypted, loops)
+        t_dec_new = time_loops(client._decrypt, encrypted, loops)
+        print(f"{len(request):>6} {t_enc_legacy:>14.2f} {t_enc_new:>11.2f} {t_dec_legacy:>14.2f} {t_dec_new:>11.2f}")
+
+    await MerossHttpClient.async_shutdown_session()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--loops", type=int, default=2000, help="iterations per payload size")
+    asyncio.run(main(parser.parse_args().loops))
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""Microbenchmark: pyscript compiled function bodies vs the AST interpreter.
+
+Runs a few representative pyscript functions through EvalFunc.call twice: once
+with the closures built by AstCompile at definition time, and once with
+body_compiled cleared so every node goes back through AstEval.aeval.
+
+Needs an environment with homeassistant, croniter and watchdog installed:
+
+  python3 tools/one_off/pyscript_eval_bench.py --calls 2000
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+import types
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from custom_components.pyscript.const import CONFIG_ENTRY, DOMAIN  # noqa: E402
+from custom_components.pyscript.eval import AstEval  # noqa: E402
+from custom_components.pyscript.function import Function  # noqa: E402
+from custom_components.pyscript.global_ctx import GlobalContext  # noqa: E402
+
+SOURCE = """
+def arith(n):
+    total = 0
+    for i in range(n):
+        if i % 3 == 0 and i > 2:
+            total += i * 2
+        else:
+            total = total - (i if i < 10 else 1)
+    return total
+
+def strings(items):
+    out = []
+    for key, value in items.items():
+        out.append(f"{key}={value:>4}")
+    return ", ".join(out)
+
+def branchy(temp, humidity, mode):
+    if mode == "auto" and temp > 21.5 or humidity > 60:
+        level = "high" if temp > 24 else "medium"
+    elif mode in ("off", "away"):
+        level = None
+    else:
+        level = "low"
+    return level
+"""
+
+CALLS = {
+    "arith": ((50,), {}),
+    "strings": (({"a": 1, "b": 22, "c": 333},), {}),
+    "branchy": ((22.3, 55, "auto"), {}),
+}
+
+
+class BenchHass:
+    """Just enough of hass for AstEval and GlobalContext."""
+
+    def __init__(self):
+        """Initialize the fake hass data."""
+        self.data = {DOMAIN: {CONFIG_ENTRY: types.SimpleNamespace(data={})}}
+
+
+async def time_calls(ast_ctx, func, args, kwargs, calls):
+    """Return the elapsed time for calls invocations of func."""
+    start = time.perf_counter()
+    for _ in range(calls):
+        await func.call(ast_ctx, *args, **kwargs)
+    return time.perf_counter() - start
+
+
+async def main(calls):
+    """Define the functions and time both execution paths."""
+    Function.hass = BenchHass()
+    global_ctx = GlobalContext("file.bench")
+    ast_ctx = AstEval("file.bench", global_ctx)
+    Function.install_ast_funcs(ast_ctx)
+    ast_ctx.parse(SOURCE)
+    await ast_ctx.eval()
+    if ast_ctx.get_exception_obj():
+        raise ast_ctx.get_exception_obj()
+
+    print(f"{'function':<10} {'interp us':>10} {'compiled us':>12} {'speedup':>8}")
+    for name, (args, kwargs) in CALLS.items():
+        func = global_ctx.get_global_sym_table()[name].get_func()
+        compiled = func.body_compiled
+        await time_calls(ast_ctx, func, args, kwargs, calls // 10)
+        t_compiled = await time_calls(ast_ctx, func, args, kwargs, calls)
+        func.body_compiled = None
+        t_interp = await time_calls(ast_ctx, func, args, kwargs, calls)
+        func.body_compiled = compiled
+        print(
+            f"{name:<10} {t_interp / calls * 1e6:>10.1f} {t_compiled / calls * 1e6:>12.1f}"
+            f" {t_interp / t_compiled:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=2000, help="calls per function and mode")
+    asyncio.run(main(parser.parse_args().calls))
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""Microbenchmark: tuya_local dp value decoding with compiled mapping lookups.
+
+Compares TuyaDpsConfig against the previous implementation (a linear scan of
+the mapping list in _find_map_for_dps, conditions evaluated on every call and
+find_dps building a TuyaDpsConfig per dp until the name matches) on what an
+entity state write reads: get_value, values, range, step and the icon rule of
+every dp, plus the entity availability and icon.
+
+The device state cycles through values taken from the mappings and ranges of
+each dp, and both implementations are checked to return the same results.
+
+Needs an environment with homeassistant installed (tuya_local imports it):
+
+  python3 tools/one_off/tuya_dps_decode_bench.py --loops 100
+  python3 tools/one_off/tuya_dps_decode_bench.py --configs smartplugv2_energy.yaml
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from custom_components.tuya_local.helpers.device_config import (  # noqa: E402
+    TuyaDeviceConfig,
+    TuyaDpsConfig,
+    TuyaEntityConfig,
+    _equal_or_in,
+)
+
+CONFIGS = (
+    "smartplugv2_energy.yaml",
+    "rgbcw_lightbulb.yaml",
+    "beca_bht002_thermostat_c.yaml",
+    "t5e_wf_thermostat.yaml",
+    "inkbird_ibs_m1s.yaml",
+    "eurom_600_heater.yaml",
+)
+STATES = 8
+
+
+class LegacyEntityConfig(TuyaEntityConfig):
+    """TuyaEntityConfig with the linear find_dps."""
+
+    def dps(self):
+        for d in self._config["dps"]:
+            yield LegacyDpsConfig(self, d)
+
+    def find_dps(self, name):
+        for d in self.dps():
+            if d.name == name:
+                return d
+        return None
+
+
+class LegacyDpsConfig(TuyaDpsConfig):
+    """TuyaDpsConfig scanning the mapping list on every lookup."""
+
+    def _find_map_for_dps(self, value, device):
+        default = None
+        for m in self._config.get("mapping", {}):
+            if not self.mapping_available(m, device) and "conditions" not in m:
+                continue
+            if "dps_val" not in m:
+                default = m
+            elif self._match(m["dps_val"], value):
+                return m
+        return default
+
+    def _active_condition(self, mapping, device, value=None):
+        constraint = mapping.get("constraint", self.name)
+        conditions = mapping.get("conditions")
+        c_match = None
+        if constraint and conditions:
+            c_dps = self._entity.find_dps(constraint)
+            c_val = (
+                None
+                if c_dps is None
+                else (
+                    c_dps.get_value(device)
+                    if c_dps.rawtype == "base64" or c_dps.rawtype == "hex"
+                    else device.get_property(c_dps.id)
+                )
+            )
+            for cond in conditions:
+                if not self.mapping_available(cond, device):
+                    continue
+                if c_val is not None and (_equal_or_in(c_val, cond.get("dps_val"))):
+                    c_match = cond
+                elif (
+                    c_val is None
+                    and c_dps is not None
+                    and "dps_val" in cond
+                    and cond.get("dps_val") is None
+                ):
+                    c_match = cond
+                if value is not None and value == cond.get("value"):
+                    return cond
+        return c_match
+
+
+class FakeDevice:
+    """Just what the dp configs read from a TuyaLocalDevice."""
+
+    name = "bench"
+    has_returned_state = True
+
+    def __init__(self):
+        self.state = {}
+
+    def get_property(self, dps_id):
+        return self.state.get(dps_id)
+
+
+def sample_values(dp):
+    """Return values the device could report for a dp config."""
+    values = []
+    for m in dp.get("mapping", []):
+        if m.get("dps_val") is not None:
+            values.append(m["dps_val"])
+        for c in m.get("conditions", []):
+            if c.get("dps_val") is not None and not isinstance(c["dps_val"], list):
+                values.append(c["dps_val"])
+    r = dp.get("range")
+    if r and "min" in r and "max" in r:
+        values += [r["min"], (r["min"] + r["max"]) // 2, r["max"]]
+    if not values:
+        values = {
+            "boolean": [True, False],
+            "integer": [0, 1, 100],
+            "float": [0.0, 21.5],
+            "base64": ["AAEC", "AQID"],
+            "hex": ["000102", "010203"],
+        }.get(dp["type"], ["x"])
+    return values
+
+
+def build_states(config):
+    """Return STATES dp states cycling through the sample values of each dp."""
+    samples = {}
+    for entity in config._config["entities"]:
+        for dp in entity["dps"]:
+            samples.setdefault(str(dp["id"]), []).extend(sample_values(dp))
+    return [
+        {dp_id: values[i % len(values)] for dp_id, values in samples.items()}
+        for i in range(STATES)
+    ]
+
+
+def read_entity(entity, dps, device):
+    """Read what a state write of the entity reads, return it for comparison."""
+    result = [entity.available(device), entity.icon(device)]
+    for dp in dps:
+        result += [
+            dp.get_value(device),
+            dp.values(device),
+            dp.range(device),
+            dp.step(device),
+            dp.icon_rule(device),
+        ]
+    return result
+
+
+def time_config(config, entity_class, states, loops, repeat=5):
+    """Return (usecs per entity state write best of repeat runs, results)."""
+    device = FakeDevice()
+    entities = [entity_class(config, e) for e in config._config["entities"]]
+    entity_dps = [list(e.dps()) for e in entities]
+    best = None
+    results = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(loops):
+            results = []
+            for state in states:
+                device.state = state
+                for entity, dps in zip(entities, entity_dps):
+                    results.append(read_entity(entity, dps, device))
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best / (loops * len(states) * len(entities)) * 1e6, results
+
+
+def main(args):
+    print(f"{'config':<34} {'entities':>8} {'legacy us':>10} {'new us':>8} {'speedup':>8}")
+    for fname in args.configs:
+        config = TuyaDeviceConfig(fname)
+        states = build_states(config)
+        t_legacy, legacy = time_config(config, LegacyEntityConfig, states, args.loops)
+        t_new, new = time_config(config, TuyaEntityConfig, states, args.loops)
+        assert legacy == new, f"{fname}: results differ"
+        print(
+            f"{fname:<34} {len(config._config['entities']):>8} {t_legacy:>10.1f}"
+            f" {t_new:>8.1f} {t_legacy / t_new:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--configs", nargs="+", default=CONFIGS, help="device yaml files")
+    parser.add_argument("--loops", type=int, default=100, help="passes over the states")
+    main(parser.parse_args())